@@ -40,17 +40,19 @@ async def require_admin(request: Request) -> dict:
 async def send_notification_email(to_email: str, subject: str, body: str):
     """Send email notification using SendGrid if configured"""
     try:
-        import sendgrid
         from sendgrid.helpers.mail import Mail, Email, To, Content
+        from services.email_service import (
+            DEFAULT_SENDER, SENDER_EMAIL, SENDGRID_API_KEY, send_sendgrid_message
+        )
         
-        sg_api_key = os.environ.get("SENDGRID_API_KEY")
-        sender_email = os.environ.get("SENDER_EMAIL", "noreply@vasilisnetshield.com")
+        # Config is read once when email_service is imported
+        sg_api_key = SENDGRID_API_KEY
+        sender_email = SENDER_EMAIL or DEFAULT_SENDER
         
         if not sg_api_key:
             logger.warning("SendGrid API key not configured, skipping email notification")
             return False
         
-        sg = sendgrid.SendGridAPIClient(api_key=sg_api_key)
         message = Mail(
             from_email=Email(sender_email),
             to_emails=To(to_email),
@@ -58,7 +60,7 @@ async def send_notification_email(to_email: str, subject: str, body: str):
             plain_text_content=Content("text/plain", body)
         )
         
-        response = sg.send(message)
+        response = await send_sendgrid_message(message, sg_api_key)
         logger.info(f"Email sent to {to_email}, status: {response.status_code}")
         return response.status_code in [200, 201, 202]
     except Exception as e:
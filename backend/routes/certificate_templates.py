@@ -2,6 +2,8 @@
 Certificate Template Routes - Drag & Drop Certificate Editor
 """
 from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
@@ -10,6 +12,7 @@ import base64
 import io
 
 from models import UserRole
+from services.certificate_service import generate_certificate_preview, generate_certificate_from_template
 
 router = APIRouter(prefix="/certificate-templates", tags=["Certificate Templates"])
 
@@ -219,8 +222,6 @@ async def preview_certificate_template(template_id: str, request: Request):
     Generate a PDF preview of a certificate template with sample data.
     Returns the actual rendered PDF so preview matches final output exactly.
     """
-    from fastapi.responses import Response
-    from services.certificate_service import generate_certificate_preview
     
     await require_admin(request)
     db = get_db()
@@ -262,9 +263,12 @@ async def preview_certificate_template(template_id: str, request: Request):
         assets["logo"] = logo
     
     try:
-        pdf_bytes = generate_certificate_preview(template, assets)
-        return Response(
-            content=pdf_bytes,
+        # Render off the event loop straight into the buffer that is streamed
+        pdf_buffer = io.BytesIO()
+        await run_in_threadpool(generate_certificate_preview, template, assets, out=pdf_buffer)
+        pdf_buffer.seek(0)
+        return StreamingResponse(
+            pdf_buffer,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"inline; filename=preview_{template_id}.pdf"
@@ -280,8 +284,6 @@ async def preview_certificate_with_data(template_id: str, request: Request):
     Generate a PDF preview with custom placeholder data.
     Accepts JSON body with placeholder values.
     """
-    from fastapi.responses import Response
-    from services.certificate_service import generate_certificate_from_template
     
     await require_admin(request)
     db = get_db()
@@ -297,7 +299,6 @@ async def preview_certificate_with_data(template_id: str, request: Request):
         placeholders = {}
     
     # Default placeholders
-    from datetime import datetime, timezone
     default_placeholders = {
         "user_name": "John Doe",
         "user_email": "john.doe@example.com",
@@ -312,9 +313,15 @@ async def preview_certificate_with_data(template_id: str, request: Request):
     default_placeholders.update(placeholders)
     
     try:
-        pdf_bytes = generate_certificate_from_template(template, default_placeholders, include_footer=False)
-        return Response(
-            content=pdf_bytes,
+        # Render off the event loop straight into the buffer that is streamed
+        pdf_buffer = io.BytesIO()
+        await run_in_threadpool(
+            generate_certificate_from_template, template, default_placeholders,
+            include_footer=False, out=pdf_buffer
+        )
+        pdf_buffer.seek(0)
+        return StreamingResponse(
+            pdf_buffer,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"inline; filename=preview_{template_id}.pdf"
@@ -3,6 +3,7 @@ Certificate Routes - Training completion certificates
 """
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timezone
 from typing import Optional
 import io
@@ -173,31 +174,38 @@ async def generate_user_certificate(user_id: str, request: Request):
     if template_doc and template_doc.get("elements") and len(template_doc.get("elements", [])) > 0:
         try:
             logger.info(f"Using template '{template_doc.get('name')}' with {len(template_doc.get('elements', []))} elements")
-            pdf_bytes = generate_certificate_from_template(template_doc, placeholders)
+            pdf_buffer = io.BytesIO()
+            await run_in_threadpool(generate_certificate_from_template, template_doc, placeholders, out=pdf_buffer)
         except Exception as render_err:
             logger.error(f"Template rendering failed: {render_err}, falling back to default")
             # Fallback to default generator if rendering fails
-            pdf_bytes = generate_training_certificate(
+            pdf_buffer = io.BytesIO()
+            await run_in_threadpool(
+                generate_training_certificate,
                 user_name=user.get("name", "Unknown"),
                 user_email=user.get("email", ""),
                 modules_completed=modules_completed,
                 average_score=avg_score,
                 completion_date=latest_completion,
                 organization_name=org_name,
-                certificate_id=certificate_id
+                certificate_id=certificate_id,
+                out=pdf_buffer
             )
     else:
         if template_doc:
             logger.warning(f"Template '{template_doc.get('name')}' has no elements, using default certificate design")
         # Use original certificate design
-        pdf_bytes = generate_training_certificate(
+        pdf_buffer = io.BytesIO()
+        await run_in_threadpool(
+            generate_training_certificate,
             user_name=user.get("name", "Unknown"),
             user_email=user.get("email", ""),
             modules_completed=modules_completed,
             average_score=avg_score,
             completion_date=latest_completion,
             organization_name=org_name,
-            certificate_id=certificate_id
+            certificate_id=certificate_id,
+            out=pdf_buffer
         )
     
     # Store certificate record, including the template used (if any)
@@ -220,8 +228,9 @@ async def generate_user_certificate(user_id: str, request: Request):
     
     filename = f"certificate_{user.get('name', 'user').replace(' ', '_')}_{certificate_id}.pdf"
     
+    pdf_buffer.seek(0)
     return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+        pdf_buffer,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -339,30 +348,37 @@ async def generate_user_module_certificate(user_id: str, module_id: str, request
     if template_doc and template_doc.get("elements") and len(template_doc.get("elements", [])) > 0:
         try:
             logger.info(f"Using template '{template_doc.get('name')}' with {len(template_doc.get('elements', []))} elements for module certificate")
-            pdf_bytes = generate_certificate_from_template(template_doc, placeholders)
+            pdf_buffer = io.BytesIO()
+            await run_in_threadpool(generate_certificate_from_template, template_doc, placeholders, out=pdf_buffer)
         except Exception as render_err:
             logger.error(f"Template rendering failed for module certificate: {render_err}, falling back to default")
             # Fallback to default generator
-            pdf_bytes = generate_training_certificate(
+            pdf_buffer = io.BytesIO()
+            await run_in_threadpool(
+                generate_training_certificate,
                 user_name=user_doc.get("name", "Unknown"),
                 user_email=user_doc.get("email", ""),
                 modules_completed=[module_name],
                 average_score=score,
                 completion_date=completion_dt,
                 organization_name=org_name,
-                certificate_id=certificate_id
+                certificate_id=certificate_id,
+                out=pdf_buffer
             )
     else:
         if template_doc:
             logger.warning(f"Template '{template_doc.get('name')}' has no elements, using default certificate design for module")
-        pdf_bytes = generate_training_certificate(
+        pdf_buffer = io.BytesIO()
+        await run_in_threadpool(
+            generate_training_certificate,
             user_name=user_doc.get("name", "Unknown"),
             user_email=user_doc.get("email", ""),
             modules_completed=[module_name],
             average_score=score,
             completion_date=completion_dt,
             organization_name=org_name,
-            certificate_id=certificate_id
+            certificate_id=certificate_id,
+            out=pdf_buffer
         )
 
     # Store certificate record with module_id
@@ -405,8 +421,9 @@ async def generate_user_module_certificate(user_id: str, module_id: str, request
         logger.error(f"Failed to log certificate download: {e}")
 
     filename = f"certificate_{module_name.replace(' ', '_')}_{certificate_id}.pdf"
+    pdf_buffer.seek(0)
     return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+        pdf_buffer,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -265,8 +265,9 @@ async def rsvp_to_event(event_id: str, data: RSVPCreate):
     
     # Send confirmation email
     try:
-        from services.email_service import send_event_rsvp_confirmation
-        await send_event_rsvp_confirmation(
+        from services.email_service import enqueue_email, send_event_rsvp_confirmation
+        enqueue_email(
+            send_event_rsvp_confirmation,
             to_email=data.email,
             event_title=event["title"],
             event_date=event["start_date"],
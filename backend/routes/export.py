@@ -3,8 +3,8 @@ Export Routes - Reports in Excel and PDF format
 """
 from fastapi import APIRouter, HTTPException, Request, Response, Query
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timezone, timedelta
-import io
 import secrets
 
 from services.report_service import (
@@ -17,6 +17,9 @@ from models import UserRole
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
+# Chunk size used when streaming a generated report file back to the client
+REPORT_CHUNK_SIZE = 64 * 1024
+
 # Temporary download tokens (in-memory, would use Redis in production)
 download_tokens = {}
 
@@ -39,6 +42,16 @@ async def require_admin(request: Request) -> dict:
     return user
 
 
+def iter_report(report):
+    """Yield a generated report file in chunks, closing it once sent"""
+    with report:
+        while True:
+            chunk = report.read(REPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
 def generate_download_token(report_type: str, resource_id: str) -> str:
     """Generate a temporary download token valid for 5 minutes"""
     token = secrets.token_urlsafe(32)
@@ -131,12 +144,12 @@ async def download_phishing_excel(campaign_id: str, token: str = Query(...)):
     
     targets = await db.phishing_targets.find({"campaign_id": campaign_id}, {"_id": 0}).to_list(10000)
     stats = await get_campaign_stats(db, campaign_id)
-    excel_bytes = generate_phishing_campaign_excel(campaign, targets, stats)
+    excel_file = await run_in_threadpool(generate_phishing_campaign_excel, campaign, targets, stats)
     
     filename = f"phishing_report_{campaign.get('name', 'campaign').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
     
     return StreamingResponse(
-        io.BytesIO(excel_bytes),
+        iter_report(excel_file),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -158,12 +171,12 @@ async def download_phishing_pdf(campaign_id: str, token: str = Query(...)):
     stats = await get_campaign_stats(db, campaign_id)
     org = await db.organizations.find_one({"organization_id": campaign.get('organization_id')}, {"_id": 0})
     org_name = org.get('name') if org else None
-    pdf_bytes = generate_phishing_campaign_pdf(campaign, targets, stats, org_name)
+    pdf_file = await run_in_threadpool(generate_phishing_campaign_pdf, campaign, targets, stats, org_name)
     
     filename = f"phishing_report_{campaign.get('name', 'campaign').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
     
     return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+        iter_report(pdf_file),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -187,12 +200,12 @@ async def download_training_excel(token: str = Query(...), organization_id: str
     sessions = await db.training_sessions.find(query, {"_id": 0}).to_list(10000)
     all_users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(10000)
     users_map = {u["user_id"]: u for u in all_users}
-    excel_bytes = generate_training_report_excel(sessions, users_map)
+    excel_file = await run_in_threadpool(generate_training_report_excel, sessions, users_map)
     
     filename = f"training_report_{datetime.now().strftime('%Y%m%d')}.xlsx"
     
     return StreamingResponse(
-        io.BytesIO(excel_bytes),
+        iter_report(excel_file),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -219,13 +232,13 @@ async def export_phishing_campaign_excel(campaign_id: str, request: Request):
     stats = await get_campaign_stats(db, campaign_id)
     
     # Generate Excel
-    excel_bytes = generate_phishing_campaign_excel(campaign, targets, stats)
+    excel_file = await run_in_threadpool(generate_phishing_campaign_excel, campaign, targets, stats)
     
     # Create filename
     filename = f"phishing_report_{campaign.get('name', 'campaign').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
     
     return StreamingResponse(
-        io.BytesIO(excel_bytes),
+        iter_report(excel_file),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -253,13 +266,13 @@ async def export_phishing_campaign_pdf(campaign_id: str, request: Request):
     org_name = org.get('name') if org else None
     
     # Generate PDF
-    pdf_bytes = generate_phishing_campaign_pdf(campaign, targets, stats, org_name)
+    pdf_file = await run_in_threadpool(generate_phishing_campaign_pdf, campaign, targets, stats, org_name)
     
     # Create filename
     filename = f"phishing_report_{campaign.get('name', 'campaign').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
     
     return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+        iter_report(pdf_file),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -290,12 +303,12 @@ async def export_training_report_excel(
     users_map = {u["user_id"]: u for u in all_users}
     
     # Generate Excel
-    excel_bytes = generate_training_report_excel(sessions, users_map)
+    excel_file = await run_in_threadpool(generate_training_report_excel, sessions, users_map)
     
     filename = f"training_report_{datetime.now().strftime('%Y%m%d')}.xlsx"
     
     return StreamingResponse(
-        io.BytesIO(excel_bytes),
+        iter_report(excel_file),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
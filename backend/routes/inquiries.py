@@ -204,12 +204,13 @@ async def notify_super_admins_of_access_request(inquiry_data: dict):
             logger.warning("No super admins found to notify about access request")
             return
         
-        from services.email_service import send_access_request_notification
+        from services.email_service import enqueue_email, send_access_request_notification
         
-        # Send notification to each admin
+        # Queue a notification to each admin
         for admin in super_admins:
             try:
-                await send_access_request_notification(
+                enqueue_email(
+                    send_access_request_notification,
                     admin_email=admin.get("email"),
                     requester_name=inquiry_data.get("name", "Unknown"),
                     requester_email=inquiry_data.get("email"),
@@ -217,7 +218,7 @@ async def notify_super_admins_of_access_request(inquiry_data: dict):
                     message=inquiry_data.get("message"),
                     db=db
                 )
-                logger.info(f"Access request notification sent to {admin.get('email')}")
+                logger.info(f"Access request notification queued for {admin.get('email')}")
             except Exception as e:
                 logger.error(f"Failed to send notification to {admin.get('email')}: {e}")
         
@@ -326,8 +327,9 @@ async def create_inquiry(data: InquiryCreate, request: Request):
     
     # Also send contact form submission to info@vasilisnetshield.com
     try:
-        from services.email_service import send_contact_form_submission
-        await send_contact_form_submission(
+        from services.email_service import enqueue_email, send_contact_form_submission
+        enqueue_email(
+            send_contact_form_submission,
             name=data.name or "Anonymous",
             email=data.email,
             message=data.message,
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Request, Response, UploadFile, File
 from fastapi.responses import RedirectResponse, HTMLResponse
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from functools import lru_cache
 from datetime import datetime, timezone
 import uuid
 import secrets
@@ -24,7 +25,7 @@ from models import (
     PhishingTargetResponse, PhishingStatsResponse, UserRole
 )
 from services.phishing_service import (
-    generate_tracking_code, send_phishing_email,
+    generate_tracking_codes, send_phishing_campaign, launch_scheduled_phishing_campaign,
     record_email_open, record_link_click, get_campaign_stats
 )
 
@@ -261,14 +262,15 @@ async def create_campaign(data: PhishingCampaignCreate, request: Request):
     
     # Create target records with unique tracking codes
     targets = []
-    for u in target_users:
+    tracking_codes = generate_tracking_codes(len(target_users))
+    for u, tracking_code in zip(target_users, tracking_codes):
         target_doc = {
             "target_id": f"tgt_{uuid.uuid4().hex[:12]}",
             "campaign_id": campaign_id,
             "user_id": u["user_id"],
             "user_email": u["email"],
             "user_name": u["name"],
-            "tracking_code": generate_tracking_code(),
+            "tracking_code": tracking_code,
             "email_sent": False,
             "email_sent_at": None,
             "email_opened": False,
@@ -466,14 +468,15 @@ async def update_campaign(campaign_id: str, request: Request):
             ).to_list(10000)
             
             new_targets = []
-            for u in new_users:
+            tracking_codes = generate_tracking_codes(len(new_users))
+            for u, tracking_code in zip(new_users, tracking_codes):
                 target_doc = {
                     "target_id": f"tgt_{uuid.uuid4().hex[:12]}",
                     "campaign_id": campaign_id,
                     "user_id": u["user_id"],
                     "user_email": u["email"],
                     "user_name": u["name"],
-                    "tracking_code": generate_tracking_code(),
+                    "tracking_code": tracking_code,
                     "email_sent": False,
                     "email_sent_at": None,
                     "email_opened": False,
@@ -560,33 +563,34 @@ async def launch_campaign(campaign_id: str, request: Request):
         {"_id": 0}
     ).to_list(10000)
     
-    sent_count = 0
     errors = []
-    # Attempt to send to each target.  Only mark email_sent as true
+    sent_ids = []
+    # Send to all targets concurrently.  Only mark email_sent as true
     # when the send_phishing_email function returns success.  If the
     # email fails to send (e.g. SendGrid or SMTP error), the email_sent
     # flag will remain false so administrators can see accurate
     # statistics.
-    for target in targets:
-        try:
-            success = await send_phishing_email(db, target, template, api_url)
-            if not success:
-                errors.append(f"Failed to send to {target.get('user_email')}: send_phishing_email returned False")
-        except Exception as e:
-            success = False
-            errors.append(f"Exception sending to {target.get('user_email')}: {str(e)}")
-            logger.error(f"Exception sending phishing email to {target.get('user_email')}: {e}")
-        if success:
-            await db.phishing_targets.update_one(
-                {"target_id": target["target_id"]},
-                {
-                    "$set": {
-                        "email_sent": True,
-                        "email_sent_at": datetime.now(timezone.utc).isoformat()
-                    }
+    results = await send_phishing_campaign(db, targets, template, api_url)
+    for target, result in zip(targets, results):
+        if isinstance(result, Exception):
+            errors.append(f"Exception sending to {target.get('user_email')}: {str(result)}")
+            logger.error(f"Exception sending phishing email to {target.get('user_email')}: {result}")
+        elif not result:
+            errors.append(f"Failed to send to {target.get('user_email')}: send_phishing_email returned False")
+        else:
+            sent_ids.append(target["target_id"])
+    
+    if sent_ids:
+        await db.phishing_targets.update_many(
+            {"target_id": {"$in": sent_ids}},
+            {
+                "$set": {
+                    "email_sent": True,
+                    "email_sent_at": datetime.now(timezone.utc).isoformat()
                 }
-            )
-            sent_count += 1
+            }
+        )
+    sent_count = len(sent_ids)
     
     # Log any errors
     if errors:
@@ -687,71 +691,8 @@ async def check_scheduled_campaigns(request: Request):
     
     launched_count = 0
     for campaign in scheduled_campaigns:
-        # Get template
-        template = await db.phishing_templates.find_one(
-            {"template_id": campaign["template_id"]}, 
-            {"_id": 0}
-        )
-        if not template:
-            continue
-        
-        # Check for custom email template override
-        custom_email_template_id = campaign.get("custom_email_template_id")
-        if custom_email_template_id:
-            custom_email = await db.custom_email_templates.find_one({"id": custom_email_template_id}, {"_id": 0})
-            if custom_email:
-                # Override template with custom email content
-                template = {
-                    **template,
-                    "body_html": custom_email.get("html", template["body_html"]),
-                    "subject": custom_email.get("subject", template["subject"]),
-                    "name": custom_email.get("name", template.get("name"))
-                }
-                logger.info(f"Using custom email template for scheduled campaign {campaign['campaign_id']}")
-        
-        # Get base URL - use API URL for tracking links
-        import os
-        api_url = os.environ.get('API_URL', 'https://api.vasilisnetshield.com')
-        
-        # Update status to active
-        await db.phishing_campaigns.update_one(
-            {"campaign_id": campaign["campaign_id"]},
-            {
-                "$set": {
-                    "status": "active",
-                    "started_at": now.isoformat()
-                }
-            }
-        )
-        
-        # Get and send to targets
-        targets = await db.phishing_targets.find(
-            {"campaign_id": campaign["campaign_id"], "email_sent": False},
-            {"_id": 0}
-        ).to_list(10000)
-        
-        sent_count = 0
-        for target in targets:
-            success = await send_phishing_email(db, target, template, api_url)
-            if success:
-                await db.phishing_targets.update_one(
-                    {"target_id": target["target_id"]},
-                    {
-                        "$set": {
-                            "email_sent": True,
-                            "email_sent_at": now.isoformat()
-                        }
-                    }
-                )
-                sent_count += 1
-        
-        # Update campaign stats
-        await db.phishing_campaigns.update_one(
-            {"campaign_id": campaign["campaign_id"]},
-            {"$set": {"emails_sent": sent_count}}
-        )
-        
-        launched_count += 1
+        if await launch_scheduled_phishing_campaign(db, campaign, now.isoformat()):
+            launched_count += 1
     
     return {
         "message": f"Checked scheduled campaigns. Launched {launched_count} campaigns.",
@@ -1121,14 +1062,15 @@ async def duplicate_campaign(campaign_id: str, request: Request):
     # Copy targets with new IDs and tracking codes
     if original_targets:
         new_targets = []
-        for t in original_targets:
+        tracking_codes = generate_tracking_codes(len(original_targets))
+        for t, tracking_code in zip(original_targets, tracking_codes):
             new_target = {
                 "target_id": f"tgt_{uuid.uuid4().hex[:12]}",
                 "campaign_id": new_campaign_id,
                 "user_id": t["user_id"],
                 "user_email": t["user_email"],
                 "user_name": t["user_name"],
-                "tracking_code": generate_tracking_code(),
+                "tracking_code": tracking_code,
                 "email_sent": False,
                 "email_sent_at": None,
                 "email_opened": False,
@@ -1189,6 +1131,310 @@ async def track_email_open(tracking_code: str, request: Request):
     return Response(content=pixel, media_type="image/gif")
 
 
+_SCENARIO_MESSAGES = {
+    "phishing_email": {
+        "title": "Phishing Email Detected",
+        "risk": "Your login credentials, personal data, or financial information could have been stolen.",
+        "icon": "&#9888;",  # Warning sign
+        "color": "#FF6B6B"
+    },
+    "qr_code_phishing": {
+        "title": "QR Code Phishing Attempt",
+        "risk": "Malicious websites could have harvested your credentials or installed malware.",
+        "icon": "&#9888;",
+        "color": "#9C27B0"
+    },
+    "bec_scenario": {
+        "title": "Business Email Compromise",
+        "risk": "Unauthorized wire transfers, data theft, or impersonation attacks could have occurred.",
+        "icon": "&#128176;",  # Money bag
+        "color": "#FF5722"
+    },
+    "usb_drop": {
+        "title": "USB Drop Attack",
+        "risk": "Malware could have been installed on your device, compromising the entire network.",
+        "icon": "&#128187;",  # Computer
+        "color": "#00BCD4"
+    },
+    "mfa_fatigue": {
+        "title": "MFA Fatigue Attack",
+        "risk": "Your account could have been compromised despite multi-factor authentication.",
+        "icon": "&#128274;",  # Lock
+        "color": "#E91E63"
+    },
+    "data_handling_trap": {
+        "title": "Data Handling Violation",
+        "risk": "Sensitive company or customer data could have been exposed to unauthorized parties.",
+        "icon": "&#128196;",  # Document
+        "color": "#795548"
+    },
+    "ransomware_readiness": {
+        "title": "Ransomware Attempt",
+        "risk": "Your files and entire systems could have been encrypted and held for ransom.",
+        "icon": "&#128274;",  # Lock
+        "color": "#f44336"
+    },
+    "shadow_it_detection": {
+        "title": "Shadow IT Risk",
+        "risk": "Unauthorized applications could have exposed company data or created compliance violations.",
+        "icon": "&#9729;",  # Cloud
+        "color": "#607D8B"
+    }
+}
+
+
+# The default awareness page only varies by scenario, frontend URL and the
+# clicking user's name, so render each scenario once and splice the name in.
+_USER_NAME_SLOT = '\x00USER_NAME\x00'
+
+
+@lru_cache(maxsize=64)
+def _awareness_page_parts(scenario_type: str, frontend_url: str) -> Tuple[str, str]:
+    """Render the default awareness page, split around the user name slot"""
+    msg = _SCENARIO_MESSAGES.get(scenario_type, _SCENARIO_MESSAGES["phishing_email"])
+    training_url = f"{frontend_url}/training"
+    
+    page = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Security Alert | Vasilis NetShield</title>
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
+        <style>
+            * {{ box-sizing: border-box; margin: 0; padding: 0; }}
+            body {{ 
+                font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif; 
+                background: linear-gradient(180deg, #0D1117 0%, #161B22 50%, #0D1117 100%);
+                min-height: 100vh;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                padding: 20px;
+            }}
+            .container {{ 
+                background: linear-gradient(145deg, #161B22 0%, #1C2128 100%);
+                padding: 50px 40px; 
+                border-radius: 24px; 
+                box-shadow: 0 25px 50px -12px rgba(0,0,0,0.5), 0 0 0 1px rgba(255,255,255,0.05);
+                max-width: 580px;
+                width: 100%;
+                text-align: center;
+                position: relative;
+                overflow: hidden;
+            }}
+            .container::before {{
+                content: '';
+                position: absolute;
+                top: 0;
+                left: 0;
+                right: 0;
+                height: 4px;
+                background: linear-gradient(90deg, {msg['color']}, #D4A836);
+            }}
+            .icon-wrapper {{
+                width: 100px;
+                height: 100px;
+                background: linear-gradient(135deg, {msg['color']}20, {msg['color']}10);
+                border: 2px solid {msg['color']}40;
+                border-radius: 50%;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                margin: 0 auto 25px;
+                animation: pulse 2s infinite;
+            }}
+            @keyframes pulse {{
+                0%, 100% {{ box-shadow: 0 0 0 0 {msg['color']}40; }}
+                50% {{ box-shadow: 0 0 0 15px {msg['color']}00; }}
+            }}
+            .icon {{ 
+                font-size: 48px;
+            }}
+            h1 {{ 
+                color: {msg['color']}; 
+                font-size: 32px;
+                font-weight: 700;
+                margin-bottom: 8px;
+                letter-spacing: -0.5px;
+            }}
+            .subtitle {{
+                color: #8B949E;
+                font-size: 16px;
+                margin-bottom: 35px;
+            }}
+            .alert-card {{ 
+                background: linear-gradient(135deg, {msg['color']}15 0%, {msg['color']}05 100%);
+                border: 1px solid {msg['color']}30;
+                padding: 24px;
+                border-radius: 16px;
+                margin: 0 0 25px 0;
+                text-align: left;
+            }}
+            .alert-card h3 {{
+                color: {msg['color']};
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 12px;
+                display: flex;
+                align-items: center;
+                gap: 10px;
+            }}
+            .alert-card p {{
+                color: #C9D1D9;
+                line-height: 1.7;
+                font-size: 15px;
+            }}
+            .user-highlight {{
+                color: #D4A836;
+                font-weight: 600;
+            }}
+            .risk-section {{
+                background: #0D1117;
+                border: 1px solid #30363D;
+                border-radius: 16px;
+                padding: 24px;
+                margin-bottom: 30px;
+            }}
+            .risk-section h4 {{
+                color: #D4A836;
+                font-size: 16px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                display: flex;
+                align-items: center;
+                gap: 8px;
+            }}
+            .risk-list {{
+                list-style: none;
+                text-align: left;
+            }}
+            .risk-list li {{
+                color: #8B949E;
+                padding: 10px 0;
+                padding-left: 28px;
+                position: relative;
+                font-size: 14px;
+                border-bottom: 1px solid #21262D;
+            }}
+            .risk-list li:last-child {{
+                border-bottom: none;
+            }}
+            .risk-list li::before {{
+                content: '⚠';
+                position: absolute;
+                left: 0;
+                color: {msg['color']};
+            }}
+            .countdown-box {{
+                background: linear-gradient(135deg, #D4A836, #C49A30);
+                color: #0D1117;
+                padding: 18px 35px;
+                border-radius: 12px;
+                font-weight: 600;
+                display: inline-block;
+                margin-bottom: 25px;
+                font-size: 15px;
+                box-shadow: 0 4px 15px rgba(212, 168, 54, 0.3);
+            }}
+            .countdown-box span {{
+                font-size: 26px;
+                font-weight: 700;
+            }}
+            .btn {{
+                background: linear-gradient(135deg, #D4A836, #C49A30);
+                color: #0D1117;
+                padding: 16px 45px;
+                border: none;
+                border-radius: 12px;
+                font-size: 16px;
+                font-weight: 600;
+                cursor: pointer;
+                text-decoration: none;
+                display: inline-block;
+                transition: all 0.3s ease;
+                box-shadow: 0 4px 15px rgba(212, 168, 54, 0.3);
+            }}
+            .btn:hover {{
+                transform: translateY(-3px);
+                box-shadow: 0 8px 25px rgba(212, 168, 54, 0.4);
+            }}
+            .footer {{
+                margin-top: 35px;
+                padding-top: 25px;
+                border-top: 1px solid #21262D;
+            }}
+            .footer p {{
+                color: #484F58;
+                font-size: 13px;
+            }}
+            .footer .brand {{
+                color: #6E7681;
+                font-weight: 500;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="icon-wrapper">
+                <span class="icon">{msg['icon']}</span>
+            </div>
+            <h1>{msg['title']}</h1>
+            <p class="subtitle">This was a simulated security test</p>
+            
+            <div class="alert-card">
+                <h3>⚠️ You Clicked a Test Link</h3>
+                <p>
+                    Hello <span class="user-highlight">{_USER_NAME_SLOT}</span>, this was a security awareness exercise 
+                    conducted by your organization. In a real attack scenario, your actions could have had serious consequences.
+                </p>
+            </div>
+            
+            <div class="risk-section">
+                <h4>💡 What Could Have Happened</h4>
+                <ul class="risk-list">
+                    <li>{msg['risk']}</li>
+                    <li>Attackers could have gained access to your account</li>
+                    <li>Sensitive data could have been compromised</li>
+                    <li>Malware could have been installed on your device</li>
+                </ul>
+            </div>
+            
+            <div class="countdown-box">
+                Continue to training in <span id="timer">10</span>s
+            </div>
+            
+            <br><br>
+            
+            <a href="{training_url}" class="btn" id="trainingBtn">Start Training Now</a>
+            
+            <div class="footer">
+                <p class="brand">Vasilis NetShield Security Training</p>
+                <p>Building cyber-aware organizations</p>
+            </div>
+        </div>
+        
+        <script>
+            // Simple countdown timer. We no longer auto‑redirect when the
+            // timer reaches zero.  Users can click the "Start Training Now"
+            // button at any time to proceed to their training dashboard.
+            let seconds = 10;
+            const timer = document.getElementById('timer');
+            const countdown = setInterval(() => {{
+                seconds--;
+                timer.textContent = seconds;
+                if (seconds <= 0) {{
+                    clearInterval(countdown);
+                }}
+            }}, 1000);
+        </script>
+    </body>
+    </html>
+    """
+    head, tail = page.split(_USER_NAME_SLOT)
+    return head, tail
+
+
 @router.get("/track/click/{tracking_code}")
 async def track_link_click(tracking_code: str, request: Request, cred_submitted: Optional[str] = None):
     """Track when a phishing link is clicked"""
@@ -1211,6 +1457,8 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
     campaign = None  # Initialize campaign variable to avoid UnboundLocalError
     
     if result:
+        # One timestamp for the click and every record it triggers
+        now_iso = result["clicked_at"]
         campaign = result.get("campaign", {})
         target = result.get("target", {})
         user_name = target.get("user_name", "User")
@@ -1241,28 +1489,23 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                 "scenario_type": scenario_type,
                 "failure_type": "clicked_phishing_link",
                 "tracking_code": tracking_code,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now_iso,
                 "status": "pending_training"  # Will be updated when user completes training
             }
             await db.training_failures.insert_one(failure_record)
             
             # ===== SEND DISCORD NOTIFICATION =====
             try:
-                from services.notification_service import notify_phishing_click, get_org_webhook
+                from services.notification_service import (
+                    get_org_notification_info, notify_phishing_click, notify_in_background
+                )
                 
                 # Get organization name and webhook
-                org_name = None
-                org_webhook = None
-                if organization_id:
-                    org_doc = await db.organizations.find_one(
-                        {"organization_id": organization_id},
-                        {"_id": 0, "name": 1, "discord_webhook_url": 1}
-                    )
-                    if org_doc:
-                        org_name = org_doc.get("name")
-                        org_webhook = org_doc.get("discord_webhook_url")
+                org_name, org_webhook = await get_org_notification_info(db, organization_id)
                 
-                await notify_phishing_click(
+                # Posted in the background so the redirect doesn't wait on Discord
+                notify_in_background(
+                    notify_phishing_click,
                     user_name=user_name,
                     user_email=user_email,
                     organization_name=org_name or "Unknown",
@@ -1272,30 +1515,33 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                     org_webhook_url=org_webhook,
                     db=db
                 )
-                logger.info(f"Discord notification sent for phishing click: {user_email}")
+                logger.info(f"Discord notification queued for phishing click: {user_email}")
             except Exception as discord_err:
                 logger.warning(f"Failed to send Discord notification: {discord_err}")
             
             # ===== AUTOMATIC RETRAINING FLOW =====
             try:
                 from services.email_service import (
-                    send_retraining_email, 
-                    send_training_failure_notification
+                    buffer_training_failure,
+                    enqueue_email,
+                    send_retraining_email
                 )
                 
-                # 1. Send retraining email to the user
-                await send_retraining_email(
+                # 1. Send retraining email to the user. Emails on the click
+                #    path are queued so the redirect doesn't wait on SendGrid.
+                enqueue_email(
+                    send_retraining_email,
                     user_email=user_email,
                     user_name=user_name,
                     scenario_type=scenario_type,
                     db=db
                 )
-                logger.info(f"Retraining email sent to {user_email}")
+                logger.info(f"Retraining email queued for {user_email}")
                 
                 # 2. Reset user's training progress for this scenario
                 await db.training_progress.update_many(
                     {"user_id": user_id, "scenario_type": scenario_type},
-                    {"$set": {"status": "reset", "reset_at": datetime.now(timezone.utc).isoformat()}}
+                    {"$set": {"status": "reset", "reset_at": now_iso}}
                 )
                 logger.info(f"Training progress reset for {user_email}")
                 
@@ -1317,26 +1563,23 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                     ).to_list(100)
                     admin_emails.extend([a["email"] for a in org_admins])
                 
-                # Get organization name
-                org_name = None
-                if organization_id:
-                    org_doc = await db.organizations.find_one(
-                        {"organization_id": organization_id},
-                        {"_id": 0, "name": 1}
-                    )
-                    org_name = org_doc.get("name") if org_doc else None
+                # Get organization name (served from the notification cache)
+                from services.notification_service import get_org_notification_info
+                org_name, _ = await get_org_notification_info(db, organization_id)
                 
                 # Send notification to all admins
                 if admin_emails:
-                    await send_training_failure_notification(
+                    # Batched with other failures for the same admins into
+                    # one email per TRAINING_FAILURE_DIGEST_WINDOW
+                    await buffer_training_failure(
+                        db,
                         admin_emails=list(set(admin_emails)),  # Remove duplicates
                         user_name=user_name,
                         user_email=user_email,
                         organization_name=org_name,
-                        scenario_type=scenario_type,
-                        db=db
+                        scenario_type=scenario_type
                     )
-                    logger.info(f"Training failure notification sent to {len(admin_emails)} admins")
+                    logger.info(f"Training failure notification queued for {len(admin_emails)} admins")
 
                 # 4. Automatically create new training sessions (reassign) for the user
                 #    Get all active modules and assign them.  This ensures the user
@@ -1372,7 +1615,7 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                                     "correct_answers": 0,
                                     "current_scenario_index": 0,
                                     "answers": [],
-                                    "started_at": datetime.now(timezone.utc).isoformat(),
+                                    "started_at": now_iso,
                                     "completed_at": None
                                 }
                                 await db.training_sessions.insert_one(session_doc)
@@ -1402,7 +1645,7 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                                 "correct_answers": 0,
                                 "current_scenario_index": 0,
                                 "answers": [],
-                                "started_at": datetime.now(timezone.utc).isoformat(),
+                                "started_at": now_iso,
                                 "completed_at": None
                             }
                             await db.training_sessions.insert_one(session_doc)
@@ -1411,6 +1654,7 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                     # Send training assignment notification email
                     try:
                         from services.phishing_service import send_training_assignment_email
+                        from services.email_service import FRONTEND_URL
                         assigned_mod = None
                         if assigned_module_id:
                             assigned_mod = await db.training_modules.find_one({"module_id": assigned_module_id}, {"_id": 0, "name": 1})
@@ -1418,9 +1662,9 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
                             assigned_mod = await db.training_modules.find_one({"is_active": True}, {"_id": 0, "name": 1})
                         if assigned_mod:
                             # Use FRONTEND_URL for training links, not the API URL
-                            frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
-                            training_url = f"{frontend_url}/training"
-                            await send_training_assignment_email(
+                            training_url = f"{FRONTEND_URL}/training"
+                            enqueue_email(
+                                send_training_assignment_email,
                                 user_email=user_email,
                                 user_name=user_name,
                                 module_name=assigned_mod.get("name", "Security Training"),
@@ -1649,303 +1893,10 @@ async def track_link_click(tracking_code: str, request: Request, cred_submitted:
         custom_html = custom_html.replace("{{CAMPAIGN_NAME}}", campaign.get("name", "Security Test") if campaign else "Security Test")
         return HTMLResponse(content=custom_html)
     
-    # Build personalized landing page with auto-redirect
-    scenario_messages = {
-        "phishing_email": {
-            "title": "Phishing Email Detected",
-            "risk": "Your login credentials, personal data, or financial information could have been stolen.",
-            "icon": "&#9888;",  # Warning sign
-            "color": "#FF6B6B"
-        },
-        "qr_code_phishing": {
-            "title": "QR Code Phishing Attempt",
-            "risk": "Malicious websites could have harvested your credentials or installed malware.",
-            "icon": "&#9888;",
-            "color": "#9C27B0"
-        },
-        "bec_scenario": {
-            "title": "Business Email Compromise",
-            "risk": "Unauthorized wire transfers, data theft, or impersonation attacks could have occurred.",
-            "icon": "&#128176;",  # Money bag
-            "color": "#FF5722"
-        },
-        "usb_drop": {
-            "title": "USB Drop Attack",
-            "risk": "Malware could have been installed on your device, compromising the entire network.",
-            "icon": "&#128187;",  # Computer
-            "color": "#00BCD4"
-        },
-        "mfa_fatigue": {
-            "title": "MFA Fatigue Attack",
-            "risk": "Your account could have been compromised despite multi-factor authentication.",
-            "icon": "&#128274;",  # Lock
-            "color": "#E91E63"
-        },
-        "data_handling_trap": {
-            "title": "Data Handling Violation",
-            "risk": "Sensitive company or customer data could have been exposed to unauthorized parties.",
-            "icon": "&#128196;",  # Document
-            "color": "#795548"
-        },
-        "ransomware_readiness": {
-            "title": "Ransomware Attempt",
-            "risk": "Your files and entire systems could have been encrypted and held for ransom.",
-            "icon": "&#128274;",  # Lock
-            "color": "#f44336"
-        },
-        "shadow_it_detection": {
-            "title": "Shadow IT Risk",
-            "risk": "Unauthorized applications could have exposed company data or created compliance violations.",
-            "icon": "&#9729;",  # Cloud
-            "color": "#607D8B"
-        }
-    }
-    
-    msg = scenario_messages.get(scenario_type, scenario_messages["phishing_email"])
-    
-    # Get frontend URL for training link
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
-    training_url = f"{frontend_url}/training"
-    
     # Default landing page - phishing awareness message with modern dark theme
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Security Alert | Vasilis NetShield</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-            body {{ 
-                font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif; 
-                background: linear-gradient(180deg, #0D1117 0%, #161B22 50%, #0D1117 100%);
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                padding: 20px;
-            }}
-            .container {{ 
-                background: linear-gradient(145deg, #161B22 0%, #1C2128 100%);
-                padding: 50px 40px; 
-                border-radius: 24px; 
-                box-shadow: 0 25px 50px -12px rgba(0,0,0,0.5), 0 0 0 1px rgba(255,255,255,0.05);
-                max-width: 580px;
-                width: 100%;
-                text-align: center;
-                position: relative;
-                overflow: hidden;
-            }}
-            .container::before {{
-                content: '';
-                position: absolute;
-                top: 0;
-                left: 0;
-                right: 0;
-                height: 4px;
-                background: linear-gradient(90deg, {msg['color']}, #D4A836);
-            }}
-            .icon-wrapper {{
-                width: 100px;
-                height: 100px;
-                background: linear-gradient(135deg, {msg['color']}20, {msg['color']}10);
-                border: 2px solid {msg['color']}40;
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                margin: 0 auto 25px;
-                animation: pulse 2s infinite;
-            }}
-            @keyframes pulse {{
-                0%, 100% {{ box-shadow: 0 0 0 0 {msg['color']}40; }}
-                50% {{ box-shadow: 0 0 0 15px {msg['color']}00; }}
-            }}
-            .icon {{ 
-                font-size: 48px;
-            }}
-            h1 {{ 
-                color: {msg['color']}; 
-                font-size: 32px;
-                font-weight: 700;
-                margin-bottom: 8px;
-                letter-spacing: -0.5px;
-            }}
-            .subtitle {{
-                color: #8B949E;
-                font-size: 16px;
-                margin-bottom: 35px;
-            }}
-            .alert-card {{ 
-                background: linear-gradient(135deg, {msg['color']}15 0%, {msg['color']}05 100%);
-                border: 1px solid {msg['color']}30;
-                padding: 24px;
-                border-radius: 16px;
-                margin: 0 0 25px 0;
-                text-align: left;
-            }}
-            .alert-card h3 {{
-                color: {msg['color']};
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 12px;
-                display: flex;
-                align-items: center;
-                gap: 10px;
-            }}
-            .alert-card p {{
-                color: #C9D1D9;
-                line-height: 1.7;
-                font-size: 15px;
-            }}
-            .user-highlight {{
-                color: #D4A836;
-                font-weight: 600;
-            }}
-            .risk-section {{
-                background: #0D1117;
-                border: 1px solid #30363D;
-                border-radius: 16px;
-                padding: 24px;
-                margin-bottom: 30px;
-            }}
-            .risk-section h4 {{
-                color: #D4A836;
-                font-size: 16px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }}
-            .risk-list {{
-                list-style: none;
-                text-align: left;
-            }}
-            .risk-list li {{
-                color: #8B949E;
-                padding: 10px 0;
-                padding-left: 28px;
-                position: relative;
-                font-size: 14px;
-                border-bottom: 1px solid #21262D;
-            }}
-            .risk-list li:last-child {{
-                border-bottom: none;
-            }}
-            .risk-list li::before {{
-                content: '⚠';
-                position: absolute;
-                left: 0;
-                color: {msg['color']};
-            }}
-            .countdown-box {{
-                background: linear-gradient(135deg, #D4A836, #C49A30);
-                color: #0D1117;
-                padding: 18px 35px;
-                border-radius: 12px;
-                font-weight: 600;
-                display: inline-block;
-                margin-bottom: 25px;
-                font-size: 15px;
-                box-shadow: 0 4px 15px rgba(212, 168, 54, 0.3);
-            }}
-            .countdown-box span {{
-                font-size: 26px;
-                font-weight: 700;
-            }}
-            .btn {{
-                background: linear-gradient(135deg, #D4A836, #C49A30);
-                color: #0D1117;
-                padding: 16px 45px;
-                border: none;
-                border-radius: 12px;
-                font-size: 16px;
-                font-weight: 600;
-                cursor: pointer;
-                text-decoration: none;
-                display: inline-block;
-                transition: all 0.3s ease;
-                box-shadow: 0 4px 15px rgba(212, 168, 54, 0.3);
-            }}
-            .btn:hover {{
-                transform: translateY(-3px);
-                box-shadow: 0 8px 25px rgba(212, 168, 54, 0.4);
-            }}
-            .footer {{
-                margin-top: 35px;
-                padding-top: 25px;
-                border-top: 1px solid #21262D;
-            }}
-            .footer p {{
-                color: #484F58;
-                font-size: 13px;
-            }}
-            .footer .brand {{
-                color: #6E7681;
-                font-weight: 500;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="icon-wrapper">
-                <span class="icon">{msg['icon']}</span>
-            </div>
-            <h1>{msg['title']}</h1>
-            <p class="subtitle">This was a simulated security test</p>
-            
-            <div class="alert-card">
-                <h3>⚠️ You Clicked a Test Link</h3>
-                <p>
-                    Hello <span class="user-highlight">{escape_html(user_name)}</span>, this was a security awareness exercise 
-                    conducted by your organization. In a real attack scenario, your actions could have had serious consequences.
-                </p>
-            </div>
-            
-            <div class="risk-section">
-                <h4>💡 What Could Have Happened</h4>
-                <ul class="risk-list">
-                    <li>{msg['risk']}</li>
-                    <li>Attackers could have gained access to your account</li>
-                    <li>Sensitive data could have been compromised</li>
-                    <li>Malware could have been installed on your device</li>
-                </ul>
-            </div>
-            
-            <div class="countdown-box">
-                Continue to training in <span id="timer">10</span>s
-            </div>
-            
-            <br><br>
-            
-            <a href="{training_url}" class="btn" id="trainingBtn">Start Training Now</a>
-            
-            <div class="footer">
-                <p class="brand">Vasilis NetShield Security Training</p>
-                <p>Building cyber-aware organizations</p>
-            </div>
-        </div>
-        
-        <script>
-            // Simple countdown timer. We no longer auto‑redirect when the
-            // timer reaches zero.  Users can click the "Start Training Now"
-            // button at any time to proceed to their training dashboard.
-            let seconds = 10;
-            const timer = document.getElementById('timer');
-            const countdown = setInterval(() => {{
-                seconds--;
-                timer.textContent = seconds;
-                if (seconds <= 0) {{
-                    clearInterval(countdown);
-                }}
-            }}, 1000);
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html)
+    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
+    head, tail = _awareness_page_parts(scenario_type, frontend_url)
+    return HTMLResponse(content=head + escape_html(user_name) + tail)
 
 
 # ============== TRAINING FAILURES API ==============
@@ -2143,24 +2094,19 @@ async def track_credential_submission(tracking_code: str, request: Request):
         {"_id": 0, "name": 1, "organization_id": 1}
     )
     
-    org_name = "Unknown"
-    org_webhook = None
-    if campaign and campaign.get("organization_id"):
-        org = await db.organizations.find_one(
-            {"organization_id": campaign.get("organization_id")},
-            {"_id": 0, "name": 1, "discord_webhook_url": 1}
-        )
-        if org:
-            org_name = org.get("name", "Unknown")
-            org_webhook = org.get("discord_webhook_url")
-    
     # Send Discord notification
     try:
-        from services.notification_service import notify_credential_submission
-        await notify_credential_submission(
+        from services.notification_service import (
+            get_org_notification_info, notify_credential_submission, notify_in_background
+        )
+        org_name, org_webhook = await get_org_notification_info(
+            db, campaign.get("organization_id") if campaign else None
+        )
+        notify_in_background(
+            notify_credential_submission,
             user_name=target.get("user_name", "Unknown"),
             user_email=target.get("user_email", "Unknown"),
-            organization_name=org_name,
+            organization_name=org_name or "Unknown",
             campaign_name=campaign.get("name") if campaign else "Unknown",
             org_webhook_url=org_webhook,
             db=db
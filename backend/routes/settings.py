@@ -6,6 +6,9 @@ import base64
 import io
 from PIL import Image
 
+from services.email_service import invalidate_branding_cache
+from services.notification_service import invalidate_webhook_cache
+
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
 
@@ -297,6 +300,8 @@ async def update_branding(data: BrandingUpdate, request: Request):
         {"$set": update_data},
         upsert=True
     )
+    invalidate_branding_cache()
+    invalidate_webhook_cache()
     
     return await get_branding()
 
@@ -348,6 +353,7 @@ async def upload_logo(request: Request, file: UploadFile = File(...)):
         },
         upsert=True
     )
+    invalidate_branding_cache()
     
     # Calculate savings
     savings_percent = round((1 - optimized_size / original_size) * 100, 1) if original_size > 0 else 0
@@ -378,6 +384,7 @@ async def delete_logo(request: Request):
             }
         }
     )
+    invalidate_branding_cache()
     
     return {"message": "Logo removed"}
 
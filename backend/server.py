@@ -4,6 +4,7 @@ from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
 import logging
 import re
@@ -369,7 +370,7 @@ async def login(data: UserLogin, request: Request):
         if locked:
             # Send email notification to admins about the lockout
             try:
-                from services.email_service import send_account_lockout_notification
+                from services.email_service import enqueue_email, send_account_lockout_notification
                 # Get all super_admin emails
                 admin_users = await db.users.find(
                     {"role": "super_admin", "is_active": True}, 
@@ -377,7 +378,9 @@ async def login(data: UserLogin, request: Request):
                 ).to_list(50)
                 admin_emails = [u["email"] for u in admin_users]
                 if admin_emails:
-                    await send_account_lockout_notification(
+                    # Queued so the 423 goes back without waiting on SendGrid
+                    enqueue_email(
+                        send_account_lockout_notification,
                         admin_emails=admin_emails,
                         locked_email=data.email,
                         ip_address=client_ip,
@@ -979,6 +982,9 @@ async def update_organization(org_id: str, data: OrganizationUpdate, user: dict
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Organization not found")
+    if 'discord_webhook_url' in update_data or 'name' in update_data:
+        from services.notification_service import invalidate_webhook_cache
+        invalidate_webhook_cache(org_id)
     
     return await get_organization(org_id, user)
 
@@ -987,6 +993,8 @@ async def delete_organization(org_id: str, user: dict = Depends(require_super_ad
     result = await db.organizations.delete_one({"organization_id": org_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Organization not found")
+    from services.notification_service import invalidate_webhook_cache
+    invalidate_webhook_cache(org_id)
     
     # Unassign users from this org
     await db.users.update_many(
@@ -3905,9 +3913,48 @@ async def startup_event():
     from routes.news_feeds import refresh_all_feeds_loop
     _asyncio.create_task(refresh_all_feeds_loop(db))
     logger.info("RSS background refresh loop started")
+    if db is not None:
+        try:
+            await ensure_cron_indexes(db)
+        except Exception as e:
+            logger.error(f"Failed to create cron indexes: {e}")
+        try:
+            from services.notification_service import ensure_notification_indexes
+            await ensure_notification_indexes(db)
+        except Exception as e:
+            logger.error(f"Failed to create notification indexes: {e}")
+        try:
+            from services.phishing_service import ensure_phishing_indexes
+            await ensure_phishing_indexes(db)
+        except Exception as e:
+            logger.error(f"Failed to create phishing indexes: {e}")
+        try:
+            from services.email_service import ensure_email_indexes
+            await ensure_email_indexes(db)
+        except Exception as e:
+            logger.error(f"Failed to create email indexes: {e}")
+        _asyncio.create_task(scheduled_campaigns_loop(db))
+        logger.info("Scheduled campaign launcher started")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    from services.email_service import close_http_client, drain_mail_queue, flush_training_failures
+    from services.notification_service import (
+        close_http_client as close_discord_client, drain_background_notifications
+    )
+    from services.phishing_service import close_smtp_connections
+    # Queued jobs still read branding and webhooks from Mongo, so drain them
+    # first, then close the outbound pools, and the database client last
+    if db is not None:
+        try:
+            await flush_training_failures(db)
+        except Exception as e:
+            logger.error(f"Failed to send buffered training failures: {e}")
+    await drain_mail_queue()
+    await drain_background_notifications()
+    await close_http_client()
+    await close_discord_client()
+    await close_smtp_connections()
     if client:
         client.close()
 
@@ -3915,6 +3962,128 @@ async def shutdown_db_client():
 # ============== CRON ENDPOINTS ==============
 # These endpoints are designed to be called by Vercel Cron Jobs or similar schedulers
 
+# (type label, collection) pairs swept for scheduled launches
+SCHEDULED_CAMPAIGN_COLLECTIONS = (("phishing", "phishing_campaigns"), ("ad", "ad_campaigns"))
+# Upper bound on how long the in-process launcher sleeps, so campaigns
+# scheduled after it went to sleep are still picked up promptly
+SCHEDULED_CAMPAIGN_MAX_SLEEP = 300
+# Floor on that sleep, so campaigns falling due close together are launched
+# in one sweep rather than one wake-up each
+SCHEDULED_CAMPAIGN_MIN_SLEEP = 5
+
+
+async def ensure_cron_indexes(database):
+    """Create the indexes the cron sweeps filter on (idempotent)."""
+    import asyncio as _asyncio
+    await _asyncio.gather(
+        *(
+            database[collection].create_index([("status", 1), ("scheduled_at", 1)])
+            for _, collection in SCHEDULED_CAMPAIGN_COLLECTIONS
+        ),
+        # Password-expiry sweep filters active users
+        database.users.create_index([("is_active", 1), ("password_changed_at", 1)]),
+    )
+
+
+async def _launch_due_in_collection(database, campaign_type: str, collection: str, now_iso: str) -> list:
+    due = {"status": "scheduled", "scheduled_at": {"$lte": now_iso}}
+    if collection == "phishing_campaigns":
+        # Phishing campaigns send their emails as part of the launch, so
+        # they go through the same service call as the admin sweep
+        from services.phishing_service import launch_scheduled_phishing_campaign
+        launched = []
+        for campaign in await database[collection].find(due, {"_id": 0}).to_list(100):
+            if await launch_scheduled_phishing_campaign(database, campaign, now_iso):
+                launched.append({"type": campaign_type, "id": campaign["campaign_id"], "name": campaign.get("name")})
+        return launched
+    
+    campaigns = await database[collection].find(
+        due, {"_id": 0, "campaign_id": 1, "name": 1}
+    ).to_list(100)
+    if not campaigns:
+        return []
+    
+    # One round trip for the whole batch. The status guard keeps the cron
+    # endpoint and the background launcher from re-launching a campaign.
+    result = await database[collection].bulk_write([
+        UpdateOne(
+            {"campaign_id": campaign["campaign_id"], "status": "scheduled"},
+            {"$set": {"status": "active", "started_at": now_iso}}
+        )
+        for campaign in campaigns
+    ], ordered=False)
+    if not result.modified_count:
+        return []
+    
+    # Report only the campaigns this call flipped, not ones a concurrent
+    # sweep launched between the find and the write
+    launched = await database[collection].find(
+        {
+            "campaign_id": {"$in": [campaign["campaign_id"] for campaign in campaigns]},
+            "status": "active",
+            "started_at": now_iso
+        },
+        {"_id": 0, "campaign_id": 1, "name": 1}
+    ).to_list(100)
+    return [
+        {"type": campaign_type, "id": campaign["campaign_id"], "name": campaign.get("name")}
+        for campaign in launched
+    ]
+
+
+async def launch_due_campaigns(database, now_iso: str) -> list:
+    """Flip every scheduled campaign whose scheduled_at has passed to active."""
+    import asyncio as _asyncio
+    results = await _asyncio.gather(*(
+        _launch_due_in_collection(database, campaign_type, collection, now_iso)
+        for campaign_type, collection in SCHEDULED_CAMPAIGN_COLLECTIONS
+    ))
+    return [campaign for launched in results for campaign in launched]
+
+
+async def scheduled_campaigns_loop(database):
+    """Background task that launches scheduled campaigns as they fall due.
+
+    Instead of rescanning on a fixed tick it looks up the earliest
+    `scheduled_at` still in the future (an index range scan) and sleeps until
+    then, between SCHEDULED_CAMPAIGN_MIN_SLEEP and SCHEDULED_CAMPAIGN_MAX_SLEEP.
+    Overdue campaigns the sweep could not launch are not waited on again. Each
+    sweep also sends due training failure alerts. The cron endpoint stays as
+    a fallback for deployments where no long-lived process is running.
+    """
+    import asyncio as _asyncio
+    from services.email_service import send_due_training_failures
+    while True:
+        delay = SCHEDULED_CAMPAIGN_MAX_SLEEP
+        try:
+            now = datetime.now(timezone.utc)
+            now_iso = now.isoformat()
+            launched = await launch_due_campaigns(database, now_iso)
+            if launched:
+                logger.info(f"Launched {len(launched)} scheduled campaign(s)")
+            # Pick up training failure alerts an in-process timer never sent
+            await send_due_training_failures(database)
+            
+            for _, collection in SCHEDULED_CAMPAIGN_COLLECTIONS:
+                next_doc = await database[collection].find_one(
+                    {"status": "scheduled", "scheduled_at": {"$gt": now_iso}},
+                    {"_id": 0, "scheduled_at": 1},
+                    sort=[("scheduled_at", 1)]
+                )
+                if not next_doc or not next_doc.get("scheduled_at"):
+                    continue
+                try:
+                    next_at = datetime.fromisoformat(str(next_doc["scheduled_at"]).replace("Z", "+00:00"))
+                except ValueError:
+                    continue
+                if next_at.tzinfo is None:
+                    next_at = next_at.replace(tzinfo=timezone.utc)
+                delay = min(delay, max((next_at - now).total_seconds(), SCHEDULED_CAMPAIGN_MIN_SLEEP))
+        except Exception as e:
+            logger.error(f"Scheduled campaign launcher error: {e}")
+        await _asyncio.sleep(delay)
+
+
 @api_router.get("/cron/check-scheduled-campaigns")
 async def cron_check_scheduled_campaigns(request: Request):
     """Cron endpoint — protected by CRON_SECRET env variable"""
@@ -3925,38 +4094,17 @@ async def cron_check_scheduled_campaigns(request: Request):
     from datetime import datetime, timezone
     
     now = datetime.now(timezone.utc)
-    launched_campaigns = []
-    
-    # Check phishing campaigns
-    phishing_campaigns = await db.phishing_campaigns.find({
-        "status": "scheduled",
-        "scheduled_at": {"$lte": now.isoformat()}
-    }).to_list(100)
-    
-    for campaign in phishing_campaigns:
-        await db.phishing_campaigns.update_one(
-            {"campaign_id": campaign["campaign_id"]},
-            {"$set": {"status": "active", "started_at": now.isoformat()}}
-        )
-        launched_campaigns.append({"type": "phishing", "id": campaign["campaign_id"], "name": campaign.get("name")})
-    
-    # Check ad campaigns
-    ad_campaigns = await db.ad_campaigns.find({
-        "status": "scheduled",
-        "scheduled_at": {"$lte": now.isoformat()}
-    }).to_list(100)
-    
-    for campaign in ad_campaigns:
-        await db.ad_campaigns.update_one(
-            {"campaign_id": campaign["campaign_id"]},
-            {"$set": {"status": "active", "started_at": now.isoformat()}}
-        )
-        launched_campaigns.append({"type": "ad", "id": campaign["campaign_id"], "name": campaign.get("name")})
+    now_iso = now.isoformat()
+    launched_campaigns = await launch_due_campaigns(db, now_iso)
+    # Serverless instances may be frozen before their digest timer fires
+    from services.email_service import send_due_training_failures
+    training_alerts = await send_due_training_failures(db)
     
     return {
-        "message": f"Checked scheduled campaigns at {now.isoformat()}",
+        "message": f"Checked scheduled campaigns at {now_iso}",
         "launched": len(launched_campaigns),
-        "campaigns": launched_campaigns
+        "campaigns": launched_campaigns,
+        "training_failure_alerts": training_alerts
     }
 
 
@@ -3982,6 +4130,9 @@ async def cron_check_password_expiry(request: Request):
         return {"message": "Password expiry is disabled", "reminders_sent": 0}
     
     now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
+    # Expiry window is the same for every user; build the timedelta once
+    expiry_delta = timedelta(days=expiry_days)
     
     # Find users whose passwords are about to expire
     users_to_notify = []
@@ -3994,16 +4145,19 @@ async def cron_check_password_expiry(request: Request):
     
     for user in users:
         # Use password_changed_at or created_at as the base date
-        base_date_str = user.get("password_changed_at") or user.get("created_at")
-        if not base_date_str:
+        base_date = user.get("password_changed_at") or user.get("created_at")
+        if not base_date:
             continue
         
         try:
-            base_date = datetime.fromisoformat(base_date_str.replace('Z', '+00:00'))
+            # Native BSON dates come back as datetime already; only legacy
+            # ISO-string fields need parsing
+            if not isinstance(base_date, datetime):
+                base_date = datetime.fromisoformat(base_date)
             if base_date.tzinfo is None:
                 base_date = base_date.replace(tzinfo=timezone.utc)
             
-            expiry_date = base_date + timedelta(days=expiry_days)
+            expiry_date = base_date + expiry_delta
             days_until_expiry = (expiry_date - now).days
             
             # Send reminder if within reminder window and not already expired
@@ -4032,7 +4186,7 @@ async def cron_check_password_expiry(request: Request):
             logger.error(f"Failed to send expiry reminder to {item['user']['email']}: {e}")
     
     return {
-        "message": f"Password expiry check completed at {now.isoformat()}",
+        "message": f"Password expiry check completed at {now_iso}",
         "policy": {"expiry_days": expiry_days, "reminder_days": reminder_days},
         "users_checked": len(users),
         "reminders_sent": reminders_sent
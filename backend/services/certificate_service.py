@@ -17,17 +17,18 @@ TEXT RENDERING:
 - Supports fontWeight: bold
 """
 import io
-import re
 import os
-import textwrap
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, BinaryIO, Optional
+from xml.sax.saxutils import escape as xml_escape
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.pagesizes import landscape, portrait, A4
 from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
 from reportlab.lib.utils import ImageReader
 import base64
 import logging
@@ -38,6 +39,29 @@ logger = logging.getLogger(__name__)
 # Base URL for verification page — derived from environment
 FRONTEND_BASE_URL = os.environ.get("FRONTEND_URL", os.environ.get("REACT_APP_BACKEND_URL", ""))
 
+# Page sizes (computed once; landscape()/portrait() build a new tuple per call)
+PAGESIZE_LANDSCAPE = landscape(A4)
+PAGESIZE_PORTRAIT = portrait(A4)
+
+# Shared colors — HexColor parses its argument, so build these once at import
+PRIMARY_COLOR = colors.HexColor('#1F4E79')   # Dark blue
+ACCENT_COLOR = colors.HexColor('#D4A836')    # Gold
+TEXT_COLOR = colors.HexColor('#333333')
+FOOTER_COLOR = colors.HexColor('#999999')
+TITLE_COLOR = colors.HexColor('#555555')
+BORDER_BROWN = colors.HexColor('#8B4513')
+BORDER_GRAY = colors.HexColor('#D1D5DB')     # gray-300
+
+# Centered modules list on the legacy certificate
+MODULES_PARAGRAPH_STYLE = ParagraphStyle(
+    "CertificateModules",
+    fontName="Helvetica",
+    fontSize=10,
+    leading=14,
+    alignment=TA_CENTER,
+    textColor=TEXT_COLOR,
+)
+
 
 def generate_qr_code_image(url: str, box_size: int = 6, border: int = 1) -> io.BytesIO:
     """Generate a QR code image as a BytesIO stream."""
@@ -89,6 +113,28 @@ def get_reportlab_font(font_family: str, bold: bool = False) -> str:
     return base_font
 
 
+@lru_cache(maxsize=128)
+def _image_reader_from_b64(content: str) -> ImageReader:
+    """
+    Decode a base64 image (raw or data URI) into a reusable ImageReader.
+    
+    Cached so a template's background, logo and signature images are decoded
+    and parsed once rather than on every certificate rendered from it.
+    Raises on invalid data; callers decide how to report that.
+    """
+    if content.startswith("data:image"):
+        image_data_b64 = content.split(",", 1)[1]
+    else:
+        image_data_b64 = content
+    
+    # Fix base64 padding if needed
+    padding = len(image_data_b64) % 4
+    if padding:
+        image_data_b64 += '=' * (4 - padding)
+    
+    return ImageReader(io.BytesIO(base64.b64decode(image_data_b64)))
+
+
 def parse_font_size(font_size_raw) -> int:
     """Parse font size from various formats (14, "14", "14px", etc.)"""
     if isinstance(font_size_raw, (int, float)):
@@ -157,10 +203,10 @@ def draw_border(c, page_width: float, page_height: float, border_style: str):
     margin = 20
     inner_margin = 30
     
-    accent_gold = colors.HexColor('#D4A836')
-    primary_blue = colors.HexColor('#1F4E79')
-    brown = colors.HexColor('#8B4513')
-    gray = colors.HexColor('#D1D5DB')  # gray-300
+    accent_gold = ACCENT_COLOR
+    primary_blue = PRIMARY_COLOR
+    brown = BORDER_BROWN
+    gray = BORDER_GRAY
     
     if border_style == 'classic':
         # Double border effect - outer gold, inner gold
@@ -220,8 +266,9 @@ def generate_training_certificate(
     completion_date: datetime,
     organization_name: str = None,
     org_logo_url: str = None,
-    certificate_id: str = None
-) -> bytes:
+    certificate_id: str = None,
+    out: Optional[BinaryIO] = None
+) -> Optional[bytes]:
     """
     Generate a PDF training completion certificate (legacy/fallback)
     
@@ -234,22 +281,69 @@ def generate_training_certificate(
         organization_name: Optional organization name for branding
         org_logo_url: Optional URL to organization logo
         certificate_id: Unique certificate identifier
+        out: Optional writable stream; when given the PDF is written straight
+            into it and nothing is returned
     
     Returns:
-        PDF bytes
+        PDF bytes, or None when `out` is provided
     """
-    buffer = io.BytesIO()
+    buffer = out if out is not None else io.BytesIO()
     
     # Use landscape A4
-    page_width, page_height = landscape(A4)
+    page_width, page_height = PAGESIZE_LANDSCAPE
     
     # Create canvas directly for more control
-    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+    c = canvas.Canvas(buffer, pagesize=PAGESIZE_LANDSCAPE)
+    
+    _draw_certificate(
+        c, page_width, page_height,
+        user_name=user_name,
+        modules_completed=modules_completed,
+        average_score=average_score,
+        completion_date=completion_date,
+        organization_name=organization_name,
+        certificate_id=certificate_id
+    )
     
+    c.save()
+    if out is not None:
+        return None
+    return buffer.getvalue()
+
+
+def _draw_certificate(
+    c,
+    page_width: float,
+    page_height: float,
+    user_name: str,
+    modules_completed: list,
+    average_score: float,
+    completion_date: datetime,
+    organization_name: str = None,
+    certificate_id: str = None
+):
+    """Draw one legacy certificate onto the current page of canvas `c`."""
+    y_position = _draw_certificate_chrome(c, page_width, page_height, organization_name)
+    _draw_certificate_body(
+        c, page_width, page_height, y_position,
+        user_name=user_name,
+        modules_completed=modules_completed,
+        average_score=average_score,
+        completion_date=completion_date,
+        certificate_id=certificate_id
+    )
+
+
+def _draw_certificate_chrome(c, page_width: float, page_height: float, organization_name: str = None) -> float:
+    """
+    Draw the recipient-independent part of the legacy certificate (border,
+    organization, title, subtitle). Returns the y position where the
+    recipient block starts.
+    """
     # Colors
-    primary_color = colors.HexColor('#1F4E79')  # Dark blue
-    accent_color = colors.HexColor('#D4A836')   # Gold
-    text_color = colors.HexColor('#333333')
+    primary_color = PRIMARY_COLOR
+    accent_color = ACCENT_COLOR
+    text_color = TEXT_COLOR
     
     # Border
     draw_border(c, page_width, page_height, 'classic')
@@ -281,6 +375,26 @@ def generate_training_certificate(
     c.drawCentredString(page_width / 2, y_position, "This certifies that")
     y_position -= 35
     
+    return y_position
+
+
+def _draw_certificate_body(
+    c,
+    page_width: float,
+    page_height: float,
+    y_position: float,
+    user_name: str,
+    modules_completed: list,
+    average_score: float,
+    completion_date: datetime,
+    certificate_id: str = None
+):
+    """Draw the recipient-specific part of the legacy certificate."""
+    # Colors
+    primary_color = PRIMARY_COLOR
+    accent_color = ACCENT_COLOR
+    text_color = TEXT_COLOR
+    
     # Recipient Name
     c.setFont("Helvetica-Bold", 28)
     c.setFillColor(primary_color)
@@ -309,16 +423,16 @@ def generate_training_certificate(
     
     # Modules list (if multiple)
     if len(modules_completed) > 1:
-        c.setFont("Helvetica", 10)
-        c.setFillColor(text_color)
         modules_text = "Modules completed: " + ", ".join(modules_completed)
         
-        # Wrap long text
-        lines = wrap_text(modules_text, "Helvetica", 10, page_width - 120, c)
-        for line in lines:
-            c.drawCentredString(page_width / 2, y_position, line)
-            y_position -= 14
-        y_position -= 20
+        # Let ReportLab lay out and wrap the list; Paragraph takes markup,
+        # so module names are escaped
+        modules_para = Paragraph(xml_escape(modules_text), MODULES_PARAGRAPH_STYLE)
+        _, para_height = modules_para.wrap(page_width - 120, page_height)
+        # Top of the block sits one line above y_position so the first
+        # baseline lands where the single-line layout put it
+        modules_para.drawOn(c, 60, y_position + 10 - para_height)
+        y_position -= para_height + 20
     
     # Date
     date_str = completion_date.strftime("%B %d, %Y")
@@ -330,15 +444,156 @@ def generate_training_certificate(
     if certificate_id:
         footer_y = 45
         c.setFont("Helvetica", 8)
-        c.setFillColor(colors.HexColor('#999999'))
+        c.setFillColor(FOOTER_COLOR)
         c.drawCentredString(page_width / 2, footer_y, f"Certificate ID: {certificate_id}")
+
+
+IMAGE_ELEMENT_TYPES = ("image", "logo", "signature", "certifying_body")
+
+
+@dataclass
+class CompiledElement:
+    """
+    A template element with geometry and text style resolved to ReportLab
+    values, so rendering does no percentage, font-size or color parsing.
+    """
+    id: str
+    type: str
+    content: str
+    placeholder: Optional[str]
+    style: dict
+    x: float
+    y_top: float
+    y_bottom: float
+    width: float
+    height: float
+    font_name: str = "Helvetica"
+    font_size: int = 14
+    fill_color: Any = colors.black
+    align: str = "left"
+    line_height: float = 14 * 1.3
+
+
+def compile_element(elem: dict, page_width: float, page_height: float) -> CompiledElement:
+    """
+    Resolve a raw template element against the page size.
     
-    c.save()
-    buffer.seek(0)
-    return buffer.getvalue()
+    COORDINATE CONVERSION:
+    - elem.x, elem.y are percentages (0-100) from TOP-LEFT
+    - ReportLab uses BOTTOM-LEFT origin
+    - elem.y=0 means top of page, elem.y=100 means bottom
+    """
+    # Convert percentages to absolute positions
+    x_pct = float(elem.get("x", 0)) / 100.0
+    y_pct = float(elem.get("y", 0)) / 100.0
+    w_pct = float(elem.get("width", 10)) / 100.0
+    h_pct = float(elem.get("height", 5)) / 100.0
+    
+    height = h_pct * page_height
+    # Convert Y from top-based to bottom-based
+    # y_pct=0 means top of page, so reportlab_y should be near page_height
+    # y_pct=100 means bottom of page, so reportlab_y should be near 0
+    y_top = page_height - (y_pct * page_height)  # Top edge of element in ReportLab coords
+    
+    style = elem.get("style", {}) or {}
+    
+    # Parse font properties
+    font_size = parse_font_size(style.get("fontSize", 14))
+    font_family = style.get("fontFamily", style.get("fontName", "Helvetica"))
+    is_bold = style.get("fontWeight") == "bold"
+    
+    # Parse color
+    try:
+        fill_color = colors.HexColor(style.get("color", "#333333"))
+    except Exception:
+        fill_color = colors.black
+    
+    # Parse line height (default 1.3 to match frontend)
+    line_height_factor = float(style.get("lineHeight", 1.3))
+    
+    return CompiledElement(
+        id=elem.get("id", "unknown"),
+        type=elem.get("type", "text"),
+        content=elem.get("content") or "",
+        placeholder=elem.get("placeholder"),
+        style=style,
+        x=x_pct * page_width,
+        y_top=y_top,
+        y_bottom=y_top - height,
+        width=w_pct * page_width,
+        height=height,
+        font_name=get_reportlab_font(font_family, is_bold),
+        font_size=font_size,
+        fill_color=fill_color,
+        align=style.get("textAlign", style.get("alignment", "left")),
+        line_height=font_size * line_height_factor,
+    )
+
 
+@dataclass
+class CompiledTemplate:
+    """Recipient-independent parts of a certificate template, resolved once."""
+    orientation: str
+    page_width: float
+    page_height: float
+    border_style: str
+    background_color: Optional[Any] = None
+    background_image: Optional[ImageReader] = None
+    elements: list = field(default_factory=list)
 
-def generate_certificate_from_template(template: dict, placeholders: dict, include_footer: bool = False) -> bytes:
+
+def prepare_template(template: dict) -> CompiledTemplate:
+    """
+    Resolve page size, background and border of a template once so that it
+    can be rendered for many recipients with render_certificate().
+    """
+    # Determine page orientation and size
+    orientation = (template.get("orientation") or "landscape").lower()
+    if orientation == "portrait":
+        page_width, page_height = PAGESIZE_PORTRAIT
+    else:
+        page_width, page_height = PAGESIZE_LANDSCAPE
+
+    # Background color
+    bg_color = None
+    if template.get("background_color"):
+        try:
+            bg_color = colors.HexColor(template["background_color"])
+        except Exception:
+            pass
+
+    # Background image (optional)
+    bg_reader = None
+    if template.get("background_image"):
+        try:
+            bg_reader = _image_reader_from_b64(template["background_image"])
+        except Exception as e:
+            logger.warning(f"Failed to decode background image: {e}")
+
+    elements = []
+    for elem in template.get("elements", []) or []:
+        try:
+            elements.append(compile_element(elem, page_width, page_height))
+        except Exception as e:
+            logger.error(f"Error preparing certificate element {elem.get('id', 'unknown')}: {e}")
+
+    return CompiledTemplate(
+        orientation=orientation,
+        page_width=page_width,
+        page_height=page_height,
+        border_style=(template.get("border_style") or "classic").lower(),
+        background_color=bg_color,
+        background_image=bg_reader,
+        elements=elements,
+    )
+
+
+def generate_certificate_from_template(
+    template: dict,
+    placeholders: dict,
+    include_footer: bool = False,
+    out: Optional[BinaryIO] = None
+) -> Optional[bytes]:
     """
     Render a PDF certificate using a saved certificate template.
     
@@ -351,50 +606,49 @@ def generate_certificate_from_template(template: dict, placeholders: dict, inclu
         template: Template dict with elements, background_color, border_style, orientation
         placeholders: Dict with values like user_name, training_name, score, date, certificate_id
         include_footer: If True, adds certificate ID footer (default False to avoid duplicates)
+        out: Optional writable stream; when given the PDF is written straight
+            into it and nothing is returned
     
     Returns:
-        PDF bytes
+        PDF bytes, or None when `out` is provided
     """
-    buffer = io.BytesIO()
+    return render_certificate(prepare_template(template), placeholders, include_footer=include_footer, out=out)
 
-    # Determine page orientation and size
-    orientation = (template.get("orientation") or "landscape").lower()
-    if orientation == "portrait":
-        page_width, page_height = portrait(A4)
-    else:
-        page_width, page_height = landscape(A4)
 
-    logger.info(f"Certificate render: orientation={orientation}, size={page_width:.0f}x{page_height:.0f}, elements={len(template.get('elements', []))}")
+def render_certificate(
+    compiled: CompiledTemplate,
+    placeholders: dict,
+    include_footer: bool = False,
+    out: Optional[BinaryIO] = None
+) -> Optional[bytes]:
+    """
+    Draw a certificate from a template already resolved by prepare_template().
+    
+    Returns:
+        PDF bytes, or None when `out` is provided
+    """
+    buffer = out if out is not None else io.BytesIO()
+    page_width, page_height = compiled.page_width, compiled.page_height
+
+    logger.info(f"Certificate render: orientation={compiled.orientation}, size={page_width:.0f}x{page_height:.0f}, elements={len(compiled.elements)}")
 
     # Create canvas
     c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
 
     # Background color
-    bg_color = template.get("background_color")
-    if bg_color:
-        try:
-            c.setFillColor(colors.HexColor(bg_color))
-            c.rect(0, 0, page_width, page_height, fill=1, stroke=0)
-        except Exception:
-            pass
+    if compiled.background_color is not None:
+        c.setFillColor(compiled.background_color)
+        c.rect(0, 0, page_width, page_height, fill=1, stroke=0)
 
     # Background image (optional)
-    bg_image = template.get("background_image")
-    if bg_image:
+    if compiled.background_image is not None:
         try:
-            if bg_image.startswith("data:image"):
-                base64_part = bg_image.split(",", 1)[1]
-            else:
-                base64_part = bg_image
-            bg_data = base64.b64decode(base64_part)
-            bg_reader = ImageReader(io.BytesIO(bg_data))
-            c.drawImage(bg_reader, 0, 0, width=page_width, height=page_height)
+            c.drawImage(compiled.background_image, 0, 0, width=page_width, height=page_height)
         except Exception as e:
             logger.warning(f"Failed to render background image: {e}")
 
     # Border style
-    border_style = (template.get("border_style") or "classic").lower()
-    draw_border(c, page_width, page_height, border_style)
+    draw_border(c, page_width, page_height, compiled.border_style)
 
     # Build extended placeholders with aliases
     extended_placeholders = {
@@ -411,12 +665,11 @@ def generate_certificate_from_template(template: dict, placeholders: dict, inclu
     }
 
     # Iterate over template elements
-    elements = template.get("elements", []) or []
-    for elem in elements:
+    for elem in compiled.elements:
         try:
-            render_element(c, elem, page_width, page_height, extended_placeholders)
+            render_element(c, elem, extended_placeholders)
         except Exception as e:
-            logger.error(f"Error rendering certificate element {elem.get('id', 'unknown')}: {e}")
+            logger.error(f"Error rendering certificate element {elem.id}: {e}")
             continue
 
     # Optional footer with certificate ID (disabled by default to prevent duplicates)
@@ -424,48 +677,25 @@ def generate_certificate_from_template(template: dict, placeholders: dict, inclu
         cert_id = placeholders.get("certificate_id")
         if cert_id:
             c.setFont("Helvetica", 8)
-            c.setFillColor(colors.HexColor('#999999'))
+            c.setFillColor(FOOTER_COLOR)
             c.drawCentredString(page_width / 2, 25, f"Certificate ID: {cert_id}")
 
     c.save()
-    buffer.seek(0)
+    if out is not None:
+        return None
     return buffer.getvalue()
 
 
-def render_element(c, elem: dict, page_width: float, page_height: float, placeholders: dict):
-    """
-    Render a single template element on the canvas.
-    
-    COORDINATE CONVERSION:
-    - elem.x, elem.y are percentages (0-100) from TOP-LEFT
-    - ReportLab uses BOTTOM-LEFT origin
-    - elem.y=0 means top of page, elem.y=100 means bottom
-    """
-    elem_type = elem.get("type", "text")
-    
-    # Convert percentages to absolute positions
-    x_pct = float(elem.get("x", 0)) / 100.0
-    y_pct = float(elem.get("y", 0)) / 100.0
-    w_pct = float(elem.get("width", 10)) / 100.0
-    h_pct = float(elem.get("height", 5)) / 100.0
-    
-    # Calculate absolute positions
-    x = x_pct * page_width
-    width = w_pct * page_width
-    height = h_pct * page_height
-    
-    # Convert Y from top-based to bottom-based
-    # y_pct=0 means top of page, so reportlab_y should be near page_height
-    # y_pct=100 means bottom of page, so reportlab_y should be near 0
-    y_top = page_height - (y_pct * page_height)  # Top edge of element in ReportLab coords
-    y_bottom = y_top - height  # Bottom edge of element
+def render_element(c, elem: CompiledElement, placeholders: dict):
+    """Render a single compiled template element on the canvas."""
+    elem_type = elem.type
     
     # Get content and resolve placeholders
-    content = elem.get("content") or ""
-    placeholder_key = elem.get("placeholder")
+    content = elem.content
+    placeholder_key = elem.placeholder
     
     # For image types, prioritize content (which may have been pre-populated with image data)
-    if elem_type in ["image", "logo", "signature", "certifying_body"]:
+    if elem_type in IMAGE_ELEMENT_TYPES:
         # Content may already be image data
         if content and (content.startswith("data:image") or len(content) > 200):
             pass  # Keep content as-is
@@ -482,7 +712,7 @@ def render_element(c, elem: dict, page_width: float, page_height: float, placeho
             if "{" in placeholder_key:
                 # Format string like "Score: {score}%"
                 try:
-                    content = placeholder_key.format(**placeholders)
+                    content = placeholder_key.format_map(placeholders)
                 except Exception:
                     content = placeholders.get(key, placeholder_key)
             else:
@@ -491,12 +721,10 @@ def render_element(c, elem: dict, page_width: float, page_height: float, placeho
     # Replace any remaining placeholders in content
     if content and isinstance(content, str) and "{" in content:
         try:
-            content = content.format(**placeholders)
+            content = content.format_map(placeholders)
         except Exception:
             pass
     
-    style = elem.get("style", {}) or {}
-    
     # Check if content is an image (base64)
     content_is_image = isinstance(content, str) and (
         content.startswith("data:image") or 
@@ -504,10 +732,10 @@ def render_element(c, elem: dict, page_width: float, page_height: float, placeho
     )
     
     if elem_type == "text" or (elem_type == "certifying_body" and not content_is_image):
-        render_text_element(c, content, x, y_top, width, height, style, placeholders)
+        render_text_element(c, content, elem)
         
     elif elem_type in ["image", "logo", "signature"] or (elem_type == "certifying_body" and content_is_image):
-        render_image_element(c, content, x, y_bottom, width, height, style, elem_type)
+        render_image_element(c, content, elem)
 
     elif elem_type == "qr_code":
         # Generate QR code pointing to verification URL
@@ -516,52 +744,33 @@ def render_element(c, elem: dict, page_width: float, page_height: float, placeho
         try:
             qr_buf = generate_qr_code_image(verify_url, box_size=8, border=1)
             qr_reader = ImageReader(qr_buf)
-            qr_size = min(width, height)
+            qr_size = min(elem.width, elem.height)
             # Center QR code in bounding box
-            qr_x = x + (width - qr_size) / 2
-            qr_y = y_bottom + (height - qr_size) / 2
+            qr_x = elem.x + (elem.width - qr_size) / 2
+            qr_y = elem.y_bottom + (elem.height - qr_size) / 2
             c.drawImage(qr_reader, qr_x, qr_y, width=qr_size, height=qr_size)
         except Exception as e:
             logger.warning(f"Failed to render QR code: {e}")
 
 
-def render_text_element(c, text: str, x: float, y_top: float, width: float, height: float, style: dict, placeholders: dict):
+def render_text_element(c, text: str, elem: CompiledElement):
     """
     Render a text element with proper wrapping and alignment.
     
     Args:
         c: ReportLab canvas
         text: Text content to render
-        x: Left edge X position (absolute)
-        y_top: Top edge Y position in ReportLab coords (bottom-up)
-        width: Element width
-        height: Element height
-        style: CSS-like style dict
+        elem: Compiled element providing geometry, font, color and alignment
     """
     if not text:
         return
     
     text = str(text)
-    
-    # Parse font properties
-    font_size = parse_font_size(style.get("fontSize", 14))
-    font_family = style.get("fontFamily", style.get("fontName", "Helvetica"))
-    is_bold = style.get("fontWeight") == "bold"
-    font_name = get_reportlab_font(font_family, is_bold)
-    
-    # Parse color
-    color_hex = style.get("color", "#333333")
-    try:
-        fill_color = colors.HexColor(color_hex)
-    except Exception:
-        fill_color = colors.black
-    
-    # Parse alignment
-    align = style.get("textAlign", style.get("alignment", "left"))
-    
-    # Parse line height (default 1.3 to match frontend)
-    line_height_factor = float(style.get("lineHeight", 1.3))
-    line_height = font_size * line_height_factor
+    font_name = elem.font_name
+    font_size = elem.font_size
+    line_height = elem.line_height
+    align = elem.align
+    x, y_top, width, height = elem.x, elem.y_top, elem.width, elem.height
     
     # Set font
     try:
@@ -570,7 +779,7 @@ def render_text_element(c, text: str, x: float, y_top: float, width: float, heig
         c.setFont("Helvetica", font_size)
         font_name = "Helvetica"
     
-    c.setFillColor(fill_color)
+    c.setFillColor(elem.fill_color)
     
     # Wrap text to fit width
     lines = wrap_text(text, font_name, font_size, width, c)
@@ -594,37 +803,26 @@ def render_text_element(c, text: str, x: float, y_top: float, width: float, heig
             c.drawString(x, line_y, line)
 
 
-def render_image_element(c, content: str, x: float, y_bottom: float, width: float, height: float, style: dict, elem_type: str):
+def render_image_element(c, content: str, elem: CompiledElement):
     """
     Render an image element (logo, signature, certifying body, or generic image).
     
     Args:
         c: ReportLab canvas
         content: Base64 image data or data URI
-        x: Left edge X position
-        y_bottom: Bottom edge Y position in ReportLab coords
-        width: Element width
-        height: Element height  
-        style: Style dict (may contain title for signatures)
-        elem_type: Element type (image, logo, signature, certifying_body)
+        elem: Compiled element providing geometry, style (may contain title
+            for signatures) and type
     """
     if not content:
         return
     
-    # Extract base64 data
+    x, y_bottom, width, height = elem.x, elem.y_bottom, elem.width, elem.height
+    style = elem.style
+    elem_type = elem.type
+    
+    # Decode base64 data (cached per distinct image)
     try:
-        if content.startswith("data:image"):
-            image_data_b64 = content.split(",", 1)[1]
-        else:
-            image_data_b64 = content
-        
-        # Fix base64 padding if needed
-        padding = len(image_data_b64) % 4
-        if padding:
-            image_data_b64 += '=' * (4 - padding)
-        
-        img_data = base64.b64decode(image_data_b64)
-        img_reader = ImageReader(io.BytesIO(img_data))
+        img_reader = _image_reader_from_b64(content)
     except Exception as e:
         logger.warning(f"Failed to decode image: {e}")
         return
@@ -671,13 +869,13 @@ def render_image_element(c, content: str, x: float, y_bottom: float, width: floa
     title = style.get("title", "")
     if title and elem_type in ["signature", "certifying_body"]:
         c.setFont("Helvetica", 9)
-        c.setFillColor(colors.HexColor('#555555'))
+        c.setFillColor(TITLE_COLOR)
         # Position title centered below the image area
         title_y = y_bottom - 12
         c.drawCentredString(x + width / 2, title_y, title)
 
 
-def generate_certificate_preview(template: dict, assets: dict = None) -> bytes:
+def generate_certificate_preview(template: dict, assets: dict = None, out: Optional[BinaryIO] = None) -> Optional[bytes]:
     """
     Generate a preview PDF of a certificate template with sample data.
     Used for the editor preview functionality.
@@ -685,9 +883,11 @@ def generate_certificate_preview(template: dict, assets: dict = None) -> bytes:
     Args:
         template: Template dict
         assets: Dict containing stored assets (signatures, certifying_bodies, logos)
+        out: Optional writable stream; when given the PDF is written straight
+            into it
         
     Returns:
-        PDF bytes
+        PDF bytes, or None when `out` is provided
     """
     assets = assets or {}
     
@@ -737,7 +937,7 @@ def generate_certificate_preview(template: dict, assets: dict = None) -> bytes:
     
     processed_template["elements"] = processed_elements
     
-    return generate_certificate_from_template(processed_template, sample_placeholders, include_footer=False)
+    return generate_certificate_from_template(processed_template, sample_placeholders, include_footer=False, out=out)
 
 
 def generate_bulk_certificates(users_data: list, organization_name: str = None) -> bytes:
@@ -753,20 +953,33 @@ def generate_bulk_certificates(users_data: list, organization_name: str = None)
     """
     buffer = io.BytesIO()
     
-    # For bulk, we'll create individual PDFs and merge
-    # For simplicity, generate first certificate only in this implementation
-    # Full implementation would use PyPDF2 to merge
-    
-    if users_data:
-        first_user = users_data[0]
-        return generate_training_certificate(
-            user_name=first_user.get('name', 'Unknown'),
-            user_email=first_user.get('email', ''),
-            modules_completed=first_user.get('modules', []),
-            average_score=first_user.get('score', 0),
-            completion_date=first_user.get('completion_date', datetime.now(timezone.utc)),
-            organization_name=organization_name,
-            certificate_id=first_user.get('certificate_id')
+    if not users_data:
+        return buffer.getvalue()
+    
+    # Draw every certificate as a page of one canvas instead of rendering
+    # separate PDFs and merging them afterwards
+    page_width, page_height = PAGESIZE_LANDSCAPE
+    c = canvas.Canvas(buffer, pagesize=PAGESIZE_LANDSCAPE)
+    now = datetime.now(timezone.utc)
+    
+    # Border and headings are identical on every page: record them once as
+    # a form XObject and stamp it, drawing only the recipient block per user
+    c.beginForm("certificate_chrome")
+    body_top = _draw_certificate_chrome(c, page_width, page_height, organization_name)
+    c.endForm()
+    
+    for user in users_data:
+        c.doForm("certificate_chrome")
+        _draw_certificate_body(
+            c, page_width, page_height, body_top,
+            user_name=user.get('name', 'Unknown'),
+            modules_completed=user.get('modules', []),
+            average_score=user.get('score', 0),
+            completion_date=user.get('completion_date', now),
+            certificate_id=user.get('certificate_id')
         )
+        c.showPage()
     
+    c.save()
+    buffer.seek(0)
     return buffer.getvalue()
@@ -1,14 +1,34 @@
 import os
 import re
+import time
+import asyncio
 import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
+from string import Template
+from typing import NamedTuple, Optional
+import httpx
+import orjson
+from dateutil.parser import parse as _parse_date
 from dotenv import load_dotenv
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content, TrackingSettings, ClickTracking
+from markupsafe import escape as _esc
+
+from shared.background_queue import BackgroundQueue
+from shared.http_client import PooledHTTPClient
 
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent / '.env')
 
+# Read once at import; nothing changes these at runtime.
+SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
+SENDER_EMAIL = os.environ.get('SENDER_EMAIL')
+INFO_EMAIL = os.environ.get('INFO_EMAIL', 'info@vasilisnetshield.com')
+FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
+LOGIN_URL = f"{FRONTEND_URL}/auth"
+
 logger = logging.getLogger(__name__)
 
 # Email validation regex
@@ -35,57 +55,350 @@ def validate_email_list(emails: list) -> tuple:
     return valid, invalid
 
 
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# Mail is posted straight to the v3 API on one pooled client instead of a
+# blocking SDK call per email. The semaphore caps the fan-out to stay under
+# SendGrid's rate limits.
+_http = PooledHTTPClient(timeout=15.0)
+_send_semaphore = asyncio.Semaphore(int(os.environ.get('SENDGRID_CONCURRENCY', '10')))
+
+
+async def close_http_client():
+    """Close the pooled SendGrid connection (called on app shutdown)."""
+    await _http.aclose()
+
+
+# Throttling (429) and transient server errors are retried with jittered
+# exponential backoff; on 429 we wait at least until X-RateLimit-Reset.
+SENDGRID_MAX_ATTEMPTS = 4
+SENDGRID_RETRY_STATUSES = {429, 500, 502, 503, 504}
+SENDGRID_BACKOFF_INITIAL = 0.2
+SENDGRID_BACKOFF_MAX = 5.0
+SENDGRID_RATE_LIMIT_MAX_WAIT = 30.0
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    delay = min(SENDGRID_BACKOFF_INITIAL * 2 ** attempt, SENDGRID_BACKOFF_MAX) + random.uniform(0, SENDGRID_BACKOFF_INITIAL)
+    if response is not None and response.status_code == 429:
+        try:
+            reset_in = float(response.headers.get("X-RateLimit-Reset", 0)) - time.time()
+        except ValueError:
+            reset_in = 0
+        delay = max(delay, min(reset_in, SENDGRID_RATE_LIMIT_MAX_WAIT))
+    return delay
+
+
+async def _sendgrid_send(api_key: str, message) -> httpx.Response:
+    """POST a Mail, a v3 payload dict or an already serialised body to SendGrid."""
+    if isinstance(message, bytes):
+        body = message
+    else:
+        body = orjson.dumps(message if isinstance(message, dict) else message.get())
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    for attempt in range(SENDGRID_MAX_ATTEMPTS):
+        last_attempt = attempt == SENDGRID_MAX_ATTEMPTS - 1
+        response = None
+        try:
+            async with _send_semaphore:
+                response = await _http.get().post(SENDGRID_SEND_URL, content=body, headers=headers)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            # The request never reached SendGrid, so retrying can't double-send
+            if last_attempt:
+                raise
+            logger.warning("SendGrid request failed (%r), retrying", e)
+        else:
+            if response.status_code not in SENDGRID_RETRY_STATUSES or last_attempt:
+                return response
+            logger.warning("SendGrid returned %s, retrying", response.status_code)
+        # Back off outside the semaphore so other sends keep flowing
+        await asyncio.sleep(_retry_delay(attempt, response))
+
+
+async def send_sendgrid_message(message, api_key: str = None) -> httpx.Response:
+    """Send a prebuilt Mail (or v3 payload dict) over the shared SendGrid pool.
+
+    For callers outside this module that build their own message. Returns the
+    response whatever its status; transport errors are raised.
+    """
+    return await _sendgrid_send(api_key or SENDGRID_API_KEY, message)
+
+
+# SendGrid accepts at most 1000 personalizations per request.
+MAX_PERSONALIZATIONS = 1000
+
+
+def _recipient_batches(recipients: list):
+    for i in range(0, len(recipients), MAX_PERSONALIZATIONS):
+        yield recipients[i:i + MAX_PERSONALIZATIONS]
+
+
+def _use_dynamic_template(message, name: str, data: dict) -> bool:
+    """Point message at a SendGrid dynamic template when one is configured.
+
+    SENDGRID_TPL_<NAME> holds the template id; the body then lives on
+    SendGrid's side and only data is posted. Returns False when unset so the
+    caller attaches the locally rendered body instead.
+    """
+    template_id = os.environ.get(f"SENDGRID_TPL_{name}")
+    if not template_id:
+        return False
+    message["template_id"] = template_id
+    for personalization in message["personalizations"]:
+        personalization["dynamic_template_data"] = data
+    return True
+
+
+@lru_cache(maxsize=64)
+def _branded(template: Template, company_name: str, primary_color: str = "") -> Template:
+    """Bake branding into a body template once per branding value.
+
+    Only the per-recipient fields are left for substitute() at send time.
+    """
+    return Template(template.safe_substitute(
+        company_name=str(company_name).replace("$", "$$"),
+        primary_color=str(primary_color).replace("$", "$$"),
+    ))
+
+
+DEFAULT_SENDER = "noreply@vasilisnetshield.com"
+
+
+class Branding(NamedTuple):
+    company_name: str
+    logo_url: Optional[str]
+    primary_color: str
+
+
+DEFAULT_BRANDING = Branding("Vasilis NetShield", None, "#D4A836")
+
+SCENARIO_NAMES = {
+    "phishing_email": "Phishing Email",
+    "qr_code_phishing": "QR Code Phishing",
+    "bec_scenario": "Business Email Compromise",
+    "usb_drop": "USB Drop Attack",
+    "mfa_fatigue": "MFA Fatigue Attack",
+    "data_handling_trap": "Data Handling",
+    "ransomware_readiness": "Ransomware Awareness",
+    "shadow_it_detection": "Shadow IT",
+    "malicious_ad": "Malicious Advertisement",
+    "social_engineering": "Social Engineering"
+}
+
+
+async def _branding(db) -> tuple:
+    """Return (company_name, primary_color), falling back to the defaults."""
+    branding = DEFAULT_BRANDING if db is None else await get_branding_settings(db)
+    return branding.company_name, branding.primary_color
+
+
+# Click tracking would rewrite the links in our bodies. Payloads are
+# serialised straight away and never mutated here, so one dict is shared.
+_NO_CLICK_TRACKING = {"click_tracking": {"enable": False, "enable_text": False}}
+
+
+def _address(email: str, name: str = None) -> dict:
+    """A v3 API email object; the name is omitted when empty."""
+    return {"email": email, "name": name} if name else {"email": email}
+
+
+def _compose(from_name: str, to_emails, subject: str, html_content: str = None, plain_text: str = None,
+             dynamic_template: tuple = None, sender_email: str = None, is_multiple: bool = False,
+             reply_to: tuple = None) -> dict:
+    """Build a SendGrid v3 mail/send payload with our standard tracking settings.
+
+    to_emails is an address or a list of addresses; is_multiple gives each
+    its own personalization. dynamic_template is an optional (name, data)
+    pair, see _use_dynamic_template; reply_to is an optional (email, name)
+    pair. The payload is built as plain dicts rather than through the SDK's
+    helper classes.
+    """
+    if isinstance(to_emails, str):
+        to_emails = [to_emails]
+    recipients = [{"email": addr} for addr in to_emails]
+    if is_multiple:
+        personalizations = [{"to": [recipient]} for recipient in recipients]
+    else:
+        personalizations = [{"to": recipients}]
+    message = {
+        "from": _address(sender_email or SENDER_EMAIL, from_name),
+        "subject": subject,
+        "personalizations": personalizations,
+    }
+    if dynamic_template is None or not _use_dynamic_template(message, *dynamic_template):
+        content = []
+        if plain_text is not None:
+            content.append({"type": "text/plain", "value": plain_text})
+        if html_content is not None:
+            content.append({"type": "text/html", "value": html_content})
+        if content:
+            message["content"] = content
+    message["tracking_settings"] = _NO_CLICK_TRACKING
+    if reply_to:
+        message["reply_to"] = _address(*reply_to)
+    return message
+
+
+async def _deliver(message, label: str, recipient) -> bool:
+    """Send message, log the outcome and report whether SendGrid accepted it.
+
+    recipient is an address or a list of them, only used for the log line.
+    """
+    try:
+        response = await _sendgrid_send(SENDGRID_API_KEY, message)
+    except Exception as e:
+        logger.error("Failed to send %s: %s", label, e)
+        return False
+    if response.status_code == 202:
+        # Bulk sends log a whole batch; only build the line if it'll be emitted
+        if logger.isEnabledFor(logging.INFO):
+            if not isinstance(recipient, str):
+                recipient = ", ".join(recipient)
+            logger.info("%s%s sent to %s", label[0].upper(), label[1:], recipient)
+        return True
+    logger.error("SendGrid returned status %s", response.status_code)
+    return False
+
+
+# Notification bodies show the send time to the second; a burst of sends
+# reuses the string formatted for the current second.
+_timestamp_cache = (None, "")
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as 'YYYY-MM-DD HH:MM:SS UTC'."""
+    global _timestamp_cache
+    second = int(time.time())
+    if _timestamp_cache[0] != second:
+        formatted = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        _timestamp_cache = (second, formatted)
+    return _timestamp_cache[1]
+
+
+# Bulk notifications can list the same address twice, or fire repeatedly
+# during a storm (the same account locking again and again). An identical
+# notification to the same address within RECENT_SEND_TTL seconds is skipped.
+# Recipients are marked before the send, so concurrent duplicates are skipped
+# too, and _deliver_marked() releases the marks if the send fails so that a
+# retry is not suppressed.
+RECENT_SEND_TTL = 60
+RECENT_SEND_MAX = 50000
+_recent_sends = {}
+
+
+def _unsent_recipients(key: tuple, recipients: list, force: bool = False) -> list:
+    """Drop recipients already sent notification `key` recently, and mark the rest."""
+    now = time.time()
+    if len(_recent_sends) > RECENT_SEND_MAX:
+        for k in [k for k, sent_at in _recent_sends.items() if now - sent_at >= RECENT_SEND_TTL]:
+            del _recent_sends[k]
+    fresh = []
+    for addr in dict.fromkeys(recipients):
+        recent_key = (key, addr.lower())
+        if not force and now - _recent_sends.get(recent_key, 0) < RECENT_SEND_TTL:
+            continue
+        _recent_sends[recent_key] = now
+        fresh.append(addr)
+    return fresh
+
+
+def _forget_recent_sends(keys, recipients) -> None:
+    """Release the marks _unsent_recipients() set for notifications `keys`"""
+    for key in keys:
+        for addr in recipients:
+            _recent_sends.pop((key, addr.lower()), None)
+
+
+async def _deliver_marked(keys, message, label: str, recipient) -> bool:
+    """_deliver(), releasing the recent-send marks for recipient if the send fails."""
+    sent = await _deliver(message, label, recipient)
+    if not sent:
+        _forget_recent_sends(keys, [recipient] if isinstance(recipient, str) else recipient)
+    return sent
+
+
+# Fire-and-forget mail: handlers that don't need the outcome enqueue the send
+# and return straight away; background workers drain the queue.
+MAIL_QUEUE_SIZE = 10000
+MAIL_WORKERS = 4
+_mail_queue = BackgroundQueue("Mail", MAIL_QUEUE_SIZE, workers=MAIL_WORKERS)
+
+
+def enqueue_email(send_fn, *args, **kwargs) -> bool:
+    """Queue send_fn(*args, **kwargs); False if the email was dropped."""
+    return _mail_queue.put(send_fn, *args, **kwargs)
+
+
+async def drain_mail_queue(timeout: float = 10.0):
+    """Flush queued emails on shutdown."""
+    await _mail_queue.drain(timeout)
+
+
 async def send_test_email(to_email: str, subject: str, html_content: str, from_name: str = None) -> dict:
     """Send a test email and return status"""
-    sg_api_key = os.environ.get("SENDGRID_API_KEY")
-    sender_email = os.environ.get("SENDER_EMAIL", "noreply@vasilisnetshield.com")
-    
-    if not sg_api_key:
+    if not SENDGRID_API_KEY:
         return {"success": False, "error": "SendGrid API key not configured"}
     
     if not is_valid_email(to_email):
         return {"success": False, "error": f"Invalid email format: {to_email}"}
     
     try:
-        sg = SendGridAPIClient(api_key=sg_api_key)
-        
-        from_email = Email(sender_email, from_name or "Vasilis NetShield")
-        message = Mail(
-            from_email=from_email,
-            to_emails=To(to_email),
-            subject=subject,
-            html_content=Content("text/html", html_content)
+        message = _compose(
+            from_name or "Vasilis NetShield", to_email, subject,
+            html_content=html_content,
+            sender_email=SENDER_EMAIL or DEFAULT_SENDER,
         )
         
-        response = sg.send(message)
+        response = await _sendgrid_send(SENDGRID_API_KEY, message)
         
         if response.status_code in [200, 201, 202]:
             return {"success": True, "status_code": response.status_code}
         else:
             return {"success": False, "error": f"SendGrid returned status {response.status_code}"}
     except Exception as e:
-        logger.error(f"Failed to send test email: {e}")
+        logger.error("Failed to send test email: %s", e)
         return {"success": False, "error": str(e)}
 
 
+# Branding rarely changes, so keep it in-process instead of hitting Mongo on
+# every send. Admin branding updates call invalidate_branding_cache().
+_branding_cache = {}
+_branding_cache_ttl = 300  # 5 minutes
+_branding_lock = asyncio.Lock()
+
+
+def invalidate_branding_cache():
+    """Drop the cached branding so the next email re-reads it from the database"""
+    _branding_cache.clear()
+
+
 async def get_branding_settings(db):
-    """Fetch branding settings from database"""
-    try:
-        settings = await db.settings.find_one({"type": "branding"}, {"_id": 0})
-        if settings:
-            return {
-                "company_name": settings.get("company_name", "Vasilis NetShield"),
-                "logo_url": settings.get("logo_url"),
-                "primary_color": settings.get("primary_color", "#D4A836"),
-            }
-    except Exception as e:
-        logger.warning(f"Could not fetch branding settings: {e}")
+    """Fetch branding settings from database (cached for _branding_cache_ttl seconds)"""
+    cached = _branding_cache.get("branding")
+    if cached and time.time() - cached["cached_at"] < _branding_cache_ttl:
+        return cached["data"]
+    
+    async with _branding_lock:
+        # Another send may have refreshed the cache while we waited
+        cached = _branding_cache.get("branding")
+        if cached and time.time() - cached["cached_at"] < _branding_cache_ttl:
+            return cached["data"]
+        
+        try:
+            settings = await db.settings.find_one({"type": "branding"}, {"_id": 0})
+            branding = DEFAULT_BRANDING
+            if settings:
+                branding = Branding(
+                    company_name=settings.get("company_name", DEFAULT_BRANDING.company_name),
+                    logo_url=settings.get("logo_url"),
+                    primary_color=settings.get("primary_color", DEFAULT_BRANDING.primary_color),
+                )
+            _branding_cache["branding"] = {"data": branding, "cached_at": time.time()}
+            return branding
+        except Exception as e:
+            logger.warning("Could not fetch branding settings: %s", e)
     
-    return {
-        "company_name": "Vasilis NetShield",
-        "logo_url": None,
-        "primary_color": "#D4A836",
-    }
+    return DEFAULT_BRANDING
 
 
 async def get_system_email_template(db, template_id: str) -> dict:
@@ -98,14 +411,70 @@ async def get_system_email_template(db, template_id: str) -> dict:
             return {**default, **custom}
         return default
     except Exception as e:
-        logger.warning(f"Could not fetch email template: {e}")
+        logger.warning("Could not fetch email template: %s", e)
         return {}
 
 
 def get_login_url():
     """Get the login URL from environment"""
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
-    return f"{frontend_url}/auth"
+    return LOGIN_URL
+
+
+_SYSTEM_EMAIL_ICONS = {
+    "shield": "🛡️",
+    "mail": "📧",
+    "key": "🔑",
+    "alert": "⚠️",
+    "check": "✅",
+    "none": ""
+}
+
+_SYSTEM_EMAIL_CREDENTIALS_HTML = Template("""
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};margin-bottom:20px;">
+<p style="color:${primary_color};margin:0 0 10px 0;font-weight:bold;">Your Login Credentials:</p>
+<p style="color:#888;margin:0 0 5px 0;">Email: <strong style="color:#E8DDB5;">${user_email}</strong></p>
+<p style="color:#888;margin:0;">Password: <code style="background:#2a2a34;color:#E8DDB5;padding:3px 8px;border-radius:4px;">${password}</code></p>
+</div>""")
+
+_SYSTEM_EMAIL_CTA_HTML = Template("""
+<tr><td style="padding:0 30px 20px 30px;text-align:center;">
+<a href="${cta_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;font-size:16px;">${cta_text}</a>
+</td></tr>""")
+
+_SYSTEM_EMAIL_WARNING_HTML = Template("""
+<tr><td style="padding:0 30px 20px 30px;">
+<div style="background:#2a2a34;border-radius:8px;padding:12px;">
+<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️ ${security_warning}</strong></p>
+</div>
+</td></tr>""")
+
+_SYSTEM_EMAIL_HTML = Template("""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
+<body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
+<table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
+<tr><td align="center">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
+<tr><td style="padding:30px;text-align:center;">
+${icon_html}
+<h1 style="color:${primary_color};margin:0 0 5px 0;font-size:24px;">${header_title}</h1>
+<p style="color:#888;margin:0 0 20px 0;font-size:14px;">${header_subtitle}</p>
+</td></tr>
+<tr><td style="padding:0 30px;">
+<p style="color:#E8DDB5;margin:0 0 15px 0;">${greeting}</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">${body}</p>
+${credentials_html}
+</td></tr>
+${cta_html}
+${warning_html}
+<tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
+<p style="color:#666;margin:0;font-size:12px;">${footer}</p>
+</td></tr>
+</table>
+</td></tr>
+</table>
+</body>
+</html>""")
 
 
 def generate_email_html_from_template(template: dict, data: dict) -> str:
@@ -114,33 +483,23 @@ def generate_email_html_from_template(template: dict, data: dict) -> str:
     show_icon = template.get("show_icon", True)
     icon_type = template.get("icon_type", "shield")
     
-    # Icon mapping
-    icons = {
-        "shield": "🛡️",
-        "mail": "📧",
-        "key": "🔑",
-        "alert": "⚠️",
-        "check": "✅",
-        "none": ""
-    }
-    icon = icons.get(icon_type, "🛡️") if show_icon else ""
+    icon = _SYSTEM_EMAIL_ICONS.get(icon_type, "🛡️") if show_icon else ""
+    
+    # The template text is admin-authored HTML; only the data filled into it
+    # is escaped.
+    safe_data = {key: _esc(value) for key, value in data.items()}
     
     # Format template strings with data
     def fmt(s):
         if not s:
             return ""
         try:
-            return s.format(**data)
+            return s.format(**safe_data)
         except KeyError:
             return s
     
-    header_title = fmt(template.get("header_title", ""))
-    header_subtitle = fmt(template.get("header_subtitle", ""))
-    greeting = fmt(template.get("greeting_template", ""))
-    body = fmt(template.get("body_template", ""))
     cta_text = fmt(template.get("cta_text", ""))
     cta_url = fmt(template.get("cta_url_template", ""))
-    footer = fmt(template.get("footer_text", ""))
     security_warning = fmt(template.get("security_warning_text", ""))
     show_cta = template.get("show_cta", True)
     show_security_warning = template.get("show_security_warning", False)
@@ -148,84 +507,116 @@ def generate_email_html_from_template(template: dict, data: dict) -> str:
     # Credentials section (only for welcome/password_reset)
     credentials_html = ""
     if "password" in data and data.get("password"):
-        credentials_html = f"""
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};margin-bottom:20px;">
-<p style="color:{primary_color};margin:0 0 10px 0;font-weight:bold;">Your Login Credentials:</p>
-<p style="color:#888;margin:0 0 5px 0;">Email: <strong style="color:#E8DDB5;">{data.get('user_email', '')}</strong></p>
-<p style="color:#888;margin:0;">Password: <code style="background:#2a2a34;color:#E8DDB5;padding:3px 8px;border-radius:4px;">{data.get('password', '')}</code></p>
-</div>"""
+        credentials_html = _SYSTEM_EMAIL_CREDENTIALS_HTML.substitute(
+            primary_color=primary_color,
+            user_email=safe_data.get("user_email", ""),
+            password=safe_data["password"],
+        )
     
     # CTA button
     cta_html = ""
     if show_cta and cta_text and cta_url:
-        cta_html = f"""
-<tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{cta_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;font-size:16px;">{cta_text}</a>
-</td></tr>"""
+        cta_html = _SYSTEM_EMAIL_CTA_HTML.substitute(primary_color=primary_color, cta_url=cta_url, cta_text=cta_text)
     
     # Security warning
     warning_html = ""
     if show_security_warning and security_warning:
-        warning_html = f"""
-<tr><td style="padding:0 30px 20px 30px;">
-<div style="background:#2a2a34;border-radius:8px;padding:12px;">
-<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️ {security_warning}</strong></p>
-</div>
-</td></tr>"""
+        warning_html = _SYSTEM_EMAIL_WARNING_HTML.substitute(security_warning=security_warning)
     
     # Icon section
     icon_html = ""
     if icon:
         icon_html = f'<div style="font-size:40px;margin-bottom:10px;">{icon}</div>'
     
-    html = f"""<!DOCTYPE html>
+    return _SYSTEM_EMAIL_HTML.substitute(
+        primary_color=primary_color,
+        icon_html=icon_html,
+        header_title=fmt(template.get("header_title", "")),
+        header_subtitle=fmt(template.get("header_subtitle", "")),
+        greeting=fmt(template.get("greeting_template", "")),
+        body=fmt(template.get("body_template", "")),
+        credentials_html=credentials_html,
+        cta_html=cta_html,
+        warning_html=warning_html,
+        footer=fmt(template.get("footer_text", "")),
+    )
+
+
+# Newlines and indentation between tags are only there for readability;
+# strip them once at import so every send posts a smaller body.
+_squeeze_html = re.compile(r">\s*\n\s*<").sub
+
+
+def _html_template(html: str) -> Template:
+    return Template(_squeeze_html("><", html))
+
+
+_WELCOME_EMAIL_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
-{icon_html}
-<h1 style="color:{primary_color};margin:0 0 5px 0;font-size:24px;">{header_title}</h1>
-<p style="color:#888;margin:0 0 20px 0;font-size:14px;">{header_subtitle}</p>
+<div style="font-size:40px;margin-bottom:10px;">🛡️</div>
+<h1 style="color:${primary_color};margin:0 0 5px 0;font-size:24px;">Welcome to ${company_name}!</h1>
+<p style="color:#888;margin:0 0 20px 0;font-size:14px;">Your account has been created</p>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">{greeting}</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">{body}</p>
-{credentials_html}
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">An administrator has created an account for you.</p>
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};margin-bottom:20px;">
+<p style="color:${primary_color};margin:0 0 10px 0;font-weight:bold;">Your Login Credentials:</p>
+<p style="color:#888;margin:0 0 5px 0;">Email: <strong style="color:#E8DDB5;">${user_email}</strong></p>
+<p style="color:#888;margin:0;">Password: <code style="background:#2a2a34;color:#E8DDB5;padding:3px 8px;border-radius:4px;">${password}</code></p>
+</div>
+</td></tr>
+<tr><td style="padding:0 30px 20px 30px;text-align:center;">
+<a href="${login_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;font-size:16px;">Login to Your Account</a>
+</td></tr>
+<tr><td style="padding:0 30px 20px 30px;">
+<div style="background:#2a2a34;border-radius:8px;padding:12px;">
+<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️ Security:</strong> Change your password after first login.</p>
+</div>
 </td></tr>
-{cta_html}
-{warning_html}
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{footer}</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name} Security Training Platform</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    return html
+</html>""")
+
+_WELCOME_EMAIL_TEXT = Template("""Welcome to ${company_name}!
+
+Hello ${user_name},
+
+Your account has been created.
+
+Login Credentials:
+- Email: ${user_email}
+- Password: ${password}
+
+Login here: ${login_url}
+
+Please change your password after first login.
+
+${company_name}""")
+
+
+_WELCOME_EMAIL_SUBJECT = Template("Welcome to ${company_name} - Your Login Credentials")
 
 
 async def send_welcome_email(user_email: str, user_name: str, password: str, login_url: str = None, db=None):
     """Send welcome email with login credentials to a new user"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
-        logger.warning(f"Email not configured - skipping welcome email to {user_email}")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping welcome email to %s", user_email)
         return False
     
-    # Get branding settings
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
-    
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     
     if not login_url:
         login_url = get_login_url()
@@ -254,570 +645,496 @@ async def send_welcome_email(user_email: str, user_name: str, password: str, log
             subject = f"Welcome to {company_name} - Your Login Credentials"
     else:
         # Fallback to hardcoded template
-        html_content = f"""<!DOCTYPE html>
+        html_content = _branded(_WELCOME_EMAIL_HTML, _esc(company_name), primary_color).substitute(
+            user_name=_esc(user_name),
+            user_email=_esc(user_email),
+            password=_esc(password),
+            login_url=login_url,
+        )
+        subject = f"Welcome to {company_name} - Your Login Credentials"  # noqa: F841
+    
+    plain_text = _branded(_WELCOME_EMAIL_TEXT, company_name).substitute(
+        user_name=user_name,
+        user_email=user_email,
+        password=password,
+        login_url=login_url,
+    )
+    
+    message = _compose(
+        company_name, user_email,
+        _branded(_WELCOME_EMAIL_SUBJECT, company_name).substitute(),
+        html_content=html_content,
+        plain_text=plain_text,
+        dynamic_template=None if template else ("WELCOME", {**data, "primary_color": primary_color}),
+    )
+    return await _deliver(message, "welcome email", user_email)
+
+
+_PASSWORD_RESET_EMAIL_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
-<div style="font-size:40px;margin-bottom:10px;">🛡️</div>
-<h1 style="color:{primary_color};margin:0 0 5px 0;font-size:24px;">Welcome to {company_name}!</h1>
-<p style="color:#888;margin:0 0 20px 0;font-size:14px;">Your account has been created</p>
+<div style="font-size:40px;margin-bottom:10px;">🔐</div>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">Password Reset</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">An administrator has created an account for you.</p>
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};margin-bottom:20px;">
-<p style="color:{primary_color};margin:0 0 10px 0;font-weight:bold;">Your Login Credentials:</p>
-<p style="color:#888;margin:0 0 5px 0;">Email: <strong style="color:#E8DDB5;">{user_email}</strong></p>
-<p style="color:#888;margin:0;">Password: <code style="background:#2a2a34;color:#E8DDB5;padding:3px 8px;border-radius:4px;">{password}</code></p>
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">Your password has been reset by an administrator.</p>
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};margin-bottom:20px;">
+<p style="color:${primary_color};margin:0 0 10px 0;font-weight:bold;">Your New Password:</p>
+<code style="display:block;background:#2a2a34;color:#E8DDB5;padding:12px;border-radius:4px;font-size:18px;">${new_password}</code>
 </div>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{login_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;font-size:16px;">Login to Your Account</a>
+<a href="${login_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Login Now</a>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;">
-<div style="background:#2a2a34;border-radius:8px;padding:12px;">
-<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️ Security:</strong> Change your password after first login.</p>
-</div>
+<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️</strong> Change your password immediately after logging in.</p>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name} Security Training Platform</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-        subject = f"Welcome to {company_name} - Your Login Credentials"  # noqa: F841
-    
-    plain_text = f"""Welcome to {company_name}!
-
-Hello {user_name},
-
-Your account has been created.
-
-Login Credentials:
-- Email: {user_email}
-- Password: {password}
-
-Login here: {login_url}
+</html>""")
 
-Please change your password after first login.
 
-{company_name}"""
-    
-    message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(user_email),
-        subject=f"Welcome to {company_name} - Your Login Credentials"
-    )
-    message.add_content(Content("text/plain", plain_text))
-    message.add_content(Content("text/html", html_content))
-    
-    # DISABLE CLICK TRACKING to prevent URL wrapping
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        
-        if response.status_code == 202:
-            logger.info(f"Welcome email sent to {user_email}")
-            return True
-        else:
-            logger.error(f"SendGrid returned status {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Failed to send welcome email: {e}")
-        return False
+_PASSWORD_RESET_EMAIL_SUBJECT = Template("${company_name} - Your Password Has Been Reset")
 
 
 async def send_password_reset_email(user_email: str, user_name: str, new_password: str, login_url: str = None, db=None):
     """Send password reset email to a user"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
-        logger.warning(f"Email not configured - skipping password reset email")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping password reset email")
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
-    
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     
     if not login_url:
         login_url = get_login_url()
     
-    html_content = f"""<!DOCTYPE html>
+    html_content = _branded(_PASSWORD_RESET_EMAIL_HTML, _esc(company_name), primary_color).substitute(
+        user_name=_esc(user_name),
+        new_password=_esc(new_password),
+        login_url=login_url,
+    )
+    
+    message = _compose(
+        company_name, user_email,
+        _branded(_PASSWORD_RESET_EMAIL_SUBJECT, company_name).substitute(),
+        html_content=html_content,
+        dynamic_template=("PASSWORD_RESET", {
+            "user_name": user_name, "new_password": new_password, "login_url": login_url,
+            "company_name": company_name, "primary_color": primary_color,
+        }),
+    )
+    return await _deliver(message, "password reset email", user_email)
+
+
+_FORGOT_PASSWORD_EMAIL_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
 <div style="font-size:40px;margin-bottom:10px;">🔐</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">Password Reset</h1>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">Password Reset Request</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">Your password has been reset by an administrator.</p>
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};margin-bottom:20px;">
-<p style="color:{primary_color};margin:0 0 10px 0;font-weight:bold;">Your New Password:</p>
-<code style="display:block;background:#2a2a34;color:#E8DDB5;padding:12px;border-radius:4px;font-size:18px;">{new_password}</code>
-</div>
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">We received a request to reset your password. Click below to set a new password:</p>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{login_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Login Now</a>
+<a href="${reset_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Reset Password</a>
+<p style="color:#888;margin:15px 0 0 0;font-size:13px;">This link expires in 1 hour.</p>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;">
-<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️</strong> Change your password immediately after logging in.</p>
+<div style="background:#2a2a34;border-radius:8px;padding:12px;">
+<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️</strong> Didn't request this? Ignore this email.</p>
+</div>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name}</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(user_email),
-        subject=f"{company_name} - Your Password Has Been Reset"
-    )
-    message.add_content(Content("text/html", html_content))
-    
-    # DISABLE CLICK TRACKING
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        
-        if response.status_code == 202:
-            logger.info(f"Password reset email sent to {user_email}")
-            return True
-        else:
-            logger.error(f"SendGrid returned status {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Failed to send password reset email: {e}")
-        return False
+</html>""")
+
+_FORGOT_PASSWORD_EMAIL_TEXT = Template("""Password Reset Request
+
+Hello ${user_name},
+
+We received a request to reset your password. 
+
+Reset your password here: ${reset_url}
+
+This link expires in 1 hour.
+
+If you didn't request this, ignore this email.
+
+${company_name}""")
+
+
+_FORGOT_PASSWORD_EMAIL_SUBJECT = Template("${company_name} - Password Reset Request")
 
 
 async def send_forgot_password_email(user_email: str, user_name: str, reset_token: str, db=None):
     """Send forgot password email with reset link"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
-        logger.warning(f"Email not configured - skipping forgot password email")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping forgot password email")
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
-    
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
+    frontend_url = FRONTEND_URL
     reset_url = f"{frontend_url}/auth?reset_token={reset_token}"
     
-    html_content = f"""<!DOCTYPE html>
+    html_content = _branded(_FORGOT_PASSWORD_EMAIL_HTML, _esc(company_name), primary_color).substitute(
+        user_name=_esc(user_name),
+        reset_url=reset_url,
+    )
+    
+    plain_text = _branded(_FORGOT_PASSWORD_EMAIL_TEXT, company_name).substitute(
+        user_name=user_name,
+        reset_url=reset_url,
+    )
+    
+    message = _compose(
+        company_name, user_email,
+        _branded(_FORGOT_PASSWORD_EMAIL_SUBJECT, company_name).substitute(),
+        html_content=html_content,
+        plain_text=plain_text,
+        dynamic_template=("FORGOT_PASSWORD", {
+            "user_name": user_name, "reset_url": reset_url,
+            "company_name": company_name, "primary_color": primary_color,
+        }),
+    )
+    return await _deliver(message, "forgot password email", user_email)
+
+
+_PASSWORD_EXPIRY_REMINDER_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
-<div style="font-size:40px;margin-bottom:10px;">🔐</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">Password Reset Request</h1>
+<div style="font-size:40px;margin-bottom:10px;">⏰</div>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">Password Expiring Soon</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">We received a request to reset your password. Click below to set a new password:</p>
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">Your password will expire in <strong style="color:#FF6B6B;">${days_remaining} days</strong>.</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">Please log in and change your password to avoid any access issues.</p>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{reset_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Reset Password</a>
-<p style="color:#888;margin:15px 0 0 0;font-size:13px;">This link expires in 1 hour.</p>
-</td></tr>
-<tr><td style="padding:0 30px 20px 30px;">
-<div style="background:#2a2a34;border-radius:8px;padding:12px;">
-<p style="color:#FF6B6B;margin:0;font-size:13px;"><strong>⚠️</strong> Didn't request this? Ignore this email.</p>
-</div>
+<a href="${login_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Change Password</a>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name}</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    plain_text = f"""Password Reset Request
+</html>""")
 
-Hello {user_name},
 
-We received a request to reset your password. 
-
-Reset your password here: {reset_url}
-
-This link expires in 1 hour.
-
-If you didn't request this, ignore this email.
-
-{company_name}"""
-    
-    message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(user_email),
-        subject=f"{company_name} - Password Reset Request"
-    )
-    message.add_content(Content("text/plain", plain_text))
-    message.add_content(Content("text/html", html_content))
-    
-    # DISABLE CLICK TRACKING
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        
-        if response.status_code == 202:
-            logger.info(f"Forgot password email sent to {user_email}")
-            return True
-        else:
-            logger.error(f"SendGrid returned status {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Failed to send forgot password email: {e}")
-        return False
+_PASSWORD_EXPIRY_REMINDER_SUBJECT = Template("${company_name} - Password Expiring in ${days_remaining} Days")
 
 
-async def send_password_expiry_reminder(user_email: str, user_name: str, days_remaining: int, db=None):
+async def send_password_expiry_reminder(user_email: str, user_name: str, days_remaining: int, db=None,
+                                        force: bool = False):
     """Send password expiry reminder email"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
+    recent_key = ("password expiry", days_remaining)
+    if not _unsent_recipients(recent_key, [user_email], force):
+        return True
     
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     login_url = get_login_url()
     
-    html_content = f"""<!DOCTYPE html>
+    html_content = _branded(_PASSWORD_EXPIRY_REMINDER_HTML, _esc(company_name), primary_color).substitute(
+        user_name=_esc(user_name),
+        days_remaining=days_remaining,
+        login_url=login_url,
+    )
+    
+    message = _compose(
+        company_name, user_email,
+        _branded(_PASSWORD_EXPIRY_REMINDER_SUBJECT, company_name).substitute(days_remaining=days_remaining),
+        html_content=html_content,
+        dynamic_template=("PASSWORD_EXPIRY", {
+            "user_name": user_name, "days_remaining": days_remaining, "login_url": login_url,
+            "company_name": company_name, "primary_color": primary_color,
+        }),
+    )
+    return await _deliver_marked((recent_key,), message, "password expiry reminder", user_email)
+
+
+_ACCESS_REQUEST_NOTIFICATION_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
-<div style="font-size:40px;margin-bottom:10px;">⏰</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">Password Expiring Soon</h1>
+<div style="font-size:40px;margin-bottom:10px;">📬</div>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">New Access Request</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">Your password will expire in <strong style="color:#FF6B6B;">{days_remaining} days</strong>.</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">Please log in and change your password to avoid any access issues.</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">A new user has requested access to ${company_name}:</p>
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};">
+<p style="color:#888;margin:0 0 5px 0;">Name: <strong style="color:#E8DDB5;">${requester_name}</strong></p>
+<p style="color:#888;margin:0;">Email: <strong style="color:#E8DDB5;">${requester_email}</strong></p>
+${org_info}
+</div>
+${msg_info}
 </td></tr>
-<tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{login_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Change Password</a>
+<tr><td style="padding:20px 30px;text-align:center;">
+<a href="${dashboard_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Review Request</a>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name}</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(user_email),
-        subject=f"{company_name} - Password Expiring in {days_remaining} Days"
-    )
-    message.add_content(Content("text/html", html_content))
-    
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        return response.status_code == 202
-    except Exception as e:
-        logger.error(f"Failed to send password expiry reminder: {e}")
-        return False
+</html>""")
+
+
+_ACCESS_REQUEST_NOTIFICATION_SUBJECT = Template("${company_name} - New Access Request from ${requester_name}")
 
 
 async def send_access_request_notification(admin_email: str, requester_name: str, requester_email: str, 
                                            organization_name: str = None, message: str = None, db=None):
     """Send notification to admin about new access request"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
+    company_name, primary_color = await _branding(db)
     
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
-    
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
+    frontend_url = FRONTEND_URL
     dashboard_url = f"{frontend_url}/access-requests"
     
-    org_info = f"<p style='color:#888;margin:5px 0;'>Organization: <strong style='color:#E8DDB5;'>{organization_name}</strong></p>" if organization_name else ""
-    msg_info = f"<div style='background:#2a2a34;border-radius:8px;padding:12px;margin-top:15px;'><p style='color:#888;margin:0 0 5px 0;font-size:13px;'>Message:</p><p style='color:#E8DDB5;margin:0;'>{message}</p></div>" if message else ""
+    org_info = f"<p style='color:#888;margin:5px 0;'>Organization: <strong style='color:#E8DDB5;'>{_esc(organization_name)}</strong></p>" if organization_name else ""
+    msg_info = f"<div style='background:#2a2a34;border-radius:8px;padding:12px;margin-top:15px;'><p style='color:#888;margin:0 0 5px 0;font-size:13px;'>Message:</p><p style='color:#E8DDB5;margin:0;'>{_esc(message)}</p></div>" if message else ""
+    
+    html_content = _branded(_ACCESS_REQUEST_NOTIFICATION_HTML, _esc(company_name), primary_color).substitute(
+        requester_name=_esc(requester_name),
+        requester_email=_esc(requester_email),
+        org_info=org_info,
+        msg_info=msg_info,
+        dashboard_url=dashboard_url,
+    )
     
-    html_content = f"""<!DOCTYPE html>
+    message = _compose(
+        company_name, admin_email,
+        _branded(_ACCESS_REQUEST_NOTIFICATION_SUBJECT, company_name).substitute(requester_name=requester_name),
+        html_content=html_content,
+    )
+    return await _deliver(message, "access request notification", admin_email)
+
+
+_TRAINING_REMINDER_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
-<div style="font-size:40px;margin-bottom:10px;">📬</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">New Access Request</h1>
+<div style="font-size:40px;margin-bottom:10px;">📚</div>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">Training Reminder</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 20px 0;">A new user has requested access to {company_name}:</p>
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};">
-<p style="color:#888;margin:0 0 5px 0;">Name: <strong style="color:#E8DDB5;">{requester_name}</strong></p>
-<p style="color:#888;margin:0;">Email: <strong style="color:#E8DDB5;">{requester_email}</strong></p>
-{org_info}
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">You have a pending training module to complete:</p>
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};">
+<p style="color:${primary_color};margin:0;font-size:18px;font-weight:bold;">${training_name}</p>
+${due_info}
 </div>
-{msg_info}
 </td></tr>
 <tr><td style="padding:20px 30px;text-align:center;">
-<a href="{dashboard_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Review Request</a>
+<a href="${login_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Start Training</a>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name}</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    message_obj = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(admin_email),
-        subject=f"{company_name} - New Access Request from {requester_name}"
+</html>""")
+
+
+_TRAINING_REMINDER_SUBJECT = Template("${company_name} - Training Reminder: ${training_name}")
+
+
+# Markers carry a per-process random token so branding text can never
+# collide with them.
+_MARKER_TOKEN = os.urandom(6).hex()
+_REQUEST_BODY_MARKER = re.compile(rb"__SG" + _MARKER_TOKEN.encode() + rb"_([A-Z_]+)__")
+
+
+def _marker(field: str) -> str:
+    return f"__SG{_MARKER_TOKEN}_{field}__"
+
+
+@lru_cache(maxsize=16)
+def _training_reminder_body(company_name: str, primary_color: str) -> bytes:
+    """Serialised training-reminder request with _marker() placeholders.
+
+    Reminders go out in bulk and differ only in a handful of fields, so the
+    payload is built and serialised once per branding; each send just fills in
+    the markers (see _fill_request_body).
+    """
+    html_content = _branded(_TRAINING_REMINDER_HTML, _esc(company_name), primary_color).substitute(
+        user_name=_marker("USER_NAME"),
+        training_name=_marker("TRAINING_NAME_HTML"),
+        due_info=_marker("DUE_INFO"),
+        login_url=LOGIN_URL,
     )
-    message_obj.add_content(Content("text/html", html_content))
-    
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message_obj.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message_obj)
-        return response.status_code == 202
-    except Exception as e:
-        logger.error(f"Failed to send access request notification: {e}")
-        return False
+    payload = _compose(
+        company_name, "recipient@example.invalid",
+        _branded(_TRAINING_REMINDER_SUBJECT, company_name).substitute(training_name=_marker("TRAINING_NAME")),
+        html_content=html_content,
+    )
+    payload["personalizations"][0]["to"][0]["email"] = _marker("TO")
+    return orjson.dumps(payload)
+
 
+def _fill_request_body(body: bytes, values: dict) -> bytes:
+    """Replace the _marker() placeholders in body with JSON-escaped values.
 
-async def send_training_reminder(user_email: str, user_name: str, training_name: str, due_date: str = None, db=None):
+    A single pass, so marker-like text inside a value is never substituted.
+    """
+    encoded = {field.encode(): orjson.dumps(str(value))[1:-1] for field, value in values.items()}
+    return _REQUEST_BODY_MARKER.sub(lambda m: encoded.get(m.group(1), m.group(0)), body)
+
+
+async def send_training_reminder(user_email: str, user_name: str, training_name: str, due_date: str = None, db=None,
+                                 force: bool = False):
     """Send training reminder email"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
+    recent_key = ("training reminder", training_name)
+    if not _unsent_recipients(recent_key, [user_email], force):
+        return True
     
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     login_url = get_login_url()
     
-    due_info = f"<p style='color:#FF6B6B;margin:15px 0 0 0;font-size:14px;'><strong>Due:</strong> {due_date}</p>" if due_date else ""
+    if os.environ.get("SENDGRID_TPL_TRAINING_REMINDER"):
+        message = _compose(
+            company_name, user_email,
+            _branded(_TRAINING_REMINDER_SUBJECT, company_name).substitute(training_name=training_name),
+            dynamic_template=("TRAINING_REMINDER", {
+                "user_name": user_name, "training_name": training_name, "due_date": due_date,
+                "login_url": login_url, "company_name": company_name, "primary_color": primary_color,
+            }),
+        )
+        return await _deliver_marked((recent_key,), message, "training reminder", user_email)
+    
+    due_info = f"<p style='color:#FF6B6B;margin:15px 0 0 0;font-size:14px;'><strong>Due:</strong> {_esc(due_date)}</p>" if due_date else ""
     
-    html_content = f"""<!DOCTYPE html>
+    body = _fill_request_body(_training_reminder_body(company_name, primary_color), {
+        "TO": user_email,
+        "USER_NAME": _esc(user_name),
+        "TRAINING_NAME": training_name,
+        "TRAINING_NAME_HTML": _esc(training_name),
+        "DUE_INFO": due_info,
+    })
+    return await _deliver_marked((recent_key,), body, "training reminder", user_email)
+
+
+_CERTIFICATE_EMAIL_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
-<div style="font-size:40px;margin-bottom:10px;">📚</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">Training Reminder</h1>
+<div style="font-size:40px;margin-bottom:10px;">🏆</div>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">Congratulations!</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">You have a pending training module to complete:</p>
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};">
-<p style="color:{primary_color};margin:0;font-size:18px;font-weight:bold;">{training_name}</p>
-{due_info}
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">You have successfully completed your training and earned a certificate:</p>
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};text-align:center;">
+<p style="color:${primary_color};margin:0;font-size:20px;font-weight:bold;">${certificate_name}</p>
 </div>
 </td></tr>
 <tr><td style="padding:20px 30px;text-align:center;">
-<a href="{login_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Start Training</a>
+${view_button}
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name}</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(user_email),
-        subject=f"{company_name} - Training Reminder: {training_name}"
-    )
-    message.add_content(Content("text/html", html_content))
-    
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        return response.status_code == 202
-    except Exception as e:
-        logger.error(f"Failed to send training reminder: {e}")
-        return False
+</html>""")
+
+
+_CERTIFICATE_EMAIL_SUBJECT = Template("🏆 ${company_name} - Certificate Earned: ${certificate_name}")
 
 
 async def send_certificate_email(user_email: str, user_name: str, certificate_name: str, 
                                   certificate_url: str = None, db=None):
     """Send certificate completion email"""
     
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
-    
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     login_url = get_login_url()
     
     view_button = f'<a href="{certificate_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View Certificate</a>' if certificate_url else f'<a href="{login_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View in Dashboard</a>'
     
-    html_content = f"""<!DOCTYPE html>
-<html>
-<head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
-<body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
-<table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
-<tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
-<tr><td style="padding:30px;text-align:center;">
-<div style="font-size:40px;margin-bottom:10px;">🏆</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">Congratulations!</h1>
-</td></tr>
-<tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">You have successfully completed your training and earned a certificate:</p>
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};text-align:center;">
-<p style="color:{primary_color};margin:0;font-size:20px;font-weight:bold;">{certificate_name}</p>
-</div>
-</td></tr>
-<tr><td style="padding:20px 30px;text-align:center;">
-{view_button}
-</td></tr>
-<tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name}</p>
-</td></tr>
-</table>
-</td></tr>
-</table>
-</body>
-</html>"""
-    
-    message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(user_email),
-        subject=f"🏆 {company_name} - Certificate Earned: {certificate_name}"
+    html_content = _branded(_CERTIFICATE_EMAIL_HTML, _esc(company_name), primary_color).substitute(
+        user_name=_esc(user_name),
+        certificate_name=_esc(certificate_name),
+        view_button=view_button,
     )
-    message.add_content(Content("text/html", html_content))
-    
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    message.tracking_settings = tracking_settings
     
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        return response.status_code == 202
-    except Exception as e:
-        logger.error(f"Failed to send certificate email: {e}")
-        return False
+    message = _compose(
+        company_name, user_email,
+        _branded(_CERTIFICATE_EMAIL_SUBJECT, company_name).substitute(certificate_name=certificate_name),
+        html_content=html_content,
+        dynamic_template=("CERTIFICATE", {
+            "user_name": user_name, "certificate_name": certificate_name,
+            "certificate_url": certificate_url or login_url,
+            "company_name": company_name, "primary_color": primary_color,
+        }),
+    )
+    return await _deliver(message, "certificate email", user_email)
 
 
-async def send_account_lockout_notification(admin_emails: list, locked_email: str, ip_address: str, 
-                                             lockout_duration: int = 15, db=None):
-    """Send notification to admins when a user account is locked due to failed login attempts"""
-    
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    
-    if not sendgrid_api_key or not sender_email:
-        logger.warning("Email not configured - skipping lockout notification")
-        return False
-    
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
-    
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
-    
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
-    security_url = f"{frontend_url}/security-dashboard"
-    
-    from datetime import datetime, timezone
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    
-    html_content = f"""<!DOCTYPE html>
+_ACCOUNT_LOCKOUT_NOTIFICATION_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
@@ -831,10 +1148,10 @@ async def send_account_lockout_notification(admin_emails: list, locked_email: st
 <tr><td style="padding:0 30px;">
 <p style="color:#E8DDB5;margin:0 0 20px 0;">An account has been automatically locked due to multiple failed login attempts:</p>
 <div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid #FF6B6B;">
-<p style="color:#888;margin:0 0 10px 0;">Locked Account: <strong style="color:#FF6B6B;">{locked_email}</strong></p>
-<p style="color:#888;margin:0 0 10px 0;">IP Address: <strong style="color:#E8DDB5;">{ip_address or 'Unknown'}</strong></p>
-<p style="color:#888;margin:0 0 10px 0;">Timestamp: <strong style="color:#E8DDB5;">{timestamp}</strong></p>
-<p style="color:#888;margin:0;">Lock Duration: <strong style="color:#E8DDB5;">{lockout_duration} minutes</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">Locked Account: <strong style="color:#FF6B6B;">${locked_email}</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">IP Address: <strong style="color:#E8DDB5;">${ip_address}</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">Timestamp: <strong style="color:#E8DDB5;">${timestamp}</strong></p>
+<p style="color:#888;margin:0;">Lock Duration: <strong style="color:#E8DDB5;">${lockout_duration} minutes</strong></p>
 </div>
 </td></tr>
 <tr><td style="padding:20px 30px;">
@@ -843,215 +1160,204 @@ async def send_account_lockout_notification(admin_emails: list, locked_email: st
 </div>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{security_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View Security Dashboard</a>
+<a href="${security_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View Security Dashboard</a>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name} Security Alert System</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name} Security Alert System</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    plain_text = f"""Account Locked Alert
+</html>""")
+
+_ACCOUNT_LOCKOUT_NOTIFICATION_TEXT = Template("""Account Locked Alert
 
 An account has been automatically locked due to multiple failed login attempts:
 
-- Locked Account: {locked_email}
-- IP Address: {ip_address or 'Unknown'}
-- Timestamp: {timestamp}
-- Lock Duration: {lockout_duration} minutes
+- Locked Account: ${locked_email}
+- IP Address: ${ip_address}
+- Timestamp: ${timestamp}
+- Lock Duration: ${lockout_duration} minutes
 
-Please review this activity in the Security Dashboard: {security_url}
+Please review this activity in the Security Dashboard: ${security_url}
 
-{company_name} Security Alert System"""
-    
-    success_count = 0
-    for admin_email in admin_emails:
-        message = Mail(
-            from_email=Email(sender_email, f"{company_name} Security"),
-            to_emails=To(admin_email),
-            subject=f"🔒 {company_name} Security Alert - Account Locked: {locked_email}"
-        )
-        message.add_content(Content("text/plain", plain_text))
-        message.add_content(Content("text/html", html_content))
-        
-        tracking_settings = TrackingSettings()
-        tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-        message.tracking_settings = tracking_settings
-        
-        try:
-            sg = SendGridAPIClient(sendgrid_api_key)
-            response = sg.send(message)
-            if response.status_code == 202:
-                success_count += 1
-                logger.info(f"Account lockout notification sent to {admin_email}")
-        except Exception as e:
-            logger.error(f"Failed to send lockout notification to {admin_email}: {e}")
-    
-    return success_count > 0
+${company_name} Security Alert System""")
 
 
-async def send_contact_form_submission(name: str, email: str, message: str, phone: str = None, db=None):
-    """Send contact form submission to info@vasilisnetshield.com"""
-    
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
-    info_email = os.environ.get('INFO_EMAIL', 'info@vasilisnetshield.com')
+_ACCOUNT_LOCKOUT_NOTIFICATION_SUBJECT = Template("🔒 ${company_name} Security Alert - Account Locked: ${locked_email}")
+
+
+async def send_account_lockout_notification(admin_emails: list, locked_email: str, ip_address: str, 
+                                             lockout_duration: int = 15, db=None, force: bool = False):
+    """Send notification to admins when a user account is locked due to failed login attempts"""
     
-    if not sendgrid_api_key or not sender_email:
-        logger.warning("Email not configured - skipping contact form email")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping lockout notification")
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
+    recent_key = ("account lockout", locked_email)
+    admin_emails = _unsent_recipients(recent_key, admin_emails, force)
+    if not admin_emails:
+        return True
     
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    company_name, primary_color = await _branding(db)
     
-    from datetime import datetime, timezone
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    frontend_url = FRONTEND_URL
+    security_url = f"{frontend_url}/security-dashboard"
     
-    phone_info = f"<p style='color:#888;margin:5px 0;'>Phone: <strong style='color:#E8DDB5;'>{phone}</strong></p>" if phone else ""
+    timestamp = _utc_timestamp()
     
-    html_content = f"""<!DOCTYPE html>
+    html_content = _branded(_ACCOUNT_LOCKOUT_NOTIFICATION_HTML, _esc(company_name), primary_color).substitute(
+        locked_email=_esc(locked_email),
+        ip_address=_esc(ip_address or 'Unknown'),
+        timestamp=timestamp,
+        lockout_duration=lockout_duration,
+        security_url=security_url,
+    )
+    
+    plain_text = _branded(_ACCOUNT_LOCKOUT_NOTIFICATION_TEXT, company_name).substitute(
+        locked_email=locked_email,
+        ip_address=ip_address or 'Unknown',
+        timestamp=timestamp,
+        lockout_duration=lockout_duration,
+        security_url=security_url,
+    )
+    
+    subject = _branded(_ACCOUNT_LOCKOUT_NOTIFICATION_SUBJECT, company_name).substitute(locked_email=locked_email)
+    
+    # One request per batch; is_multiple gives each admin their own
+    # personalization so recipients don't see each other.
+    results = await asyncio.gather(*(
+        _deliver_marked(
+            (recent_key,),
+            _compose(
+                f"{company_name} Security", batch, subject,
+                html_content=html_content,
+                plain_text=plain_text,
+                is_multiple=True,
+            ),
+            "account lockout notification", batch,
+        )
+        for batch in _recipient_batches(admin_emails)
+    ))
+    return any(results)
+
+
+_CONTACT_FORM_SUBMISSION_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
 <div style="font-size:40px;margin-bottom:10px;">📬</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">New Contact Form Submission</h1>
-<p style="color:#888;margin:10px 0 0 0;font-size:14px;">{timestamp}</p>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">New Contact Form Submission</h1>
+<p style="color:#888;margin:10px 0 0 0;font-size:14px;">${timestamp}</p>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid {primary_color};">
-<p style="color:#888;margin:0 0 10px 0;">Name: <strong style="color:#E8DDB5;">{name}</strong></p>
-<p style="color:#888;margin:0 0 10px 0;">Email: <strong style="color:#E8DDB5;">{email}</strong></p>
-{phone_info}
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid ${primary_color};">
+<p style="color:#888;margin:0 0 10px 0;">Name: <strong style="color:#E8DDB5;">${name}</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">Email: <strong style="color:#E8DDB5;">${email}</strong></p>
+${phone_info}
 </div>
 </td></tr>
 <tr><td style="padding:20px 30px;">
-<p style="color:{primary_color};margin:0 0 10px 0;font-weight:bold;">Message:</p>
+<p style="color:${primary_color};margin:0 0 10px 0;font-weight:bold;">Message:</p>
 <div style="background:#0f0f15;border-radius:8px;padding:15px;">
-<p style="color:#E8DDB5;margin:0;white-space:pre-wrap;">{message}</p>
+<p style="color:#E8DDB5;margin:0;white-space:pre-wrap;">${message}</p>
 </div>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">Reply directly to this email to respond to {name}</p>
+<p style="color:#666;margin:0;font-size:12px;">Reply directly to this email to respond to ${name}</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    plain_text = f"""New Contact Form Submission
-Received: {timestamp}
+</html>""")
 
-From: {name}
-Email: {email}
-{f'Phone: {phone}' if phone else ''}
+_CONTACT_FORM_SUBMISSION_TEXT = Template("""New Contact Form Submission
+Received: ${timestamp}
+
+From: ${name}
+Email: ${email}
+${phone_line}
 
 Message:
-{message}
+${message}
 
 ---
-Reply directly to this email to respond."""
-    
-    mail_message = Mail(
-        from_email=Email(sender_email, company_name),
-        to_emails=To(info_email),
-        subject=f"📬 New Contact Form: {name}"
-    )
-    mail_message.add_content(Content("text/plain", plain_text))
-    mail_message.add_content(Content("text/html", html_content))
-    
-    # Set reply-to as the submitter's email
-    from sendgrid.helpers.mail import ReplyTo
-    mail_message.reply_to = ReplyTo(email, name)
-    
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    mail_message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(mail_message)
-        if response.status_code == 202:
-            logger.info(f"Contact form submission sent to {info_email} from {email}")
-            return True
-        else:
-            logger.error(f"SendGrid returned status {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Failed to send contact form email: {e}")
-        return False
+Reply directly to this email to respond.""")
 
 
-async def send_retraining_email(user_email: str, user_name: str, scenario_type: str, db=None):
-    """Send retraining notification to user who clicked a phishing link"""
-    
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
+async def send_contact_form_submission(name: str, email: str, message: str, phone: str = None, db=None):
+    """Send contact form submission to info@vasilisnetshield.com"""
     
-    if not sendgrid_api_key or not sender_email:
-        logger.warning("Email not configured - skipping retraining email")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping contact form email")
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
+    company_name, primary_color = await _branding(db)
     
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    timestamp = _utc_timestamp()
     
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
-    training_url = f"{frontend_url}/training"
+    phone_info = f"<p style='color:#888;margin:5px 0;'>Phone: <strong style='color:#E8DDB5;'>{_esc(phone)}</strong></p>" if phone else ""
     
-    scenario_names = {
-        "phishing_email": "Phishing Email",
-        "qr_code_phishing": "QR Code Phishing",
-        "bec_scenario": "Business Email Compromise",
-        "usb_drop": "USB Drop Attack",
-        "mfa_fatigue": "MFA Fatigue Attack",
-        "data_handling_trap": "Data Handling",
-        "ransomware_readiness": "Ransomware Awareness",
-        "shadow_it_detection": "Shadow IT",
-        "malicious_ad": "Malicious Advertisement",
-        "social_engineering": "Social Engineering"
-    }
-    scenario_name = scenario_names.get(scenario_type, "Security Awareness")
+    html_content = _CONTACT_FORM_SUBMISSION_HTML.substitute(
+        primary_color=primary_color,
+        timestamp=timestamp,
+        name=_esc(name),
+        email=_esc(email),
+        phone_info=phone_info,
+        message=_esc(message),
+    )
     
-    html_content = f"""<!DOCTYPE html>
+    plain_text = _CONTACT_FORM_SUBMISSION_TEXT.substitute(
+        timestamp=timestamp,
+        name=name,
+        email=email,
+        phone_line=f'Phone: {phone}' if phone else '',
+        message=message,
+    )
+    
+    mail_message = _compose(
+        company_name, INFO_EMAIL,
+        f"📬 New Contact Form: {name}",
+        html_content=html_content,
+        plain_text=plain_text,
+        # Set reply-to as the submitter's email
+        reply_to=(email, name),
+    )
+    return await _deliver(mail_message, "contact form email", INFO_EMAIL)
+
+
+_RETRAINING_EMAIL_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
 <table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
 <tr><td align="center">
-<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid {primary_color};">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid ${primary_color};">
 <tr><td style="padding:30px;text-align:center;">
 <div style="font-size:40px;margin-bottom:10px;">📚</div>
-<h1 style="color:{primary_color};margin:0;font-size:24px;">Security Training Required</h1>
+<h1 style="color:${primary_color};margin:0;font-size:24px;">Security Training Required</h1>
 </td></tr>
 <tr><td style="padding:0 30px;">
-<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>{user_name}</strong>,</p>
-<p style="color:#E8DDB5;margin:0 0 20px 0;">You recently clicked on a simulated security threat during our <strong style="color:{primary_color};">{scenario_name}</strong> awareness exercise.</p>
+<p style="color:#E8DDB5;margin:0 0 15px 0;">Hello <strong>${user_name}</strong>,</p>
+<p style="color:#E8DDB5;margin:0 0 20px 0;">You recently clicked on a simulated security threat during our <strong style="color:${primary_color};">${scenario_name}</strong> awareness exercise.</p>
 <div style="background:#FF6B6B20;border-radius:8px;padding:15px;border:1px solid #FF6B6B40;margin-bottom:20px;">
 <p style="color:#FF6B6B;margin:0;font-size:14px;"><strong>⚠️ Don't worry!</strong> This was a training simulation. No harm was done, but it's important to improve your awareness.</p>
 </div>
 <p style="color:#E8DDB5;margin:0 0 20px 0;">Your training progress has been reset for this module. Please complete the training to strengthen your security awareness skills.</p>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{training_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Start Training Now</a>
+<a href="${training_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">Start Training Now</a>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;">
 <div style="background:#0f0f15;border-radius:8px;padding:15px;">
-<p style="color:{primary_color};margin:0 0 10px 0;font-weight:bold;">Tips to Stay Safe:</p>
+<p style="color:${primary_color};margin:0 0 10px 0;font-weight:bold;">Tips to Stay Safe:</p>
 <ul style="color:#888;margin:0;padding-left:20px;">
 <li style="margin-bottom:5px;">Always verify the sender's email address</li>
 <li style="margin-bottom:5px;">Hover over links before clicking</li>
@@ -1061,24 +1367,24 @@ async def send_retraining_email(user_email: str, user_name: str, scenario_type:
 </div>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name} Security Training</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name} Security Training</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    plain_text = f"""Security Training Required
+</html>""")
 
-Hello {user_name},
+_RETRAINING_EMAIL_TEXT = Template("""Security Training Required
 
-You recently clicked on a simulated security threat during our {scenario_name} awareness exercise.
+Hello ${user_name},
+
+You recently clicked on a simulated security threat during our ${scenario_name} awareness exercise.
 
 Don't worry! This was a training simulation. No harm was done, but it's important to improve your awareness.
 
 Your training progress has been reset for this module. Please complete the training:
-{training_url}
+${training_url}
 
 Tips to Stay Safe:
 - Always verify the sender's email address
@@ -1086,73 +1392,48 @@ Tips to Stay Safe:
 - When in doubt, contact IT directly
 - Report suspicious emails immediately
 
-{company_name} Security Training"""
-    
-    mail_message = Mail(
-        from_email=Email(sender_email, f"{company_name} Training"),
-        to_emails=To(user_email),
-        subject=f"📚 {company_name} - Security Training Required"
-    )
-    mail_message.add_content(Content("text/plain", plain_text))
-    mail_message.add_content(Content("text/html", html_content))
-    
-    tracking_settings = TrackingSettings()
-    tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-    mail_message.tracking_settings = tracking_settings
-    
-    try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(mail_message)
-        if response.status_code == 202:
-            logger.info(f"Retraining email sent to {user_email}")
-            return True
-        else:
-            logger.error(f"SendGrid returned status {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Failed to send retraining email: {e}")
-        return False
+${company_name} Security Training""")
 
 
-async def send_training_failure_notification(admin_emails: list, user_name: str, user_email: str, 
-                                              organization_name: str, scenario_type: str, db=None):
-    """Send notification to admins when a user fails a phishing simulation"""
-    
-    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-    sender_email = os.environ.get('SENDER_EMAIL')
+_RETRAINING_EMAIL_SUBJECT = Template("📚 ${company_name} - Security Training Required")
+
+
+async def send_retraining_email(user_email: str, user_name: str, scenario_type: str, db=None):
+    """Send retraining notification to user who clicked a phishing link"""
     
-    if not sendgrid_api_key or not sender_email:
-        logger.warning("Email not configured - skipping training failure notification")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping retraining email")
         return False
     
-    branding = {"company_name": "Vasilis NetShield", "primary_color": "#D4A836"}
-    if db is not None:
-        branding = await get_branding_settings(db)
+    company_name, primary_color = await _branding(db)
     
-    company_name = branding.get("company_name", "Vasilis NetShield")
-    primary_color = branding.get("primary_color", "#D4A836")
+    frontend_url = FRONTEND_URL
+    training_url = f"{frontend_url}/training"
     
-    frontend_url = os.environ.get('FRONTEND_URL', 'https://vasilisnetshield.com')
-    analytics_url = f"{frontend_url}/advanced-analytics"
+    scenario_name = SCENARIO_NAMES.get(scenario_type, "Security Awareness")
     
-    from datetime import datetime, timezone
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    
-    scenario_names = {
-        "phishing_email": "Phishing Email",
-        "qr_code_phishing": "QR Code Phishing",
-        "bec_scenario": "Business Email Compromise",
-        "usb_drop": "USB Drop Attack",
-        "mfa_fatigue": "MFA Fatigue Attack",
-        "data_handling_trap": "Data Handling",
-        "ransomware_readiness": "Ransomware Awareness",
-        "shadow_it_detection": "Shadow IT",
-        "malicious_ad": "Malicious Advertisement",
-        "social_engineering": "Social Engineering"
-    }
-    scenario_name = scenario_names.get(scenario_type, "Security Simulation")
+    html_content = _branded(_RETRAINING_EMAIL_HTML, _esc(company_name), primary_color).substitute(
+        user_name=_esc(user_name),
+        scenario_name=scenario_name,
+        training_url=training_url,
+    )
+    
+    plain_text = _branded(_RETRAINING_EMAIL_TEXT, company_name).substitute(
+        user_name=user_name,
+        scenario_name=scenario_name,
+        training_url=training_url,
+    )
     
-    html_content = f"""<!DOCTYPE html>
+    message = _compose(
+        f"{company_name} Training", user_email,
+        _branded(_RETRAINING_EMAIL_SUBJECT, company_name).substitute(),
+        html_content=html_content,
+        plain_text=plain_text,
+    )
+    return await _deliver(message, "retraining email", user_email)
+
+
+_TRAINING_FAILURE_NOTIFICATION_HTML = _html_template("""<!DOCTYPE html>
 <html>
 <head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
 <body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
@@ -1162,15 +1443,15 @@ async def send_training_failure_notification(admin_emails: list, user_name: str,
 <tr><td style="padding:30px;text-align:center;">
 <div style="font-size:40px;margin-bottom:10px;">⚠️</div>
 <h1 style="color:#FF6B6B;margin:0;font-size:24px;">Training Failure Alert</h1>
-<p style="color:#888;margin:10px 0 0 0;font-size:14px;">{timestamp}</p>
+<p style="color:#888;margin:10px 0 0 0;font-size:14px;">${timestamp}</p>
 </td></tr>
 <tr><td style="padding:0 30px;">
 <p style="color:#E8DDB5;margin:0 0 20px 0;">A user has clicked on a simulated phishing link:</p>
 <div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid #FF6B6B;">
-<p style="color:#888;margin:0 0 10px 0;">User: <strong style="color:#E8DDB5;">{user_name}</strong></p>
-<p style="color:#888;margin:0 0 10px 0;">Email: <strong style="color:#E8DDB5;">{user_email}</strong></p>
-<p style="color:#888;margin:0 0 10px 0;">Organization: <strong style="color:#E8DDB5;">{organization_name or 'N/A'}</strong></p>
-<p style="color:#888;margin:0;">Simulation Type: <strong style="color:#FF6B6B;">{scenario_name}</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">User: <strong style="color:#E8DDB5;">${user_name}</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">Email: <strong style="color:#E8DDB5;">${user_email}</strong></p>
+<p style="color:#888;margin:0 0 10px 0;">Organization: <strong style="color:#E8DDB5;">${organization_name}</strong></p>
+<p style="color:#888;margin:0;">Simulation Type: <strong style="color:#FF6B6B;">${scenario_name}</strong></p>
 </div>
 </td></tr>
 <tr><td style="padding:20px 30px;">
@@ -1183,95 +1464,381 @@ async def send_training_failure_notification(admin_emails: list, user_name: str,
 </div>
 </td></tr>
 <tr><td style="padding:0 30px 20px 30px;text-align:center;">
-<a href="{analytics_url}" style="display:inline-block;background:{primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View Analytics</a>
+<a href="${analytics_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View Analytics</a>
 </td></tr>
 <tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
-<p style="color:#666;margin:0;font-size:12px;">{company_name} Security Training System</p>
+<p style="color:#666;margin:0;font-size:12px;">${company_name} Security Training System</p>
 </td></tr>
 </table>
 </td></tr>
 </table>
 </body>
-</html>"""
-    
-    plain_text = f"""Training Failure Alert
-{timestamp}
+</html>""")
+
+_TRAINING_FAILURE_NOTIFICATION_TEXT = Template("""Training Failure Alert
+${timestamp}
 
 A user has clicked on a simulated phishing link:
 
-- User: {user_name}
-- Email: {user_email}
-- Organization: {organization_name or 'N/A'}
-- Simulation Type: {scenario_name}
+- User: ${user_name}
+- Email: ${user_email}
+- Organization: ${organization_name}
+- Simulation Type: ${scenario_name}
 
 Automatic Actions Taken:
 - User's training progress has been reset
 - Retraining notification email sent to user
 
-View detailed analytics: {analytics_url}
+View detailed analytics: ${analytics_url}
+
+${company_name} Security Training System""")
+
 
-{company_name} Security Training System"""
+async def send_training_failure_notification(admin_emails: list, user_name: str, user_email: str, 
+                                              organization_name: str, scenario_type: str, db=None,
+                                              force: bool = False):
+    """Send notification to admins when a user fails a phishing simulation"""
     
-    success_count = 0
-    for admin_email in admin_emails:
-        mail_message = Mail(
-            from_email=Email(sender_email, f"{company_name} Training"),
-            to_emails=To(admin_email),
-            subject=f"⚠️ Training Failure: {user_name} clicked {scenario_name} simulation"
-        )
-        mail_message.add_content(Content("text/plain", plain_text))
-        mail_message.add_content(Content("text/html", html_content))
-        
-        tracking_settings = TrackingSettings()
-        tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
-        mail_message.tracking_settings = tracking_settings
-        
-        try:
-            sg = SendGridAPIClient(sendgrid_api_key)
-            response = sg.send(mail_message)
-            if response.status_code == 202:
-                success_count += 1
-                logger.info(f"Training failure notification sent to {admin_email}")
-        except Exception as e:
-            logger.error(f"Failed to send training failure notification to {admin_email}: {e}")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping training failure notification")
+        return False
+    
+    recent_key = ("training failure", user_email, scenario_type)
+    admin_emails = _unsent_recipients(recent_key, admin_emails, force)
+    if not admin_emails:
+        return True
     
-    return success_count > 0
+    company_name, primary_color = await _branding(db)
+    
+    frontend_url = FRONTEND_URL
+    analytics_url = f"{frontend_url}/advanced-analytics"
+    
+    timestamp = _utc_timestamp()
+    
+    scenario_name = SCENARIO_NAMES.get(scenario_type, "Security Simulation")
+    
+    html_content = _branded(_TRAINING_FAILURE_NOTIFICATION_HTML, _esc(company_name), primary_color).substitute(
+        timestamp=timestamp,
+        user_name=_esc(user_name),
+        user_email=_esc(user_email),
+        organization_name=_esc(organization_name or 'N/A'),
+        scenario_name=scenario_name,
+        analytics_url=analytics_url,
+    )
+    
+    plain_text = _branded(_TRAINING_FAILURE_NOTIFICATION_TEXT, company_name).substitute(
+        timestamp=timestamp,
+        user_name=user_name,
+        user_email=user_email,
+        organization_name=organization_name or 'N/A',
+        scenario_name=scenario_name,
+        analytics_url=analytics_url,
+    )
+    
+    subject = f"⚠️ Training Failure: {user_name} clicked {scenario_name} simulation"
+    
+    results = await asyncio.gather(*(
+        _deliver_marked(
+            (recent_key,),
+            _compose(
+                f"{company_name} Training", batch, subject,
+                html_content=html_content,
+                plain_text=plain_text,
+                is_multiple=True,
+            ),
+            "training failure notification", batch,
+        )
+        for batch in _recipient_batches(admin_emails)
+    ))
+    return any(results)
 
 
+_TRAINING_FAILURE_DIGEST_HTML = _html_template("""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><meta name="viewport" content="width=device-width"></head>
+<body style="margin:0;padding:0;background:#0f0f15;font-family:Arial,sans-serif;">
+<table width="100%" cellpadding="0" cellspacing="0" style="background:#0f0f15;padding:20px 0;">
+<tr><td align="center">
+<table width="600" cellpadding="0" cellspacing="0" style="background:#1a1a24;border-radius:10px;border:1px solid #FF6B6B;">
+<tr><td style="padding:30px;text-align:center;">
+<div style="font-size:40px;margin-bottom:10px;">⚠️</div>
+<h1 style="color:#FF6B6B;margin:0;font-size:24px;">Training Failure Alert</h1>
+<p style="color:#888;margin:10px 0 0 0;font-size:14px;">${timestamp}</p>
+</td></tr>
+<tr><td style="padding:0 30px;">
+<p style="color:#E8DDB5;margin:0 0 20px 0;">${failure_count} users have clicked on simulated phishing links:</p>
+<div style="background:#0f0f15;border-radius:8px;padding:20px;border-left:4px solid #FF6B6B;">
+<p style="color:#888;margin:0 0 15px 0;">Organization: <strong style="color:#E8DDB5;">${organization_name}</strong></p>
+<table width="100%" cellpadding="0" cellspacing="0" style="font-size:14px;">
+<tr><td style="color:#888;padding:0 0 8px 0;">User</td><td style="color:#888;padding:0 0 8px 0;">Email</td><td style="color:#888;padding:0 0 8px 0;">Simulation Type</td></tr>
+${failure_rows}
+</table>
+</div>
+</td></tr>
+<tr><td style="padding:20px 30px;">
+<div style="background:#1a4a1a;border-radius:8px;padding:15px;border:1px solid #2a6a2a;">
+<p style="color:#4CAF50;margin:0;font-size:14px;"><strong>✓ Automatic Actions Taken:</strong></p>
+<ul style="color:#888;margin:10px 0 0 0;padding-left:20px;">
+<li>Each user's training progress has been reset</li>
+<li>Retraining notification emails sent to each user</li>
+</ul>
+</div>
+</td></tr>
+<tr><td style="padding:0 30px 20px 30px;text-align:center;">
+<a href="${analytics_url}" style="display:inline-block;background:${primary_color};color:#000;text-decoration:none;padding:14px 40px;border-radius:8px;font-weight:bold;">View Analytics</a>
+</td></tr>
+<tr><td style="padding:20px 30px;border-top:1px solid #333;text-align:center;">
+<p style="color:#666;margin:0;font-size:12px;">${company_name} Security Training System</p>
+</td></tr>
+</table>
+</td></tr>
+</table>
+</body>
+</html>""")
 
-async def send_event_rsvp_confirmation(to_email: str, event_title: str, event_date: str, event_location: str = None, db=None) -> bool:
-    """Send RSVP confirmation email"""
-    sg_api_key = os.environ.get("SENDGRID_API_KEY")
-    sender_email = os.environ.get("SENDER_EMAIL", "noreply@vasilisnetshield.com")
-    
-    if not sg_api_key:
-        logger.warning("SendGrid API key not configured")
-        return False
+_TRAINING_FAILURE_DIGEST_ROW_HTML = Template(
+    '<tr><td style="color:#E8DDB5;padding:4px 8px 4px 0;">${user_name}</td>'
+    '<td style="color:#E8DDB5;padding:4px 8px 4px 0;">${user_email}</td>'
+    '<td style="color:#FF6B6B;padding:4px 0;">${scenario_name}</td></tr>'
+)
+
+_TRAINING_FAILURE_DIGEST_TEXT = Template("""Training Failure Alert
+${timestamp}
+
+${failure_count} users have clicked on simulated phishing links (Organization: ${organization_name}):
+
+${failure_lines}
+
+Automatic Actions Taken:
+- Each user's training progress has been reset
+- Retraining notification emails sent to each user
+
+View detailed analytics: ${analytics_url}
+
+${company_name} Security Training System""")
+
+
+async def send_training_failure_digest(admin_emails: list, failures: list, organization_name: str, db=None):
+    """Send admins one summary of several phishing simulation failures.
+
+    failures is a list of dicts with user_name, user_email and scenario_type.
+    """
     
-    if not is_valid_email(to_email):
-        logger.warning(f"Invalid email format: {to_email}")
+    if not SENDGRID_API_KEY or not SENDER_EMAIL:
+        logger.warning("Email not configured - skipping training failure digest")
         return False
     
-    # Format date nicely
-    try:
-        from dateutil.parser import parse
-        dt = parse(event_date)
-        formatted_date = dt.strftime("%B %d, %Y at %I:%M %p")
-    except:
-        formatted_date = event_date
+    # Failures the admins were already told about in the last RECENT_SEND_TTL
+    # seconds are left out
+    failures = [
+        f for f in failures
+        if _unsent_recipients(("training failure", f["user_email"], f["scenario_type"]), admin_emails)
+    ]
+    if not failures:
+        return True
+    recent_keys = [("training failure", f["user_email"], f["scenario_type"]) for f in failures]
+    
+    company_name, primary_color = await _branding(db)
+    
+    analytics_url = f"{FRONTEND_URL}/advanced-analytics"
+    timestamp = _utc_timestamp()
+    
+    failure_rows = []
+    failure_lines = []
+    for f in failures:
+        scenario_name = SCENARIO_NAMES.get(f["scenario_type"], "Security Simulation")
+        failure_rows.append(_TRAINING_FAILURE_DIGEST_ROW_HTML.substitute(
+            user_name=_esc(f["user_name"]),
+            user_email=_esc(f["user_email"]),
+            scenario_name=scenario_name,
+        ))
+        failure_lines.append(f"- {f['user_name']} ({f['user_email']}) - {scenario_name}")
+    
+    html_content = _branded(_TRAINING_FAILURE_DIGEST_HTML, _esc(company_name), primary_color).substitute(
+        timestamp=timestamp,
+        failure_count=len(failures),
+        organization_name=_esc(organization_name or 'N/A'),
+        failure_rows="".join(failure_rows),
+        analytics_url=analytics_url,
+    )
     
-    location_html = f"<p><strong>Location:</strong> {event_location}</p>" if event_location else ""
+    plain_text = _branded(_TRAINING_FAILURE_DIGEST_TEXT, company_name).substitute(
+        timestamp=timestamp,
+        failure_count=len(failures),
+        organization_name=organization_name or 'N/A',
+        failure_lines="\n".join(failure_lines),
+        analytics_url=analytics_url,
+    )
     
-    html_content = f"""
+    subject = f"⚠️ Training Failures: {len(failures)} users clicked phishing simulations"
+    
+    results = await asyncio.gather(*(
+        _deliver_marked(
+            recent_keys,
+            _compose(
+                f"{company_name} Training", batch, subject,
+                html_content=html_content,
+                plain_text=plain_text,
+                is_multiple=True,
+            ),
+            "training failure digest", batch,
+        )
+        for batch in _recipient_batches(admin_emails)
+    ))
+    return any(results)
+
+
+# When a campaign lands many users fail within seconds of each other.
+# buffer_training_failure() records each failure in the training_failure_digest
+# collection; send_due_training_failures() sends those older than
+# TRAINING_FAILURE_DIGEST_WINDOW seconds as one email per admins and
+# organization: the usual alert if there was a single failure, a digest
+# otherwise. Failures are stored rather than held in memory because a
+# serverless instance can be frozen before an in-process timer fires; the
+# timer below is only a fast path, and the scheduled-campaign sweep and cron
+# endpoint drain whatever it missed. Rows are deleted only once their email
+# has gone out.
+TRAINING_FAILURE_DIGEST_WINDOW = float(os.environ.get('TRAINING_FAILURE_DIGEST_WINDOW', '30'))
+# A claimed batch whose sender died mid-send is retried after this long
+TRAINING_FAILURE_CLAIM_TIMEOUT = 600
+# Give up on a batch after this many failed sends
+TRAINING_FAILURE_MAX_ATTEMPTS = 5
+_failure_flush = None  # pending in-process drain task
+
+
+async def ensure_email_indexes(db):
+    """Index the fields the training failure drain filters on (idempotent)."""
+    await asyncio.gather(
+        db.training_failure_digest.create_index([("claimed_at", 1), ("created_at", 1)]),
+        db.training_failure_digest.create_index([("claim", 1)]),
+    )
+
+
+async def buffer_training_failure(db, admin_emails: list, user_name: str, user_email: str,
+                                  organization_name: str, scenario_type: str):
+    """Add a failure to the next notification to these admins."""
+    global _failure_flush
+    await db.training_failure_digest.insert_one({
+        "failure_id": uuid.uuid4().hex,
+        "admin_emails": sorted(set(admin_emails)),
+        "organization_name": organization_name,
+        "user_name": user_name,
+        "user_email": user_email,
+        "scenario_type": scenario_type,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "claimed_at": None,
+        "attempts": 0,
+    })
+    if _failure_flush is None or _failure_flush.done():
+        _failure_flush = asyncio.create_task(_flush_training_failures_later(db))
+
+
+async def _flush_training_failures_later(db):
+    # A little past the window, so the failure that started it is due
+    await asyncio.sleep(TRAINING_FAILURE_DIGEST_WINDOW + 1)
+    try:
+        await send_due_training_failures(db)
+    except Exception as e:
+        logger.error("Failed to send buffered training failures: %s", e)
+
+
+async def send_due_training_failures(db, flush_all: bool = False) -> int:
+    """Send every stored failure older than the digest window (or all of them
+    with flush_all). Returns the number of emails sent."""
+    now = datetime.now(timezone.utc)
+    unclaimed = {"$or": [
+        {"claimed_at": None},
+        {"claimed_at": {"$lt": (now - timedelta(seconds=TRAINING_FAILURE_CLAIM_TIMEOUT)).isoformat()}},
+    ]}
+    query = dict(unclaimed)
+    if not flush_all:
+        query["created_at"] = {"$lte": (now - timedelta(seconds=TRAINING_FAILURE_DIGEST_WINDOW)).isoformat()}
+    due = await db.training_failure_digest.find(query, {"_id": 0, "failure_id": 1}).to_list(1000)
+    if not due:
+        return 0
+
+    # Claim the batch so a concurrent sweep on another instance skips it
+    claim = uuid.uuid4().hex
+    await db.training_failure_digest.update_many(
+        {"failure_id": {"$in": [d["failure_id"] for d in due]}, **unclaimed},
+        {"$set": {"claimed_at": now.isoformat(), "claim": claim}},
+    )
+    claimed = await db.training_failure_digest.find({"claim": claim}, {"_id": 0}).to_list(1000)
+
+    groups = {}
+    for failure in claimed:
+        key = (tuple(failure["admin_emails"]), failure.get("organization_name"))
+        groups.setdefault(key, []).append(failure)
+    keys = list(groups)
+    results = await asyncio.gather(*(_send_training_failures(key, db, groups[key]) for key in keys))
+
+    sent_ids, failed_ids = [], []
+    for key, ok in zip(keys, results):
+        (sent_ids if ok else failed_ids).extend(f["failure_id"] for f in groups[key])
+    if sent_ids:
+        await db.training_failure_digest.delete_many({"failure_id": {"$in": sent_ids}})
+    if failed_ids:
+        await db.training_failure_digest.update_many(
+            {"failure_id": {"$in": failed_ids}},
+            {"$set": {"claimed_at": None}, "$unset": {"claim": ""}, "$inc": {"attempts": 1}},
+        )
+        dropped = await db.training_failure_digest.delete_many(
+            {"failure_id": {"$in": failed_ids}, "attempts": {"$gte": TRAINING_FAILURE_MAX_ATTEMPTS}}
+        )
+        if dropped.deleted_count:
+            logger.error("Dropped %d training failure alert(s) after %d failed sends",
+                         dropped.deleted_count, TRAINING_FAILURE_MAX_ATTEMPTS)
+    return sum(1 for ok in results if ok)
+
+
+async def _send_training_failures(key: tuple, db, failures: list) -> bool:
+    admin_emails, organization_name = key
+    # The same user failing the same scenario again within the window is one entry
+    failures = list({
+        (f["user_email"], f["scenario_type"]): {
+            "user_name": f["user_name"], "user_email": f["user_email"], "scenario_type": f["scenario_type"]
+        }
+        for f in failures
+    }.values())
+    try:
+        if len(failures) == 1:
+            return await send_training_failure_notification(
+                list(admin_emails), organization_name=organization_name, db=db, **failures[0]
+            )
+        return await send_training_failure_digest(list(admin_emails), failures, organization_name, db=db)
+    except Exception as e:
+        logger.error("Failed to send training failure notification: %s", e)
+        return False
+
+
+async def flush_training_failures(db):
+    """Send every stored failure now (called on app shutdown)."""
+    global _failure_flush
+    if _failure_flush is not None:
+        _failure_flush.cancel()
+        _failure_flush = None
+    await send_due_training_failures(db, flush_all=True)
+
+
+
+def _format_event_date(event_date: str) -> str:
+    """Format an event date nicely, or return it unchanged if it won't parse."""
+    try:
+        return _parse_date(event_date).strftime("%B %d, %Y at %I:%M %p")
+    except (ValueError, OverflowError, TypeError):
+        return event_date
+
+
+_EVENT_RSVP_CONFIRMATION_HTML = _html_template("""
     <html>
     <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f5f5f5;">
         <div style="background-color: #0D1117; padding: 30px; border-radius: 10px;">
             <h1 style="color: #D4A836; margin-bottom: 20px;">RSVP Confirmed!</h1>
             <p style="color: #E6EDF3; font-size: 16px;">Thank you for registering for:</p>
-            <h2 style="color: #FFFFFF; margin: 20px 0;">{event_title}</h2>
+            <h2 style="color: #FFFFFF; margin: 20px 0;">${event_title}</h2>
             <div style="background-color: #161B22; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                <p style="color: #E6EDF3;"><strong>Date:</strong> {formatted_date}</p>
-                {location_html}
+                <p style="color: #E6EDF3;"><strong>Date:</strong> ${formatted_date}</p>
+                ${location_html}
             </div>
             <p style="color: #8B949E; font-size: 14px;">We look forward to seeing you there!</p>
             <hr style="border: 1px solid #30363D; margin: 30px 0;">
@@ -1281,70 +1848,75 @@ async def send_event_rsvp_confirmation(to_email: str, event_title: str, event_da
         </div>
     </body>
     </html>
-    """
-    
-    try:
-        sg = SendGridAPIClient(api_key=sg_api_key)
-        message = Mail(
-            from_email=Email(sender_email, "VasilisNetShield Events"),
-            to_emails=[To(to_email)],
-            subject=f"RSVP Confirmed: {event_title}",
-            html_content=Content("text/html", html_content)
-        )
-        
-        response = sg.send(message)
-        return response.status_code == 202
-    except Exception as e:
-        logger.error(f"Failed to send RSVP confirmation: {e}")
-        return False
+    """)
 
 
-async def send_event_reminder(to_email: str, event_title: str, event_date: str, event_location: str = None) -> bool:
-    """Send event reminder email"""
-    sg_api_key = os.environ.get("SENDGRID_API_KEY")
-    sender_email = os.environ.get("SENDER_EMAIL", "noreply@vasilisnetshield.com")
+async def send_event_rsvp_confirmation(to_email: str, event_title: str, event_date: str, event_location: str = None, db=None) -> bool:
+    """Send RSVP confirmation email"""
+    if not SENDGRID_API_KEY:
+        logger.warning("SendGrid API key not configured")
+        return False
     
-    if not sg_api_key or not is_valid_email(to_email):
+    if not is_valid_email(to_email):
+        logger.warning("Invalid email format: %s", to_email)
         return False
     
-    # Format date nicely
-    try:
-        from dateutil.parser import parse
-        dt = parse(event_date)
-        formatted_date = dt.strftime("%B %d, %Y at %I:%M %p")
-    except:
-        formatted_date = event_date
+    formatted_date = _format_event_date(event_date)
     
-    location_html = f"<p><strong>Location:</strong> {event_location}</p>" if event_location else ""
+    location_html = f"<p><strong>Location:</strong> {_esc(event_location)}</p>" if event_location else ""
+    
+    html_content = _EVENT_RSVP_CONFIRMATION_HTML.substitute(
+        event_title=_esc(event_title),
+        formatted_date=_esc(formatted_date),
+        location_html=location_html,
+    )
     
-    html_content = f"""
+    message = _compose(
+        "VasilisNetShield Events", to_email,
+        f"RSVP Confirmed: {event_title}",
+        html_content=html_content,
+        sender_email=SENDER_EMAIL or DEFAULT_SENDER,
+    )
+    return await _deliver(message, "RSVP confirmation", to_email)
+
+
+_EVENT_REMINDER_HTML = _html_template("""
     <html>
     <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
         <div style="background-color: #0D1117; padding: 30px; border-radius: 10px;">
             <h1 style="color: #D4A836;">Event Reminder</h1>
             <p style="color: #E6EDF3;">Don't forget! You're registered for:</p>
-            <h2 style="color: #FFFFFF;">{event_title}</h2>
+            <h2 style="color: #FFFFFF;">${event_title}</h2>
             <div style="background-color: #161B22; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                <p style="color: #E6EDF3;"><strong>Date:</strong> {formatted_date}</p>
-                {location_html}
+                <p style="color: #E6EDF3;"><strong>Date:</strong> ${formatted_date}</p>
+                ${location_html}
             </div>
             <p style="color: #8B949E;">See you soon!</p>
         </div>
     </body>
     </html>
-    """
-    
-    try:
-        sg = SendGridAPIClient(api_key=sg_api_key)
-        message = Mail(
-            from_email=Email(sender_email, "VasilisNetShield Events"),
-            to_emails=[To(to_email)],
-            subject=f"Reminder: {event_title} is coming up!",
-            html_content=Content("text/html", html_content)
-        )
-        
-        response = sg.send(message)
-        return response.status_code == 202
-    except Exception as e:
-        logger.error(f"Failed to send event reminder: {e}")
+    """)
+
+
+async def send_event_reminder(to_email: str, event_title: str, event_date: str, event_location: str = None) -> bool:
+    """Send event reminder email"""
+    if not SENDGRID_API_KEY or not is_valid_email(to_email):
         return False
+    
+    formatted_date = _format_event_date(event_date)
+    
+    location_html = f"<p><strong>Location:</strong> {_esc(event_location)}</p>" if event_location else ""
+    
+    html_content = _EVENT_REMINDER_HTML.substitute(
+        event_title=_esc(event_title),
+        formatted_date=_esc(formatted_date),
+        location_html=location_html,
+    )
+    
+    message = _compose(
+        "VasilisNetShield Events", to_email,
+        f"Reminder: {event_title} is coming up!",
+        html_content=html_content,
+        sender_email=SENDER_EMAIL or DEFAULT_SENDER,
+    )
+    return await _deliver(message, "event reminder", to_email)
@@ -2,35 +2,173 @@
 Notification Service - Handles Discord webhooks and real-time notifications
 """
 import os
+import time
+import asyncio
 import logging
-import httpx
+import orjson
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Tuple
+
+from shared.background_queue import BackgroundQueue
+from shared.http_client import PooledHTTPClient
 
 logger = logging.getLogger(__name__)
 
 # Super admin webhook URL from environment (fallback)
 SUPER_ADMIN_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
 
+# All webhook posts to discord.com go through one pooled client
+_http = PooledHTTPClient(timeout=10.0)
+
+
+async def close_http_client():
+    """Close the pooled Discord connection (called on app shutdown)."""
+    await _http.aclose()
+
+
+# Alerts raised on a request path (a phishing click, a credential submission)
+# are queued so the response doesn't wait on Discord. One worker drains the
+# queue, posting whatever has piled up since its last wake-up concurrently.
+NOTIFICATION_QUEUE_SIZE = 10000
+NOTIFICATION_BATCH = 20
+_notifications = BackgroundQueue(
+    "Notification", NOTIFICATION_QUEUE_SIZE, workers=1, batch_size=NOTIFICATION_BATCH
+)
+
+
+def notify_in_background(notify_fn, *args, **kwargs) -> bool:
+    """Queue notify_fn(*args, **kwargs); False if the notification was dropped."""
+    return _notifications.put(notify_fn, *args, **kwargs)
+
+
+async def drain_background_notifications(timeout: float = 10.0):
+    """Flush queued notifications on shutdown."""
+    await _notifications.drain(timeout)
+
+
+# Webhook cache - every click and credential alert looks up the super admin
+# webhook and the organization's name and webhook. They only change when an
+# admin edits branding or an organization, and those routes call
+# invalidate_webhook_cache().
+_webhook_cache = {}
+_webhook_cache_ttl = 300  # 5 minutes
+# Lookups for a cache key are serialised on a lock, so a burst of clicks
+# arriving on a cold cache waits on a single Mongo lookup instead of each
+# issuing its own. Keys share a small fixed pool of locks rather than one
+# lock per organization kept forever.
+WEBHOOK_LOCK_POOL_SIZE = 32
+_webhook_locks = tuple(asyncio.Lock() for _ in range(WEBHOOK_LOCK_POOL_SIZE))
+
+
+def invalidate_webhook_cache(organization_id: str = None):
+    """Drop one organization's cached details, or everything if no id is given"""
+    if organization_id is None:
+        _webhook_cache.clear()
+    else:
+        _webhook_cache.pop(("org", organization_id), None)
+
+
+def _cached_webhook(key):
+    """Return (hit, value) for key from the webhook cache"""
+    cached = _webhook_cache.get(key)
+    if cached and time.time() - cached["cached_at"] < _webhook_cache_ttl:
+        return True, cached["value"]
+    return False, None
+
+
+def _webhook_lock(key) -> asyncio.Lock:
+    return _webhook_locks[hash(key) % WEBHOOK_LOCK_POOL_SIZE]
+
+
+async def ensure_notification_indexes(db):
+    """Index the fields the webhook lookups filter on (idempotent)."""
+    await asyncio.gather(
+        db.settings.create_index([("type", 1)]),
+        db.organizations.create_index([("organization_id", 1)]),
+    )
+
 
 async def get_super_admin_webhook(db) -> Optional[str]:
-    """Get Discord webhook URL from settings or environment"""
+    """Get Discord webhook URL from settings or environment (cached for _webhook_cache_ttl seconds)"""
     # First try to get from database settings
     if db is not None:
-        try:
-            settings = await db.settings.find_one(
-                {"type": "branding"},
-                {"_id": 0, "discord_webhook_url": 1}
-            )
-            if settings and settings.get("discord_webhook_url"):
-                return settings.get("discord_webhook_url")
-        except Exception as e:
-            logger.error(f"Error getting webhook from settings: {e}")
+        hit, url = _cached_webhook("super_admin")
+        if not hit:
+            async with _webhook_lock("super_admin"):
+                hit, url = _cached_webhook("super_admin")
+                if not hit:
+                    try:
+                        settings = await db.settings.find_one(
+                            {"type": "branding"},
+                            {"_id": 0, "discord_webhook_url": 1}
+                        )
+                        url = settings.get("discord_webhook_url") if settings else None
+                        _webhook_cache["super_admin"] = {"value": url, "cached_at": time.time()}
+                    except Exception as e:
+                        logger.error("Error getting webhook from settings: %s", e)
+        if url:
+            return url
     
     # Fallback to environment variable
     return SUPER_ADMIN_WEBHOOK_URL
 
 
+def _discord_payload(
+    title: str,
+    description: str,
+    color: int = 0xFF6B6B,
+    fields: list = None,
+    thumbnail_url: str = None
+) -> bytes:
+    """Serialise a single-embed webhook payload"""
+    embed = {
+        "title": title,
+        "description": description,
+        "color": color,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "footer": {
+            "text": "Vasilis NetShield Security Platform"
+        }
+    }
+    
+    if fields:
+        embed["fields"] = fields
+    
+    if thumbnail_url:
+        embed["thumbnail"] = {"url": thumbnail_url}
+    
+    return orjson.dumps({"embeds": [embed]})
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+async def _post_webhook(webhook_url: str, body: bytes) -> bool:
+    """Post an already serialised payload to a Discord webhook"""
+    if not webhook_url:
+        logger.warning("No Discord webhook URL provided")
+        return False
+    
+    try:
+        response = await _http.get().post(
+            webhook_url,
+            content=body,
+            headers=_JSON_HEADERS,
+            timeout=10.0
+        )
+        
+        if response.status_code in (200, 204):
+            logger.info("Discord notification sent successfully")
+            return True
+        else:
+            logger.error("Discord webhook failed: %s - %s", response.status_code, response.text)
+            return False
+                
+    except Exception as e:
+        logger.error("Error sending Discord notification: %s", e)
+        return False
+
+
 async def send_discord_notification(
     webhook_url: str,
     title: str,
@@ -45,43 +183,36 @@ async def send_discord_notification(
         return False
     
     try:
-        embed = {
-            "title": title,
-            "description": description,
-            "color": color,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "footer": {
-                "text": "Vasilis NetShield Security Platform"
-            }
-        }
-        
-        if fields:
-            embed["fields"] = fields
-        
-        if thumbnail_url:
-            embed["thumbnail"] = {"url": thumbnail_url}
-        
-        payload = {
-            "embeds": [embed]
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                webhook_url,
-                json=payload,
-                timeout=10.0
-            )
-            
-            if response.status_code in (200, 204):
-                logger.info(f"Discord notification sent successfully")
-                return True
-            else:
-                logger.error(f"Discord webhook failed: {response.status_code} - {response.text}")
-                return False
-                
+        body = _discord_payload(title, description, color, fields, thumbnail_url)
     except Exception as e:
-        logger.error(f"Error sending Discord notification: {e}")
+        logger.error("Error sending Discord notification: %s", e)
         return False
+    
+    return await _post_webhook(webhook_url, body)
+
+
+async def _send_to_webhooks(webhook_urls: list, **notification) -> list:
+    """Post the same notification to each webhook concurrently.
+
+    The payload is serialised once and the same bytes posted to every URL.
+    The webhooks are independent, so the slowest one sets the latency rather
+    than the sum of them, and one failing webhook never cancels the others.
+    Returns True/False per URL.
+    """
+    if not webhook_urls:
+        return []
+    try:
+        body = _discord_payload(**notification)
+    except Exception as e:
+        logger.error("Error sending Discord notification: %s", e)
+        return [False] * len(webhook_urls)
+    results = await asyncio.gather(
+        *(_post_webhook(url, body) for url in webhook_urls), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error("Error sending Discord notification: %s", result)
+    return [result is True for result in results]
 
 
 async def notify_phishing_click(
@@ -96,7 +227,23 @@ async def notify_phishing_click(
 ):
     """Send notification when a user clicks a phishing link"""
     
-    logger.info(f"notify_phishing_click called for {user_email}, org_webhook: {bool(org_webhook_url)}")
+    logger.info("notify_phishing_click called for %s, org_webhook: %s", user_email, bool(org_webhook_url))
+    
+    # Get super admin webhook from settings or env
+    super_admin_webhook = await get_super_admin_webhook(db)
+    logger.info("Super admin webhook available: %s", bool(super_admin_webhook))
+    
+    # Super admin webhook, plus the organization webhook if it's a different one
+    targets = {}
+    if super_admin_webhook:
+        targets["super admin"] = super_admin_webhook
+    if org_webhook_url and org_webhook_url != super_admin_webhook:
+        targets["organization"] = org_webhook_url
+    
+    # Nothing to post to - skip building the embed
+    if not targets:
+        logger.warning("No webhooks configured - notification not sent for %s", user_email)
+        return False
     
     title = "🚨 Phishing Link Clicked!"
     description = f"A user has clicked on a simulated phishing link."
@@ -115,40 +262,17 @@ async def notify_phishing_click(
         ua_display = user_agent[:100] + "..." if len(user_agent) > 100 else user_agent
         fields.append({"name": "💻 Device", "value": ua_display, "inline": False})
     
-    notifications_sent = 0
-    
-    # Get super admin webhook from settings or env
-    super_admin_webhook = await get_super_admin_webhook(db)
-    logger.info(f"Super admin webhook available: {bool(super_admin_webhook)}")
-    
-    # Send to super admin webhook
-    if super_admin_webhook:
-        result = await send_discord_notification(
-            webhook_url=super_admin_webhook,
-            title=title,
-            description=description,
-            color=0xFF6B6B,  # Red
-            fields=fields
-        )
+    results = await _send_to_webhooks(
+        list(targets.values()),
+        title=title,
+        description=description,
+        color=0xFF6B6B,  # Red
+        fields=fields
+    )
+    for label, result in zip(targets, results):
         if result:
-            notifications_sent += 1
-            logger.info("Sent notification to super admin webhook")
-    
-    # Send to organization webhook if provided
-    if org_webhook_url and org_webhook_url != super_admin_webhook:
-        result = await send_discord_notification(
-            webhook_url=org_webhook_url,
-            title=title,
-            description=description,
-            color=0xFF6B6B,
-            fields=fields
-        )
-        if result:
-            notifications_sent += 1
-            logger.info("Sent notification to organization webhook")
-    
-    if notifications_sent == 0:
-        logger.warning(f"No webhooks configured - notification not sent for {user_email}")
+            logger.info("Sent notification to %s webhook", label)
+    notifications_sent = sum(1 for result in results if result)
     
     return notifications_sent > 0
 
@@ -163,6 +287,20 @@ async def notify_credential_submission(
 ):
     """Send notification when a user submits credentials to a fake login page"""
     
+    # Get super admin webhook from settings or env
+    super_admin_webhook = await get_super_admin_webhook(db)
+    
+    # Super admin webhook, plus the organization webhook if it's a different one
+    webhook_urls = []
+    if super_admin_webhook:
+        webhook_urls.append(super_admin_webhook)
+    if org_webhook_url and org_webhook_url != super_admin_webhook:
+        webhook_urls.append(org_webhook_url)
+    
+    # Nothing to post to - skip building the embed
+    if not webhook_urls:
+        return
+    
     title = "CRITICAL: Credentials Submitted!"
     description = f"**CRITICAL**: A user has submitted credentials to a simulated phishing page."
     
@@ -173,28 +311,13 @@ async def notify_credential_submission(
         {"name": "Risk Level", "value": "HIGH - User entered credentials", "inline": False},
     ]
     
-    # Get super admin webhook from settings or env
-    super_admin_webhook = await get_super_admin_webhook(db)
-    
-    # Send to super admin webhook
-    if super_admin_webhook:
-        await send_discord_notification(
-            webhook_url=super_admin_webhook,
-            title=title,
-            description=description,
-            color=0xDC2626,  # Darker red for critical
-            fields=fields
-        )
-    
-    # Send to organization webhook
-    if org_webhook_url and org_webhook_url != super_admin_webhook:
-        await send_discord_notification(
-            webhook_url=org_webhook_url,
-            title=title,
-            description=description,
-            color=0xDC2626,
-            fields=fields
-        )
+    await _send_to_webhooks(
+        webhook_urls,
+        title=title,
+        description=description,
+        color=0xDC2626,  # Darker red for critical
+        fields=fields
+    )
 
 
 async def notify_campaign_launched(
@@ -206,6 +329,13 @@ async def notify_campaign_launched(
 ):
     """Send notification when a campaign is launched"""
     
+    # Super admin webhook and organization webhook
+    webhook_urls = [url for url in (SUPER_ADMIN_WEBHOOK_URL, org_webhook_url) if url]
+    
+    # Nothing to post to - skip building the embed
+    if not webhook_urls:
+        return
+    
     title = "🚀 Campaign Launched"
     description = f"A new phishing simulation campaign has been launched."
     
@@ -216,38 +346,37 @@ async def notify_campaign_launched(
         {"name": "👤 Launched By", "value": launched_by, "inline": True},
     ]
     
-    # Send to super admin webhook
-    if SUPER_ADMIN_WEBHOOK_URL:
-        await send_discord_notification(
-            webhook_url=SUPER_ADMIN_WEBHOOK_URL,
-            title=title,
-            description=description,
-            color=0x22C55E,  # Green
-            fields=fields
-        )
-    
-    # Send to organization webhook
-    if org_webhook_url:
-        await send_discord_notification(
-            webhook_url=org_webhook_url,
-            title=title,
-            description=description,
-            color=0x22C55E,
-            fields=fields
-        )
+    await _send_to_webhooks(
+        webhook_urls,
+        title=title,
+        description=description,
+        color=0x22C55E,  # Green
+        fields=fields
+    )
 
 
-async def get_org_webhook(db, organization_id: str) -> Optional[str]:
-    """Get Discord webhook URL for an organization"""
-    if not organization_id or not db:
-        return None
+async def get_org_notification_info(db, organization_id: str) -> Tuple[Optional[str], Optional[str]]:
+    """Get an organization's (name, Discord webhook URL) for alerts (cached for _webhook_cache_ttl seconds)"""
+    if not organization_id or db is None:
+        return None, None
     
-    try:
-        org = await db.organizations.find_one(
-            {"organization_id": organization_id},
-            {"_id": 0, "discord_webhook_url": 1}
-        )
-        return org.get("discord_webhook_url") if org else None
-    except Exception as e:
-        logger.error(f"Error getting org webhook: {e}")
-        return None
+    key = ("org", organization_id)
+    hit, info = _cached_webhook(key)
+    if hit:
+        return info
+    
+    async with _webhook_lock(key):
+        hit, info = _cached_webhook(key)
+        if hit:
+            return info
+        try:
+            org = await db.organizations.find_one(
+                {"organization_id": organization_id},
+                {"_id": 0, "name": 1, "discord_webhook_url": 1}
+            )
+            info = (org.get("name"), org.get("discord_webhook_url")) if org else (None, None)
+            _webhook_cache[key] = {"value": info, "cached_at": time.time()}
+            return info
+        except Exception as e:
+            logger.error("Error getting organization for notification: %s", e)
+            return None, None
@@ -1,60 +1,205 @@
+import io
+import re
 import uuid
+import base64
+import asyncio
 import secrets
 import logging
+from functools import lru_cache
 from datetime import datetime, timezone
+from email.generator import BytesGenerator
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
 from typing import List, Optional
 import os
+import httpx
+from markupsafe import escape as _esc
+from pymongo import ReturnDocument
+
+from services.email_service import (
+    DEFAULT_BRANDING, get_branding_settings, send_sendgrid_message
+)
+
+try:
+    from sendgrid.helpers.mail import Mail, Email, To, Content, ReplyTo
+    HAVE_SENDGRID = True
+except ImportError:
+    HAVE_SENDGRID = False
 
 logger = logging.getLogger(__name__)
 
+# Mail settings, read once at import rather than on every send
+SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
+SENDER_EMAIL = os.environ.get('SENDER_EMAIL')
+SMTP_HOST = os.environ.get('SMTP_HOST')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 465))
+SMTP_USER = os.environ.get('SMTP_USER')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_USE_SSL = os.environ.get('SMTP_USE_SSL', 'true').lower() == 'true'
+
+_BODY_CLOSE_RE = re.compile(r'</body>', re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r'\{\{(TRACKING_LINK|TRACKING_URL|USER_NAME|USER_EMAIL)\}\}')
+
+
+# A campaign renders the same template body for every target, so the scans
+# for placeholders and the closing body tag are done once per template and
+# cached; each target is then a single join.
+@lru_cache(maxsize=128)
+def _split_placeholders(text: str) -> tuple:
+    """Split text into (literal, NAME, literal, NAME, ..., literal)"""
+    return tuple(_PLACEHOLDER_RE.split(text))
+
+
+@lru_cache(maxsize=128)
+def _split_at_body_close(html_body: str) -> tuple:
+    """Split html_body before its first </body> (tail is empty if there is none)"""
+    match = _BODY_CLOSE_RE.search(html_body)
+    if match is None:
+        return html_body, ''
+    return html_body[:match.start()], html_body[match.start():]
+
+
+def _fill_placeholders(text: str, values: dict) -> str:
+    """Substitute {{NAME}} placeholders from values in one pass; others are left as-is"""
+    return ''.join(
+        values.get(part, '{{%s}}' % part) if i % 2 else part
+        for i, part in enumerate(_split_placeholders(text))
+    )
+
+
+async def ensure_phishing_indexes(db):
+    """Index the fields the phishing hot paths filter on (idempotent).
+
+    - phishing_targets.tracking_code: every open/click/credential hit
+    - phishing_targets.(campaign_id, email_sent): launch sweeps and stats
+    - phishing_targets.target_id: marking targets sent
+    - phishing_campaigns.campaign_id: campaign lookups and counter updates
+    """
+    await asyncio.gather(
+        db.phishing_targets.create_index([("tracking_code", 1)], unique=True),
+        db.phishing_targets.create_index([("campaign_id", 1), ("email_sent", 1)]),
+        db.phishing_targets.create_index([("target_id", 1)]),
+        db.phishing_campaigns.create_index([("campaign_id", 1)], unique=True),
+    )
+
 
 def generate_tracking_code() -> str:
     """Generate a unique tracking code for each email recipient"""
     return secrets.token_urlsafe(16)
 
 
+def generate_tracking_codes(count: int) -> List[str]:
+    """Generate count tracking codes from a single random draw.
+
+    Same format as generate_tracking_code; used when creating a campaign's
+    targets so a large campaign doesn't make one urandom call per target.
+    """
+    raw = secrets.token_bytes(16 * count)
+    return [
+        base64.urlsafe_b64encode(raw[i:i + 16]).rstrip(b'=').decode('ascii')
+        for i in range(0, 16 * count, 16)
+    ]
+
+
+@lru_cache(maxsize=32)
+def _canonicalize_base_url(base_url: str) -> str:
+    """Force HTTPS on a non-localhost base URL (cached; a campaign uses one base URL)"""
+    if base_url.startswith('http://') and 'localhost' not in base_url:
+        return base_url.replace('http://', 'https://')
+    return base_url
+
+
 def generate_tracking_pixel_url(base_url: str, tracking_code: str) -> str:
     """Generate URL for tracking pixel (email opens)"""
-    # Ensure HTTPS
-    if base_url.startswith('http://') and 'localhost' not in base_url:
-        base_url = base_url.replace('http://', 'https://')
-    return f"{base_url}/api/phishing/track/open/{tracking_code}"
+    return f"{_canonicalize_base_url(base_url)}/api/phishing/track/open/{tracking_code}"
 
 
 def generate_tracking_link(base_url: str, tracking_code: str, original_url: str = None) -> str:
     """Generate URL for tracking link clicks"""
-    # Ensure HTTPS
-    if base_url.startswith('http://') and 'localhost' not in base_url:
-        base_url = base_url.replace('http://', 'https://')
-    return f"{base_url}/api/phishing/track/click/{tracking_code}"
+    return f"{_canonicalize_base_url(base_url)}/api/phishing/track/click/{tracking_code}"
 
 
-def inject_tracking_into_email(html_body: str, tracking_code: str, base_url: str) -> str:
-    """Inject tracking pixel and replace links in email body"""
+def inject_tracking_into_email(html_body: str, tracking_code: str, base_url: str, **placeholders) -> str:
+    """Inject tracking pixel and replace links in email body
+
+    Extra keyword arguments (e.g. USER_NAME) are substituted in the same pass
+    as the tracking link placeholders.
+    """
     # Add tracking pixel before </body>
     pixel_url = generate_tracking_pixel_url(base_url, tracking_code)
     tracking_pixel = f'<img src="{pixel_url}" width="1" height="1" style="display:none;" alt="" />'
     
-    if '</body>' in html_body.lower():
-        # Insert before closing body tag
-        import re
-        html_body = re.sub(
-            r'(</body>)',
-            f'{tracking_pixel}\\1',
-            html_body,
-            flags=re.IGNORECASE
-        )
-    else:
-        # Append to end
-        html_body += tracking_pixel
-    
     # Replace the primary CTA link with tracking link
     click_url = generate_tracking_link(base_url, tracking_code)
     # Look for {{TRACKING_LINK}} or {{TRACKING_URL}} placeholder
-    html_body = html_body.replace('{{TRACKING_LINK}}', click_url)
-    html_body = html_body.replace('{{TRACKING_URL}}', click_url)
+    values = {'TRACKING_LINK': click_url, 'TRACKING_URL': click_url, **placeholders}
     
-    return html_body
+    # Insert pixel before closing body tag, or append to end if there isn't one
+    head, tail = _split_at_body_close(html_body)
+    return _fill_placeholders(head, values) + tracking_pixel + _fill_placeholders(tail, values)
+
+
+def _render_text_body(body_text: str, user_name: str, click_url: str) -> str:
+    """Fill the plain-text body's name and tracking link placeholders"""
+    return _fill_placeholders(body_text, {
+        'USER_NAME': user_name,
+        'TRACKING_LINK': click_url,
+        'TRACKING_URL': click_url,
+    })
+
+
+# SMTP fallback: one authenticated connection per server, reused across a
+# campaign's sends instead of a TLS handshake and login per email.
+_smtp_connections = {}
+_smtp_locks = {}
+
+
+async def _smtp_send(host: str, port: int, user: str, password: str, implicit_tls: bool, msg, recipient: str):
+    """Send msg over the pooled connection for (host, port, user), reconnecting once if it was dropped"""
+    import aiosmtplib
+    # Flatten straight to CRLF bytes once, rather than a str that is
+    # re-encoded for the wire (and again on a reconnect)
+    buf = io.BytesIO()
+    BytesGenerator(buf, mangle_from_=False, policy=msg.policy.clone(linesep='\r\n')).flatten(msg)
+    msg_bytes = buf.getvalue()
+    key = (host, port, user)
+    lock = _smtp_locks.get(key)
+    if lock is None:
+        lock = _smtp_locks[key] = asyncio.Lock()
+    async with lock:
+        for attempt in range(2):
+            smtp = _smtp_connections.get(key)
+            if smtp is None or not smtp.is_connected:
+                smtp = aiosmtplib.SMTP(
+                    hostname=host, port=port, use_tls=implicit_tls, start_tls=not implicit_tls, timeout=15
+                )
+                await smtp.connect()
+                try:
+                    await smtp.login(user, password)
+                except Exception:
+                    # Don't leak the socket on a rejected login; only
+                    # authenticated connections are pooled
+                    smtp.close()
+                    raise
+                _smtp_connections[key] = smtp
+            try:
+                await smtp.sendmail(user, [recipient], msg_bytes)
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                # Idle connection closed by the server - reconnect and retry once
+                _smtp_connections.pop(key, None)
+                if attempt:
+                    raise
+
+
+async def close_smtp_connections():
+    """Close pooled SMTP connections (called on app shutdown)."""
+    for smtp in list(_smtp_connections.values()):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+    _smtp_connections.clear()
 
 
 async def send_phishing_email(
@@ -66,38 +211,42 @@ async def send_phishing_email(
 ) -> bool:
     """Send a phishing simulation email to a target user"""
     try:
-        # Prepare email content with tracking
+        base_url = _canonicalize_base_url(base_url)
+        user_name = target.get('user_name', 'User')
+        click_url = generate_tracking_link(base_url, target['tracking_code'])
+        
+        # Prepare email content with tracking and personalization placeholders
         html_body = inject_tracking_into_email(
             template['body_html'],
             target['tracking_code'],
-            base_url
+            base_url,
+            USER_NAME=user_name,
+            USER_EMAIL=target.get('user_email', '')
         )
         
-        # Replace personalization placeholders
-        html_body = html_body.replace('{{USER_NAME}}', target.get('user_name', 'User'))
-        html_body = html_body.replace('{{USER_EMAIL}}', target.get('user_email', ''))
-        
-        subject = template['subject'].replace('{{USER_NAME}}', target.get('user_name', 'User'))
+        subject = template['subject'].replace('{{USER_NAME}}', user_name)
         
         # Check if we have SendGrid configured (preferred method)
-        sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-        sender_email = os.environ.get('SENDER_EMAIL')
+        sendgrid_api_key = SENDGRID_API_KEY
+        sender_email = SENDER_EMAIL
         
         if sendgrid_api_key and sender_email:
             """
             Use SendGrid to deliver the email.  To maximise compatibility, we first
             construct a SendGrid Mail object (via the helper classes) and then
-            convert it to a raw JSON payload.  We then attempt to send the
-            message using the official sendgrid-python client if it is available.
-            If that fails (for example, if the package is not installed or TLS
-            negotiation fails), we fall back to a direct HTTPS POST using the
-            requests library.  Only a successful API response (<300 status
+            convert it to a raw JSON payload.  We then post it over the shared
+            async SendGrid connection pool in email_service, so the event loop
+            is not blocked for the round trip.  If that fails (for example, if
+            TLS negotiation fails), we fall back to a direct HTTPS POST on a
+            one-off async httpx client.  Only a successful API response (<300 status
             code) is considered a sent email.  Tracking settings are disabled
             explicitly to ensure links are not rewritten and opens/clicks are
             handled by our own tracking code.
             """
+            if not HAVE_SENDGRID:
+                logger.error("sendgrid package not installed - cannot send phishing email")
+                return False
             try:
-                from sendgrid.helpers.mail import Mail, Email, To, Content, ReplyTo
                 # Use template's sender_name as display name (e.g., "IT Security Team")
                 display_name = template.get('sender_name', 'Security Team')
                 message = Mail(
@@ -114,10 +263,7 @@ async def send_phishing_email(
                     message.reply_to = ReplyTo(fake_sender_email, display_name)
                 # Add plain text version
                 if template.get('body_text'):
-                    text_body = template['body_text']
-                    text_body = text_body.replace('{{USER_NAME}}', target.get('user_name', 'User'))
-                    text_body = text_body.replace('{{TRACKING_LINK}}', generate_tracking_link(base_url, target['tracking_code']))
-                    text_body = text_body.replace('{{TRACKING_URL}}', generate_tracking_link(base_url, target['tracking_code']))
+                    text_body = _render_text_body(template['body_text'], user_name, click_url)
                     message.add_content(Content("text/plain", text_body))
                 mail_json = message.get()
                 mail_json['tracking_settings'] = {
@@ -125,36 +271,34 @@ async def send_phishing_email(
                     'open_tracking': {'enable': False},
                     'subscription_tracking': {'enable': False}
                 }
-                # Prefer the official SendGrid client if available
+                # Prefer the shared pooled SendGrid client
                 try:
-                    from sendgrid import SendGridAPIClient as _SGClient
-                    sg_client = _SGClient(sendgrid_api_key)
-                    resp = sg_client.client.mail.send.post(request_body=mail_json)
-                    status = getattr(resp, 'status_code', None)
-                    if status and status < 300:
+                    resp = await send_sendgrid_message(mail_json, sendgrid_api_key)
+                    status = resp.status_code
+                    if status < 300:
                         logger.info(
                             f"Phishing email sent to {target['user_email']} via SendGrid (status: {status})"
                         )
                         return True
                     else:
                         logger.error(
-                            f"SendGrid client returned unexpected status {status} for {target['user_email']}. Falling back to raw request."
+                            f"SendGrid returned unexpected status {status} for {target['user_email']}. Falling back to raw request."
                         )
                 except Exception as sg_exc:
                     # Log but proceed to raw POST fallback
                     logger.warning(f"SendGrid client error for {target['user_email']}: {sg_exc}. Trying raw HTTP.")
-                # Raw POST fallback
-                import requests
+                # Raw POST fallback on a fresh HTTP/1.1 connection, outside the
+                # shared pool (awaited, so the event loop keeps serving)
                 headers = {
                     "Authorization": f"Bearer {sendgrid_api_key}",
                     "Content-Type": "application/json"
                 }
-                resp = requests.post(
-                    "https://api.sendgrid.com/v3/mail/send",
-                    headers=headers,
-                    json=mail_json,
-                    timeout=10
-                )
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    resp = await client.post(
+                        "https://api.sendgrid.com/v3/mail/send",
+                        headers=headers,
+                        json=mail_json
+                    )
                 if resp.status_code < 300:
                     logger.info(
                         f"Phishing email sent to {target['user_email']} via SendGrid (status: {resp.status_code})"
@@ -172,18 +316,13 @@ async def send_phishing_email(
                 return False
         
         # Fallback to SMTP if SendGrid not configured
-        smtp_host = os.environ.get('SMTP_HOST')
-        smtp_port = int(os.environ.get('SMTP_PORT', 465))
-        smtp_user = os.environ.get('SMTP_USER')
-        smtp_pass = os.environ.get('SMTP_PASSWORD')
-        smtp_use_ssl = os.environ.get('SMTP_USE_SSL', 'true').lower() == 'true'
+        smtp_host = SMTP_HOST
+        smtp_port = SMTP_PORT
+        smtp_user = SMTP_USER
+        smtp_pass = SMTP_PASSWORD
+        smtp_use_ssl = SMTP_USE_SSL
         
         if smtp_host and smtp_user and smtp_pass:
-            import smtplib
-            import ssl
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
-            
             msg = MIMEMultipart('alternative')
             msg['Subject'] = subject
             msg['From'] = f"{template['sender_name']} <{smtp_user}>"
@@ -191,24 +330,17 @@ async def send_phishing_email(
             msg['Reply-To'] = template['sender_email']
             
             if template.get('body_text'):
-                text_body = template['body_text']
-                text_body = text_body.replace('{{USER_NAME}}', target.get('user_name', 'User'))
-                text_body = text_body.replace('{{TRACKING_LINK}}', generate_tracking_link(base_url, target['tracking_code']))
-                text_body = text_body.replace('{{TRACKING_URL}}', generate_tracking_link(base_url, target['tracking_code']))
+                text_body = _render_text_body(template['body_text'], user_name, click_url)
                 msg.attach(MIMEText(text_body, 'plain'))
             
             msg.attach(MIMEText(html_body, 'html'))
             
-            if smtp_use_ssl and smtp_port == 465:
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(smtp_host, smtp_port, context=context) as server:
-                    server.login(smtp_user, smtp_pass)
-                    server.sendmail(smtp_user, target['user_email'], msg.as_string())
-            else:
-                with smtplib.SMTP(smtp_host, smtp_port) as server:
-                    server.starttls()
-                    server.login(smtp_user, smtp_pass)
-                    server.sendmail(smtp_user, target['user_email'], msg.as_string())
+            # Implicit TLS on 465, STARTTLS otherwise
+            await _smtp_send(
+                smtp_host, smtp_port, smtp_user, smtp_pass,
+                smtp_use_ssl and smtp_port == 465,
+                msg, target['user_email']
+            )
             
             logger.info(f"Phishing email sent to {target['user_email']} via SMTP")
             return True
@@ -229,10 +361,106 @@ async def send_phishing_email(
         return False
 
 
+# Campaign launches send to many targets at once; this caps how many
+# send_phishing_email calls are in flight together.
+PHISHING_SEND_CONCURRENCY = int(os.environ.get('PHISHING_SEND_CONCURRENCY', '50'))
+
+
+async def send_phishing_campaign(
+    db,
+    targets: List[dict],
+    template: dict,
+    base_url: str,
+    concurrency: int = PHISHING_SEND_CONCURRENCY
+) -> list:
+    """Send the campaign email to every target concurrently.
+
+    Returns one result per target, in order: True/False from
+    send_phishing_email, or the exception it raised.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    
+    async def _send_one(target):
+        async with sem:
+            return await send_phishing_email(db, target, template, base_url)
+    
+    return await asyncio.gather(*(_send_one(t) for t in targets), return_exceptions=True)
+
+
+async def launch_scheduled_phishing_campaign(db, campaign: dict, now_iso: str) -> bool:
+    """Launch a due scheduled campaign and send its emails.
+
+    The status flip is guarded on "scheduled", so when the cron endpoint, the
+    admin sweep and the background launcher race only one of them sends.
+    Returns True if this call launched the campaign. A campaign whose
+    template has been deleted can never launch, so it is marked failed
+    rather than left for every sweep to retry.
+    """
+    template = await db.phishing_templates.find_one(
+        {"template_id": campaign["template_id"]},
+        {"_id": 0}
+    )
+    if not template:
+        await db.phishing_campaigns.update_one(
+            {"campaign_id": campaign["campaign_id"], "status": "scheduled"},
+            {"$set": {"status": "failed", "failure_reason": "Phishing template not found"}}
+        )
+        logger.warning(f"Scheduled campaign {campaign['campaign_id']} failed: template not found")
+        return False
+
+    # Check for custom email template override
+    custom_email_template_id = campaign.get("custom_email_template_id")
+    if custom_email_template_id:
+        custom_email = await db.custom_email_templates.find_one({"id": custom_email_template_id}, {"_id": 0})
+        if custom_email:
+            # Override template with custom email content
+            template = {
+                **template,
+                "body_html": custom_email.get("html", template["body_html"]),
+                "subject": custom_email.get("subject", template["subject"]),
+                "name": custom_email.get("name", template.get("name"))
+            }
+            logger.info(f"Using custom email template for scheduled campaign {campaign['campaign_id']}")
+
+    # Update status to active
+    result = await db.phishing_campaigns.update_one(
+        {"campaign_id": campaign["campaign_id"], "status": "scheduled"},
+        {"$set": {"status": "active", "started_at": now_iso}}
+    )
+    if not result.modified_count:
+        return False
+
+    # Get base URL - use API URL for tracking links
+    api_url = os.environ.get('API_URL', 'https://api.vasilisnetshield.com')
+
+    # Get and send to targets
+    targets = await db.phishing_targets.find(
+        {"campaign_id": campaign["campaign_id"], "email_sent": False},
+        {"_id": 0}
+    ).to_list(10000)
+
+    results = await send_phishing_campaign(db, targets, template, api_url)
+    sent_ids = [target["target_id"] for target, sent in zip(targets, results) if sent is True]
+    if sent_ids:
+        await db.phishing_targets.update_many(
+            {"target_id": {"$in": sent_ids}},
+            {"$set": {"email_sent": True, "email_sent_at": now_iso}}
+        )
+
+    # Update campaign stats
+    await db.phishing_campaigns.update_one(
+        {"campaign_id": campaign["campaign_id"]},
+        {"$set": {"emails_sent": len(sent_ids)}}
+    )
+    return True
+
+
 async def record_email_open(db, tracking_code: str, request_info: dict = None) -> bool:
     """Record when a phishing email is opened (tracking pixel loaded)"""
+    now_iso = datetime.now(timezone.utc).isoformat()
     try:
-        result = await db.phishing_targets.update_one(
+        # Returns the campaign_id of a first open in the same round trip
+        target = await db.phishing_targets.find_one_and_update(
             {
                 "tracking_code": tracking_code,
                 "email_opened": False
@@ -240,21 +468,20 @@ async def record_email_open(db, tracking_code: str, request_info: dict = None) -
             {
                 "$set": {
                     "email_opened": True,
-                    "email_opened_at": datetime.now(timezone.utc).isoformat(),
+                    "email_opened_at": now_iso,
                     "open_ip": request_info.get('ip') if request_info else None,
                     "open_user_agent": request_info.get('user_agent') if request_info else None
                 }
-            }
+            },
+            projection={"_id": 0, "campaign_id": 1}
         )
         
-        if result.modified_count > 0:
+        if target:
             # Update campaign stats
-            target = await db.phishing_targets.find_one({"tracking_code": tracking_code}, {"_id": 0})
-            if target:
-                await db.phishing_campaigns.update_one(
-                    {"campaign_id": target['campaign_id']},
-                    {"$inc": {"emails_opened": 1}}
-                )
+            await db.phishing_campaigns.update_one(
+                {"campaign_id": target['campaign_id']},
+                {"$inc": {"emails_opened": 1}}
+            )
             return True
         return False
     except Exception as e:
@@ -263,72 +490,94 @@ async def record_email_open(db, tracking_code: str, request_info: dict = None) -
 
 
 async def record_link_click(db, tracking_code: str, request_info: dict = None) -> dict:
-    """Record when a phishing link is clicked"""
+    """Record when a phishing link is clicked
+
+    The result includes "clicked_at", the timestamp of this click, so the
+    caller's follow-up writes can reuse it.
+    """
+    now_iso = datetime.now(timezone.utc).isoformat()
     try:
-        target = await db.phishing_targets.find_one(
-            {"tracking_code": tracking_code},
-            {"_id": 0}
+        # Only count first click: the filter only matches an unclicked target,
+        # so marking it and reading it back is one round trip. The document
+        # returned is the target as it was before the click.
+        target = await db.phishing_targets.find_one_and_update(
+            {"tracking_code": tracking_code, "link_clicked": {"$ne": True}},
+            {
+                "$set": {
+                    "link_clicked": True,
+                    "link_clicked_at": now_iso,
+                    "click_ip": request_info.get('ip') if request_info else None,
+                    "click_user_agent": request_info.get('user_agent') if request_info else None
+                }
+            },
+            projection={"_id": 0}
         )
         
-        if not target:
-            return None
-        
-        # Only count first click
-        if not target.get('link_clicked'):
-            await db.phishing_targets.update_one(
+        if target:
+            # Update campaign stats, getting the campaign for the landing
+            # page redirect back from the same call
+            campaign = await db.phishing_campaigns.find_one_and_update(
+                {"campaign_id": target['campaign_id']},
+                {"$inc": {"links_clicked": 1}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            # Repeat click (or unknown code)
+            target = await db.phishing_targets.find_one(
                 {"tracking_code": tracking_code},
-                {
-                    "$set": {
-                        "link_clicked": True,
-                        "link_clicked_at": datetime.now(timezone.utc).isoformat(),
-                        "click_ip": request_info.get('ip') if request_info else None,
-                        "click_user_agent": request_info.get('user_agent') if request_info else None
-                    }
-                }
+                {"_id": 0}
             )
-            
-            # Update campaign stats
-            await db.phishing_campaigns.update_one(
+            if not target:
+                return None
+            campaign = await db.phishing_campaigns.find_one(
                 {"campaign_id": target['campaign_id']},
-                {"$inc": {"links_clicked": 1}}
+                {"_id": 0}
             )
         
-        # Get campaign for landing page redirect
-        campaign = await db.phishing_campaigns.find_one(
-            {"campaign_id": target['campaign_id']},
-            {"_id": 0}
-        )
-        
         return {
             "target": target,
-            "campaign": campaign
+            "campaign": campaign,
+            "clicked_at": now_iso
         }
     except Exception as e:
         logger.error(f"Failed to record link click: {e}")
         return None
 
 
-async def get_campaign_stats(db, campaign_id: str) -> dict:
-    """Get detailed statistics for a phishing campaign"""
-    campaign = await db.phishing_campaigns.find_one(
-        {"campaign_id": campaign_id},
-        {"_id": 0}
+async def get_campaign_stats(db, campaign_id: str, include_targets: bool = False) -> dict:
+    """Get detailed statistics for a phishing campaign
+
+    The counts are computed by a $group in MongoDB; the target documents
+    themselves are only fetched (as "targets") when include_targets is set.
+    """
+    campaign, counts = await asyncio.gather(
+        db.phishing_campaigns.find_one(
+            {"campaign_id": campaign_id},
+            {"_id": 0}
+        ),
+        db.phishing_targets.aggregate([
+            {"$match": {"campaign_id": campaign_id}},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "sent": {"$sum": {"$cond": ["$email_sent", 1, 0]}},
+                "opened": {"$sum": {"$cond": ["$email_opened", 1, 0]}},
+                "clicked": {"$sum": {"$cond": ["$link_clicked", 1, 0]}},
+            }}
+        ]).to_list(1)
     )
     
     if not campaign:
         return None
     
-    targets = await db.phishing_targets.find(
-        {"campaign_id": campaign_id},
-        {"_id": 0}
-    ).to_list(10000)
-    
-    total = len(targets)
-    sent = sum(1 for t in targets if t.get('email_sent'))
-    opened = sum(1 for t in targets if t.get('email_opened'))
-    clicked = sum(1 for t in targets if t.get('link_clicked'))
+    counts = counts[0] if counts else {}
+    total = counts.get("total", 0)
+    sent = counts.get("sent", 0)
+    opened = counts.get("opened", 0)
+    clicked = counts.get("clicked", 0)
     
-    return {
+    stats = {
         "campaign_id": campaign_id,
         "campaign_name": campaign.get('name'),
         "status": campaign.get('status'),
@@ -338,15 +587,20 @@ async def get_campaign_stats(db, campaign_id: str) -> dict:
         "links_clicked": clicked,
         "open_rate": round((opened / sent * 100), 1) if sent > 0 else 0,
         "click_rate": round((clicked / sent * 100), 1) if sent > 0 else 0,
-        "targets": targets
     }
+    if include_targets:
+        stats["targets"] = await db.phishing_targets.find(
+            {"campaign_id": campaign_id},
+            {"_id": 0}
+        ).to_list(10000)
+    return stats
 
 
 async def send_training_assignment_email(user_email: str, user_name: str, module_name: str, training_url: str, db=None):
     """Send branded email notifying user they've been assigned training after clicking a simulation link."""
     try:
-        sendgrid_key = os.environ.get("SENDGRID_API_KEY")
-        sender_email = os.environ.get("SENDER_EMAIL")
+        sendgrid_key = SENDGRID_API_KEY
+        sender_email = SENDER_EMAIL
         
         if not sendgrid_key:
             logger.warning("No SendGrid API key - skipping training assignment email")
@@ -356,15 +610,12 @@ async def send_training_assignment_email(user_email: str, user_name: str, module
             logger.warning("No SENDER_EMAIL configured - skipping training assignment email")
             return False
 
-        # Get branding from DB
-        branding = {}
-        if db:
-            branding_doc = await db.branding.find_one({}, {"_id": 0})
-            if branding_doc:
-                branding = branding_doc
+        # Branding comes from the shared cache in email_service rather than a
+        # Mongo round trip per assignment
+        branding = await get_branding_settings(db) if db is not None else DEFAULT_BRANDING
 
-        company = branding.get("company_name", "Vasilis NetShield")
-        primary_color = branding.get("primary_color", "#D4A836")
+        company = branding.company_name
+        primary_color = branding.primary_color
 
         html = f"""
         <!DOCTYPE html>
@@ -373,18 +624,18 @@ async def send_training_assignment_email(user_email: str, user_name: str, module
         <body style="margin:0;padding:0;background:#f4f4f4;font-family:'Segoe UI',Arial,sans-serif;">
           <table width="100%" cellpadding="0" cellspacing="0" style="max-width:600px;margin:0 auto;background:#ffffff;border-radius:8px;overflow:hidden;margin-top:20px;margin-bottom:20px;">
             <tr><td style="background:{primary_color};padding:24px 32px;">
-              <h1 style="color:#0D1117;margin:0;font-size:22px;">{company}</h1>
+              <h1 style="color:#0D1117;margin:0;font-size:22px;">{_esc(company)}</h1>
               <p style="color:#0D1117;margin:4px 0 0;opacity:0.8;font-size:14px;">Security Training Assignment</p>
             </td></tr>
             <tr><td style="padding:32px;">
-              <h2 style="color:#333;margin:0 0 16px;">Hi {user_name},</h2>
+              <h2 style="color:#333;margin:0 0 16px;">Hi {_esc(user_name)},</h2>
               <p style="color:#555;line-height:1.6;margin:0 0 16px;">
                 You've been assigned a security training module based on a recent simulation exercise.
                 Completing this training will help you recognize and avoid common cyber threats.
               </p>
               <div style="background:#f8f9fa;border-left:4px solid {primary_color};padding:16px;border-radius:4px;margin:20px 0;">
                 <p style="margin:0;color:#333;font-weight:600;">Assigned Module:</p>
-                <p style="margin:4px 0 0;color:#555;">{module_name}</p>
+                <p style="margin:4px 0 0;color:#555;">{_esc(module_name)}</p>
               </div>
               <div style="text-align:center;margin:28px 0;">
                 <a href="{training_url}" style="display:inline-block;background:{primary_color};color:#0D1117;text-decoration:none;padding:14px 32px;border-radius:6px;font-weight:600;font-size:16px;">Start Training</a>
@@ -394,37 +645,27 @@ async def send_training_assignment_email(user_email: str, user_name: str, module
               </p>
             </td></tr>
             <tr><td style="background:#f8f9fa;padding:16px 32px;text-align:center;">
-              <p style="color:#999;font-size:12px;margin:0;">{company} Security Awareness Training</p>
+              <p style="color:#999;font-size:12px;margin:0;">{_esc(company)} Security Awareness Training</p>
             </td></tr>
           </table>
         </body>
         </html>
         """
 
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.text import MIMEText
-        import smtplib
-
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = f"Security Training Assigned - {module_name}"
-        msg["From"] = f"{company} <noreply@{company.lower().replace(' ', '')}.com>"
-        msg["To"] = user_email
-
-        text = f"Hi {user_name}, you've been assigned security training: {module_name}. Start here: {training_url}"
-        msg.attach(MIMEText(text, "plain"))
-        msg.attach(MIMEText(html, "html"))
-
-        import sendgrid
-        from sendgrid.helpers.mail import Mail, Email, To, Content
+        if not HAVE_SENDGRID:
+            logger.error("sendgrid package not installed - skipping training assignment email")
+            return False
 
-        sg = sendgrid.SendGridAPIClient(api_key=sendgrid_key)
         message = Mail(
             from_email=Email(sender_email, company),
             to_emails=To(user_email),
             subject=f"Security Training Assigned - {module_name}",
             html_content=Content("text/html", html)
         )
-        sg.send(message)
+        response = await send_sendgrid_message(message, sendgrid_key)
+        if response.status_code >= 300:
+            logger.error(f"SendGrid returned status {response.status_code} for training assignment email")
+            return False
         logger.info(f"Training assignment email sent to {user_email}")
         return True
 
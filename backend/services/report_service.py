@@ -2,14 +2,18 @@
 Report Generation Service
 Generates Excel and PDF reports for phishing campaigns and training
 """
-import io
+import tempfile
+from copy import copy
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import BinaryIO, List, Dict, Any
 import logging
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
+from openpyxl.xml import LXML
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -19,36 +23,169 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
 logger = logging.getLogger(__name__)
 
+# openpyxl streams and serialises through lxml when it is importable and
+# falls back to the much slower pure-Python ElementTree otherwise
+if not LXML:
+    logger.warning("lxml not available - Excel reports will use the slower ElementTree writer")
 
-def generate_phishing_campaign_excel(campaign: dict, targets: list, stats: dict) -> bytes:
-    """Generate Excel report for a phishing campaign"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Campaign Report"
-    
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-    stat_fill = PatternFill(start_color="D4A836", end_color="D4A836", fill_type="solid")
-    clicked_fill = PatternFill(start_color="FF6B6B", end_color="FF6B6B", fill_type="solid")
-    opened_fill = PatternFill(start_color="FFE066", end_color="FFE066", fill_type="solid")
-    safe_fill = PatternFill(start_color="51CF66", end_color="51CF66", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+# Reports are built into a spooled temp file: small ones stay in memory,
+# large ones spill to disk, and the route streams the file back without
+# copying it into a bytes object first.
+REPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def _report_file() -> BinaryIO:
+    return tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+
+
+# Excel styles, shared by every report rather than rebuilt per report and per cell
+_TITLE_FONT = Font(bold=True, size=16)
+_SECTION_FONT = Font(bold=True, size=14)
+_BOLD_FONT = Font(bold=True)
+_HEADER_FONT = Font(bold=True, color="FFFFFF", size=12)
+_TRAINING_HEADER_FONT = Font(bold=True, color="FFFFFF", size=11)
+_HEADER_FILL = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
+_STAT_FILL = PatternFill(start_color="D4A836", end_color="D4A836", fill_type="solid")
+_CLICKED_FILL = PatternFill(start_color="FF6B6B", end_color="FF6B6B", fill_type="solid")
+_OPENED_FILL = PatternFill(start_color="FFE066", end_color="FFE066", fill_type="solid")
+_CENTER = Alignment(horizontal='center')
+_YES_NO = ('No', 'Yes')
+
+_THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+# Data cells get one named style instead of separate alignment and border
+# assignments; it is registered on each workbook as it is created
+_DATA_STYLE = NamedStyle(name='report_data', font=DEFAULT_FONT, alignment=_CENTER, border=_THIN_BORDER)
+
+# Fixed table layouts
+_STAT_HEADERS = ('Total Targets', 'Emails Sent', 'Emails Opened', 'Links Clicked', 'Open Rate', 'Click Rate')
+_TARGET_HEADERS = ('Name', 'Email', 'Email Sent', 'Opened', 'Opened At', 'Clicked', 'Clicked At')
+_TRAINING_HEADERS = ('User Name', 'Email', 'Module', 'Status', 'Score', 'Started', 'Completed')
+_COLUMN_WIDTHS_CAMPAIGN = (20, 35, 12, 12, 20, 12, 20)
+_COLUMN_WIDTHS_TRAINING = (20, 30, 25, 12, 10, 20, 20)
+
+
+def _new_workbook() -> Workbook:
+    """A write-only workbook with the report's named styles registered"""
+    wb = Workbook(write_only=True)
+    # Each workbook binds its own copy, so concurrent reports never share one
+    wb.add_named_style(copy(_DATA_STYLE))
+    return wb
+
+
+def _cell(ws, value, style=None, font=None, fill=None, alignment=None, border=None) -> WriteOnlyCell:
+    """A styled cell for appending to a write-only worksheet"""
+    cell = WriteOnlyCell(ws, value=value)
+    if style is not None:
+        cell.style = style
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    if border is not None:
+        cell.border = border
+    return cell
+
+
+# PDF colours and table styles, parsed and built once
+_NAVY = colors.HexColor('#1F4E79')
+_RED = colors.HexColor('#FF6B6B')
+_AMBER = colors.HexColor('#FFB300')
+_GRID_GREY = colors.HexColor('#CCCCCC')
+_ROW_GREY = colors.HexColor('#F5F5F5')
+
+_SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), _NAVY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('GRID', (0, 0), (-1, -1), 1, _GRID_GREY),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, _ROW_GREY]),
+])
+
+
+def _results_table_style(header_color) -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 1, _GRID_GREY),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ])
+
+
+_CLICKED_TABLE_STYLE = _results_table_style(_RED)
+_OPENED_TABLE_STYLE = _results_table_style(_AMBER)
+
+# PDF paragraph styles, derived once from the sample stylesheet
+_PDF_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_PDF_STYLES['Heading1'],
+    fontSize=18,
+    textColor=_NAVY,
+    alignment=TA_CENTER,
+    spaceAfter=20
+)
+_SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    parent=_PDF_STYLES['Normal'],
+    fontSize=12,
+    textColor=colors.HexColor('#666666'),
+    alignment=TA_CENTER,
+    spaceAfter=30
+)
+_SECTION_STYLE = ParagraphStyle(
+    'Section',
+    parent=_PDF_STYLES['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor('#D4A836'),
+    spaceBefore=20,
+    spaceAfter=10
+)
+_FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=_PDF_STYLES['Normal'],
+    fontSize=8,
+    textColor=colors.HexColor('#999999'),
+    alignment=TA_CENTER
+)
+
+
+def generate_phishing_campaign_excel(campaign: dict, targets: list, stats: dict) -> BinaryIO:
+    """Generate Excel report for a phishing campaign
+
+    The workbook is write-only, so rows are streamed out as they are appended
+    instead of every cell being held in memory until save. Returns the file
+    rewound to the start; the caller closes it.
+    """
+    wb = _new_workbook()
+    ws = wb.create_sheet("Campaign Report")
+    
+    # Adjust column widths (must be set before any row is written)
+    for i, width in enumerate(_COLUMN_WIDTHS_CAMPAIGN):
+        ws.column_dimensions[get_column_letter(i + 1)].width = width
     
     # Title
-    ws.merge_cells('A1:G1')
-    ws['A1'] = f"Phishing Campaign Report: {campaign.get('name', 'Unknown')}"
-    ws['A1'].font = Font(bold=True, size=16)
-    ws['A1'].alignment = Alignment(horizontal='center')
+    ws.merged_cells.add('A1:G1')
+    ws.append([_cell(
+        ws, f"Phishing Campaign Report: {campaign.get('name', 'Unknown')}",
+        font=_TITLE_FONT, alignment=_CENTER
+    )])
+    ws.append([])
     
     # Campaign Info
-    ws['A3'] = "Campaign Details"
-    ws['A3'].font = Font(bold=True, size=14)
+    ws.append([_cell(ws, "Campaign Details", font=_SECTION_FONT)])
     
     info_rows = [
         ("Organization ID:", campaign.get('organization_id', 'N/A')),
@@ -58,17 +195,13 @@ def generate_phishing_campaign_excel(campaign: dict, targets: list, stats: dict)
         ("Completed:", campaign.get('completed_at', 'N/A') or 'In Progress'),
     ]
     
-    for i, (label, value) in enumerate(info_rows, start=4):
-        ws[f'A{i}'] = label
-        ws[f'A{i}'].font = Font(bold=True)
-        ws[f'B{i}'] = str(value)
+    for label, value in info_rows:
+        ws.append([_cell(ws, label, font=_BOLD_FONT), str(value)])
+    ws.append([])
     
     # Statistics
-    stats_row = 10
-    ws[f'A{stats_row}'] = "Statistics"
-    ws[f'A{stats_row}'].font = Font(bold=True, size=14)
+    ws.append([_cell(ws, "Statistics", font=_SECTION_FONT)])
     
-    stat_headers = ['Total Targets', 'Emails Sent', 'Emails Opened', 'Links Clicked', 'Open Rate', 'Click Rate']
     stat_values = [
         stats.get('total_targets', 0),
         stats.get('emails_sent', 0),
@@ -78,113 +211,71 @@ def generate_phishing_campaign_excel(campaign: dict, targets: list, stats: dict)
         f"{stats.get('click_rate', 0)}%"
     ]
     
-    for i, header in enumerate(stat_headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}{stats_row + 1}'] = header
-        ws[f'{col}{stats_row + 1}'].font = header_font
-        ws[f'{col}{stats_row + 1}'].fill = stat_fill
-        ws[f'{col}{stats_row + 1}'].alignment = Alignment(horizontal='center')
-        ws[f'{col}{stats_row + 1}'].border = border
-        
-        ws[f'{col}{stats_row + 2}'] = stat_values[i]
-        ws[f'{col}{stats_row + 2}'].alignment = Alignment(horizontal='center')
-        ws[f'{col}{stats_row + 2}'].border = border
+    ws.append([
+        _cell(ws, header, font=_HEADER_FONT, fill=_STAT_FILL, alignment=_CENTER, border=_THIN_BORDER)
+        for header in _STAT_HEADERS
+    ])
+    ws.append([
+        _cell(ws, value, style=_DATA_STYLE.name)
+        for value in stat_values
+    ])
+    ws.append([])
+    ws.append([])
     
     # Targets Table
-    targets_row = stats_row + 5
-    ws[f'A{targets_row}'] = "Target Details"
-    ws[f'A{targets_row}'].font = Font(bold=True, size=14)
-    
-    target_headers = ['Name', 'Email', 'Email Sent', 'Opened', 'Opened At', 'Clicked', 'Clicked At']
-    header_row = targets_row + 1
-    
-    for i, header in enumerate(target_headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}{header_row}'] = header
-        ws[f'{col}{header_row}'].font = header_font
-        ws[f'{col}{header_row}'].fill = header_fill
-        ws[f'{col}{header_row}'].alignment = Alignment(horizontal='center')
-        ws[f'{col}{header_row}'].border = border
-    
-    for row_idx, target in enumerate(targets, start=header_row + 1):
+    ws.append([_cell(ws, "Target Details", font=_SECTION_FONT)])
+    
+    ws.append([
+        _cell(ws, header, font=_HEADER_FONT, fill=_HEADER_FILL, alignment=_CENTER, border=_THIN_BORDER)
+        for header in _TARGET_HEADERS
+    ])
+    
+    for target in targets:
+        get = target.get
         row_data = [
-            target.get('user_name', 'N/A'),
-            target.get('user_email', 'N/A'),
-            'Yes' if target.get('email_sent') else 'No',
-            'Yes' if target.get('email_opened') else 'No',
-            target.get('email_opened_at', '') or '-',
-            'Yes' if target.get('link_clicked') else 'No',
-            target.get('link_clicked_at', '') or '-',
+            get('user_name', 'N/A'),
+            get('user_email', 'N/A'),
+            _YES_NO[bool(get('email_sent'))],
+            _YES_NO[bool(get('email_opened'))],
+            get('email_opened_at', '') or '-',
+            _YES_NO[bool(get('link_clicked'))],
+            get('link_clicked_at', '') or '-',
         ]
         
-        for col_idx, value in enumerate(row_data):
-            col = get_column_letter(col_idx + 1)
-            ws[f'{col}{row_idx}'] = str(value)
-            ws[f'{col}{row_idx}'].border = border
-            ws[f'{col}{row_idx}'].alignment = Alignment(horizontal='center')
-            
-            # Color coding for status
-            if col_idx == 5 and target.get('link_clicked'):  # Clicked column
-                ws[f'{col}{row_idx}'].fill = clicked_fill
-            elif col_idx == 3 and target.get('email_opened') and not target.get('link_clicked'):  # Opened
-                ws[f'{col}{row_idx}'].fill = opened_fill
-    
-    # Adjust column widths
-    column_widths = [20, 35, 12, 12, 20, 12, 20]
-    for i, width in enumerate(column_widths):
-        ws.column_dimensions[get_column_letter(i + 1)].width = width
-    
-    # Save to bytes
-    output = io.BytesIO()
+        row = [_cell(ws, str(value), style=_DATA_STYLE.name) for value in row_data]
+        
+        # Color coding for status
+        if get('link_clicked'):
+            row[5].fill = _CLICKED_FILL  # Clicked column
+        elif get('email_opened'):
+            row[3].fill = _OPENED_FILL  # Opened column
+        ws.append(row)
+    
+    # Save to the spooled report file
+    output = _report_file()
     wb.save(output)
     output.seek(0)
-    return output.getvalue()
+    return output
 
 
-def generate_phishing_campaign_pdf(campaign: dict, targets: list, stats: dict, org_name: str = None) -> bytes:
-    """Generate PDF report for a phishing campaign"""
-    buffer = io.BytesIO()
+def generate_phishing_campaign_pdf(campaign: dict, targets: list, stats: dict, org_name: str = None) -> BinaryIO:
+    """Generate PDF report for a phishing campaign (rewound file; the caller closes it)"""
+    buffer = _report_file()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
     
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#1F4E79'),
-        alignment=TA_CENTER,
-        spaceAfter=20
-    )
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=colors.HexColor('#666666'),
-        alignment=TA_CENTER,
-        spaceAfter=30
-    )
-    section_style = ParagraphStyle(
-        'Section',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#D4A836'),
-        spaceBefore=20,
-        spaceAfter=10
-    )
-    
     elements = []
     
     # Title
-    elements.append(Paragraph("Phishing Campaign Report", title_style))
-    elements.append(Paragraph(f"<b>{campaign.get('name', 'Unknown Campaign')}</b>", subtitle_style))
+    elements.append(Paragraph("Phishing Campaign Report", _TITLE_STYLE))
+    elements.append(Paragraph(f"<b>{campaign.get('name', 'Unknown Campaign')}</b>", _SUBTITLE_STYLE))
     if org_name:
-        elements.append(Paragraph(f"Organization: {org_name}", subtitle_style))
-    elements.append(Paragraph(f"Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}", subtitle_style))
+        elements.append(Paragraph(f"Organization: {org_name}", _SUBTITLE_STYLE))
+    elements.append(Paragraph(f"Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}", _SUBTITLE_STYLE))
     
     elements.append(Spacer(1, 20))
     
     # Executive Summary
-    elements.append(Paragraph("Executive Summary", section_style))
+    elements.append(Paragraph("Executive Summary", _SECTION_STYLE))
     
     summary_data = [
         ['Metric', 'Value', 'Assessment'],
@@ -198,42 +289,32 @@ def generate_phishing_campaign_pdf(campaign: dict, targets: list, stats: dict, o
     click_rate = stats.get('click_rate', 0)
     if click_rate > 30:
         risk_level = "HIGH RISK - Immediate training recommended"
-        risk_color = colors.HexColor('#FF6B6B')
     elif click_rate > 15:
         risk_level = "MEDIUM RISK - Additional training suggested"
-        risk_color = colors.HexColor('#FFE066')
     else:
         risk_level = "LOW RISK - Good security awareness"
-        risk_color = colors.HexColor('#51CF66')
     
     summary_data.append(['Risk Level', risk_level, ''])
     
     summary_table = Table(summary_data, colWidths=[120, 100, 200])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F4E79')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F5')]),
-    ]))
+    summary_table.setStyle(_SUMMARY_TABLE_STYLE)
     elements.append(summary_table)
     
     elements.append(Spacer(1, 30))
     
     # Target Details
-    elements.append(Paragraph("Individual Results", section_style))
+    elements.append(Paragraph("Individual Results", _SECTION_STYLE))
     
-    # Users who clicked (high risk)
-    clicked_users = [t for t in targets if t.get('link_clicked')]
-    opened_users = [t for t in targets if t.get('email_opened') and not t.get('link_clicked')]
-    safe_users = [t for t in targets if not t.get('email_opened')]
+    # Users who clicked (high risk) and users who only opened, in one pass
+    clicked_users, opened_users = [], []
+    for t in targets:
+        if t.get('link_clicked'):
+            clicked_users.append(t)
+        elif t.get('email_opened'):
+            opened_users.append(t)
     
     if clicked_users:
-        elements.append(Paragraph("<font color='#FF6B6B'><b>Users Who Clicked (Require Training):</b></font>", styles['Normal']))
+        elements.append(Paragraph("<font color='#FF6B6B'><b>Users Who Clicked (Require Training):</b></font>", _PDF_STYLES['Normal']))
         click_data = [['Name', 'Email', 'Clicked At']]
         for u in clicked_users:
             click_data.append([
@@ -243,19 +324,12 @@ def generate_phishing_campaign_pdf(campaign: dict, targets: list, stats: dict, o
             ])
         
         click_table = Table(click_data, colWidths=[120, 200, 150])
-        click_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FF6B6B')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ]))
+        click_table.setStyle(_CLICKED_TABLE_STYLE)
         elements.append(click_table)
         elements.append(Spacer(1, 15))
     
     if opened_users:
-        elements.append(Paragraph("<font color='#FFB300'><b>Users Who Opened (Caution):</b></font>", styles['Normal']))
+        elements.append(Paragraph("<font color='#FFB300'><b>Users Who Opened (Caution):</b></font>", _PDF_STYLES['Normal']))
         open_data = [['Name', 'Email', 'Opened At']]
         for u in opened_users:
             open_data.append([
@@ -265,90 +339,64 @@ def generate_phishing_campaign_pdf(campaign: dict, targets: list, stats: dict, o
             ])
         
         open_table = Table(open_data, colWidths=[120, 200, 150])
-        open_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFB300')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ]))
+        open_table.setStyle(_OPENED_TABLE_STYLE)
         elements.append(open_table)
         elements.append(Spacer(1, 15))
     
     # Footer
     elements.append(Spacer(1, 30))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#999999'),
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph("Generated by Vasilis NetShield Security Training Platform", footer_style))
-    elements.append(Paragraph("This report is confidential and intended for authorized personnel only.", footer_style))
+    elements.append(Paragraph("Generated by Vasilis NetShield Security Training Platform", _FOOTER_STYLE))
+    elements.append(Paragraph("This report is confidential and intended for authorized personnel only.", _FOOTER_STYLE))
     
     doc.build(elements)
     buffer.seek(0)
-    return buffer.getvalue()
+    return buffer
 
 
-def generate_training_report_excel(sessions: list, users_map: dict) -> bytes:
-    """Generate Excel report for training sessions"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Training Report"
-    
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+def generate_training_report_excel(sessions: list, users_map: dict) -> BinaryIO:
+    """Generate Excel report for training sessions (streamed, write-only workbook)
+
+    Returns the file rewound to the start; the caller closes it.
+    """
+    wb = _new_workbook()
+    ws = wb.create_sheet("Training Report")
+    
+    # Adjust column widths (must be set before any row is written)
+    for i, width in enumerate(_COLUMN_WIDTHS_TRAINING):
+        ws.column_dimensions[get_column_letter(i + 1)].width = width
     
     # Title
-    ws.merge_cells('A1:G1')
-    ws['A1'] = "Training Sessions Report"
-    ws['A1'].font = Font(bold=True, size=16)
-    ws['A1'].alignment = Alignment(horizontal='center')
+    ws.merged_cells.add('A1:G1')
+    ws.append([_cell(ws, "Training Sessions Report", font=_TITLE_FONT, alignment=_CENTER)])
+    ws.append([])
     
     # Headers
-    headers = ['User Name', 'Email', 'Module', 'Status', 'Score', 'Started', 'Completed']
-    for i, header in enumerate(headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}3'] = header
-        ws[f'{col}3'].font = header_font
-        ws[f'{col}3'].fill = header_fill
-        ws[f'{col}3'].border = border
-        ws[f'{col}3'].alignment = Alignment(horizontal='center')
+    ws.append([
+        _cell(ws, header, font=_TRAINING_HEADER_FONT, fill=_HEADER_FILL, alignment=_CENTER, border=_THIN_BORDER)
+        for header in _TRAINING_HEADERS
+    ])
     
     # Data
-    for row_idx, session in enumerate(sessions, start=4):
-        user = users_map.get(session.get('user_id'), {})
+    for session in sessions:
+        get = session.get
+        user = users_map.get(get('user_id'), {})
+        completed_at = get('completed_at')
         row_data = [
             user.get('name', 'Unknown'),
             user.get('email', 'N/A'),
-            session.get('module_id', '').replace('mod_', '').replace('_', ' ').title(),
-            session.get('status', 'N/A').title(),
-            f"{session.get('score', 0)}%",
-            str(session.get('started_at', ''))[:19],
-            str(session.get('completed_at', '-'))[:19] if session.get('completed_at') else '-',
+            get('module_id', '').replace('mod_', '').replace('_', ' ').title(),
+            get('status', 'N/A').title(),
+            f"{get('score', 0)}%",
+            str(get('started_at', ''))[:19],
+            str(completed_at)[:19] if completed_at else '-',
         ]
         
-        for col_idx, value in enumerate(row_data):
-            col = get_column_letter(col_idx + 1)
-            ws[f'{col}{row_idx}'] = value
-            ws[f'{col}{row_idx}'].border = border
-            ws[f'{col}{row_idx}'].alignment = Alignment(horizontal='center')
-    
-    # Adjust column widths
-    column_widths = [20, 30, 25, 12, 10, 20, 20]
-    for i, width in enumerate(column_widths):
-        ws.column_dimensions[get_column_letter(i + 1)].width = width
+        ws.append([
+            _cell(ws, value, style=_DATA_STYLE.name)
+            for value in row_data
+        ])
     
-    output = io.BytesIO()
+    output = _report_file()
     wb.save(output)
     output.seek(0)
-    return output.getvalue()
+    return output
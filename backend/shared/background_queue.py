@@ -0,0 +1,68 @@
+"""
+Bounded fire-and-forget job queue for work a request handler should not wait on.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """Queue coroutine calls and run them on background worker tasks.
+
+    Each worker takes whatever has piled up since it last woke, up to
+    `batch_size` jobs, and runs them concurrently. Workers are started
+    lazily by the first put(), so the queue can be created at import time.
+    """
+
+    def __init__(self, name: str, maxsize: int, workers: int = 1, batch_size: int = 1):
+        self.name = name
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._worker_count = workers
+        self._batch_size = batch_size
+        self._workers = []
+
+    async def _run(self, fn, args, kwargs):
+        try:
+            await fn(*args, **kwargs)
+        except Exception as e:
+            logger.error("%s job %s failed: %s", self.name, fn.__name__, e)
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.gather(*(self._run(*job) for job in batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def put(self, fn, *args, **kwargs) -> bool:
+        """Queue fn(*args, **kwargs) to run in the background.
+
+        Must be called from a running event loop. Returns False if the queue
+        is full and the job was dropped.
+        """
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < self._worker_count:
+            self._workers.append(asyncio.create_task(self._worker()))
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+        except asyncio.QueueFull:
+            logger.warning("%s queue full - dropping %s", self.name, fn.__name__)
+            return False
+        return True
+
+    async def drain(self, timeout: float = 10.0):
+        """Give queued jobs a chance to finish, then stop the workers."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%s queue not drained on shutdown (%d pending)", self.name, self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
@@ -0,0 +1,33 @@
+"""
+Pooled outbound HTTP client shared by the services that call third-party APIs.
+"""
+import importlib.util
+
+import httpx
+
+# Keep-alive connections are multiplexed over HTTP/2 when h2 is installed
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+class PooledHTTPClient:
+    """A lazily created httpx.AsyncClient reused for every request a service
+    makes, so bursts share keep-alive connections instead of paying a TLS
+    handshake per call. Recreated if it has been closed."""
+
+    def __init__(self, timeout: float, max_connections: int = 50, max_keepalive_connections: int = 20):
+        self._timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._client = None
+
+    def get(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(http2=HTTP2, limits=self._limits, timeout=self._timeout)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
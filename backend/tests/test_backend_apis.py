@@ -16,36 +16,65 @@ SUPER_ADMIN_PASSWORD = os.environ.get("TEST_ADMIN_PASSWORD", "Admin123!Pass")
 TRAINEE_EMAIL = "trainee@testorg.com"
 TRAINEE_PASSWORD = os.environ.get("TEST_TRAINEE_PASSWORD", "Admin123!Pass")
 
-# Cached token for reuse across tests
-_cached_token = None
-
-def get_auth_token():
-    """Get cached auth token or login to get new one"""
-    global _cached_token
-    if _cached_token:
-        return _cached_token
-    
-    time.sleep(0.2)  # Small delay to avoid rate limiting
-    response = requests.post(f"{API}/auth/login", json={
-        "email": SUPER_ADMIN_EMAIL,
-        "password": SUPER_ADMIN_PASSWORD
-    })
+
+@pytest.fixture(scope="session")
+def http():
+    """Keep-alive session shared by every request in the test run"""
+    session = requests.Session()
+    yield session
+    session.close()
+
+
+def login_super_admin(session):
+    """Log in as the super admin and return the token"""
+    # Only back off when the server actually rate limits the login
+    for delay in (0.25, 0.5, 1.0, None):
+        response = session.post(f"{API}/auth/login", json={
+            "email": SUPER_ADMIN_EMAIL,
+            "password": SUPER_ADMIN_PASSWORD
+        })
+        if response.status_code != 429 or delay is None:
+            break
+        time.sleep(delay)
     if response.status_code == 200 and "token" in response.json():
-        _cached_token = response.json()["token"]
-        return _cached_token
+        return response.json()["token"]
     raise Exception(f"Failed to get token: {response.status_code} - {response.text}")
 
-def get_auth_headers():
-    """Get auth headers with token"""
-    return {"Authorization": f"Bearer {get_auth_token()}"}
+
+@pytest.fixture(scope="session")
+def super_admin_token(http, tmp_path_factory):
+    """Log in once per test run and share the super admin token.
+
+    Under pytest-xdist (``pytest -n auto``) every worker has its own session,
+    so the first worker to get here logs in and writes the token next to the
+    shared basetemp; the others pick it up from there instead of logging in.
+    """
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        return login_super_admin(http)
+
+    from filelock import FileLock
+
+    token_file = tmp_path_factory.getbasetemp().parent / "super_admin_token"
+    with FileLock(f"{token_file}.lock"):
+        if token_file.is_file():
+            return token_file.read_text()
+        token = login_super_admin(http)
+        token_file.write_text(token)
+        return token
+
+
+@pytest.fixture(scope="session")
+def auth_headers(super_admin_token):
+    """Auth headers with the session's super admin token"""
+    return {"Authorization": f"Bearer {super_admin_token}"}
 
 
 class TestAuthentication:
     """Authentication endpoint tests"""
     
-    def test_login_super_admin_success(self):
+    def test_login_super_admin_success(self, http):
         """Test super admin login"""
-        response = requests.post(f"{API}/auth/login", json={
+        response = http.post(f"{API}/auth/login", json={
             "email": SUPER_ADMIN_EMAIL,
             "password": SUPER_ADMIN_PASSWORD
         })
@@ -57,18 +86,18 @@ class TestAuthentication:
         assert data["user"]["email"] == SUPER_ADMIN_EMAIL
         print(f"PASS: Super admin login successful - user: {data['user']['name']}")
     
-    def test_login_invalid_credentials(self):
+    def test_login_invalid_credentials(self, http):
         """Test login with wrong password"""
-        response = requests.post(f"{API}/auth/login", json={
+        response = http.post(f"{API}/auth/login", json={
             "email": SUPER_ADMIN_EMAIL,
             "password": "WrongPassword123"
         })
         assert response.status_code in [401, 400], f"Expected 401/400, got {response.status_code}"
         print("PASS: Invalid credentials rejected")
     
-    def test_health_check(self):
+    def test_health_check(self, http):
         """Test health endpoint"""
-        response = requests.get(f"{API}/health")
+        response = http.get(f"{API}/health")
         assert response.status_code == 200
         data = response.json()
         assert data.get("status") == "healthy"
@@ -78,25 +107,25 @@ class TestAuthentication:
 class TestPhishingCampaigns:
     """Phishing campaigns and tracking tests"""
     
-    def test_list_phishing_campaigns(self):
+    def test_list_phishing_campaigns(self, http, auth_headers):
         """Test listing phishing campaigns"""
-        response = requests.get(f"{API}/phishing/campaigns", headers=get_auth_headers())
+        response = http.get(f"{API}/phishing/campaigns", headers=auth_headers)
         assert response.status_code == 200, f"Failed: {response.text}"
         data = response.json()
         assert isinstance(data, list), "Expected list of campaigns"
         print(f"PASS: Listed {len(data)} phishing campaigns")
     
-    def test_list_phishing_templates(self):
+    def test_list_phishing_templates(self, http, auth_headers):
         """Test listing phishing templates"""
-        response = requests.get(f"{API}/phishing/templates", headers=get_auth_headers())
+        response = http.get(f"{API}/phishing/templates", headers=auth_headers)
         assert response.status_code == 200, f"Failed: {response.text}"
         data = response.json()
         assert isinstance(data, list), "Expected list of templates"
         print(f"PASS: Listed {len(data)} phishing templates")
     
-    def test_phishing_stats_unified(self):
+    def test_phishing_stats_unified(self, http, auth_headers):
         """Test unified phishing stats (includes ad campaigns)"""
-        response = requests.get(f"{API}/phishing/stats?days=30", headers=get_auth_headers())
+        response = http.get(f"{API}/phishing/stats?days=30", headers=auth_headers)
         assert response.status_code == 200, f"Failed: {response.text}"
         data = response.json()
         # Verify unified stats structure
@@ -105,10 +134,10 @@ class TestPhishingCampaigns:
         assert "click_rate" in data
         print(f"PASS: Unified stats - {data['total_campaigns']} total campaigns, {data['click_rate']}% click rate")
     
-    def test_phishing_click_tracking_shows_awareness_page(self):
+    def test_phishing_click_tracking_shows_awareness_page(self, http):
         """Test that phishing link click shows awareness page"""
         # This endpoint should work without auth (public tracking)
-        response = requests.get(f"{API}/phishing/track/click/test_track_abc123")
+        response = http.get(f"{API}/phishing/track/click/test_track_abc123")
         assert response.status_code == 200, f"Failed: {response.status_code}"
         # Should return HTML awareness page
         assert "text/html" in response.headers.get("content-type", "")
@@ -117,9 +146,9 @@ class TestPhishingCampaigns:
         assert "This was a simulated security test" in content or "security awareness" in content.lower()
         print("PASS: Phishing click tracking returns awareness page HTML")
     
-    def test_phishing_campaign_has_assigned_module_field(self):
+    def test_phishing_campaign_has_assigned_module_field(self, http, auth_headers):
         """Test that phishing campaigns can have assigned training modules"""
-        response = requests.get(f"{API}/phishing/campaigns", headers=get_auth_headers())
+        response = http.get(f"{API}/phishing/campaigns", headers=auth_headers)
         assert response.status_code == 200
         data = response.json()
         if len(data) > 0:
@@ -134,9 +163,9 @@ class TestPhishingCampaigns:
 class TestAdSimulations:
     """Ad simulation campaign tests"""
     
-    def test_list_ad_campaigns(self):
+    def test_list_ad_campaigns(self, http, auth_headers):
         """Test listing ad campaigns"""
-        response = requests.get(f"{API}/ads/campaigns", headers=get_auth_headers())
+        response = http.get(f"{API}/ads/campaigns", headers=auth_headers)
         # Accept 200 or 404 (if endpoint exists but no campaigns)
         assert response.status_code in [200, 404], f"Failed: {response.status_code} - {response.text}"
         if response.status_code == 200:
@@ -149,9 +178,9 @@ class TestAdSimulations:
 class TestAnalytics:
     """Analytics endpoint tests"""
     
-    def test_all_campaigns_unified_analytics(self):
+    def test_all_campaigns_unified_analytics(self, http, auth_headers):
         """Test unified analytics showing both phishing and ad campaigns"""
-        response = requests.get(f"{API}/analytics/all-campaigns?days=30", headers=get_auth_headers())
+        response = http.get(f"{API}/analytics/all-campaigns?days=30", headers=auth_headers)
         assert response.status_code == 200, f"Failed: {response.text}"
         data = response.json()
         
@@ -174,9 +203,9 @@ class TestAnalytics:
         
         print(f"PASS: Unified analytics - {summary['total_campaigns']} total ({summary['phishing_campaigns']} phishing, {summary['ad_campaigns']} ad)")
     
-    def test_analytics_overview(self):
+    def test_analytics_overview(self, http, auth_headers):
         """Test analytics overview endpoint"""
-        response = requests.get(f"{API}/analytics/overview?days=30", headers=get_auth_headers())
+        response = http.get(f"{API}/analytics/overview?days=30", headers=auth_headers)
         # May not exist, so accept 404
         if response.status_code == 200:
             print("PASS: Analytics overview endpoint works")
@@ -189,9 +218,9 @@ class TestAnalytics:
 class TestTrainingModules:
     """Training modules endpoint tests"""
     
-    def test_list_training_modules(self):
+    def test_list_training_modules(self, http, auth_headers):
         """Test listing training modules"""
-        response = requests.get(f"{API}/training/modules", headers=get_auth_headers())
+        response = http.get(f"{API}/training/modules", headers=auth_headers)
         assert response.status_code == 200, f"Failed: {response.text}"
         data = response.json()
         assert isinstance(data, list), "Expected list of modules"
@@ -201,17 +230,17 @@ class TestTrainingModules:
 class TestSimulationBuilder:
     """Simulation Builder specific tests"""
     
-    def test_get_phishing_template_for_edit(self):
+    def test_get_phishing_template_for_edit(self, http, auth_headers):
         """Test getting a specific template for editing"""
         # First get list of templates
-        response = requests.get(f"{API}/phishing/templates", headers=get_auth_headers())
+        response = http.get(f"{API}/phishing/templates", headers=auth_headers)
         assert response.status_code == 200
         templates = response.json()
         
         if len(templates) > 0:
             template_id = templates[0]["template_id"]
             # Get specific template
-            response = requests.get(f"{API}/phishing/templates/{template_id}", headers=get_auth_headers())
+            response = http.get(f"{API}/phishing/templates/{template_id}", headers=auth_headers)
             assert response.status_code == 200, f"Failed to get template: {response.text}"
             template = response.json()
             assert "name" in template